@@ -0,0 +1,122 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class OverloadedError(Exception):
+    """Raised when a request arrives while every slot and queue place is taken"""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request does not finish within its deadline"""
+
+
+class AdmissionController:
+    """Bound the requests running at once and the requests waiting to run.
+
+    Up to ``max_concurrent`` requests hold a slot; up to ``max_queued`` more
+    wait for one. Anything beyond that is turned away at once with
+    OverloadedError, so overload shows up as fast rejections instead of an
+    ever-growing backlog. Each request also gets a deadline covering its
+    wait and its work.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_queued: int = 64,
+        timeout_seconds: float = 60.0,
+        name: str = "admission"
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.timeout_seconds = timeout_seconds
+        self.name = name
+        self._slots = None
+
+        self.active = 0
+        self.queued = 0
+
+        # Counters
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait_seconds = 0.0
+
+    def deadline(self, timeout_seconds: float = None) -> float:
+        """Effective timeout: the smaller of a request's own and the configured one (0 means none)"""
+        if timeout_seconds is None:
+            return self.timeout_seconds
+        return min(self.timeout_seconds, timeout_seconds) if self.timeout_seconds else timeout_seconds
+
+    def check(self):
+        """Raise OverloadedError if a new request would be turned away"""
+        if self.active >= self.max_concurrent and self.queued >= self.max_queued:
+            self.rejected += 1
+            raise OverloadedError(f"Server is busy ({self.name} queue is full), retry later")
+
+    @asynccontextmanager
+    async def slot(self, wait_seconds: float = None):
+        """Hold a slot for the body of the block.
+
+        Raises OverloadedError when full, or DeadlineExceededError when no
+        slot frees up within wait_seconds.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        self.check()
+
+        started = time.perf_counter()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), wait_seconds or None)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise DeadlineExceededError(f"No {self.name} slot freed up within {wait_seconds:g} seconds")
+        finally:
+            self.queued -= 1
+        self.total_wait_seconds += time.perf_counter() - started
+        self.admitted += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    async def run(self, coro, timeout_seconds: float = None):
+        """Run coro in a slot under a deadline.
+
+        The deadline is the smaller of timeout_seconds and the configured
+        timeout and includes time spent queued. Raises OverloadedError or
+        DeadlineExceededError.
+        """
+        timeout = self.deadline(timeout_seconds)
+
+        async def admitted():
+            async with self.slot():
+                return await coro
+
+        try:
+            return await asyncio.wait_for(admitted(), timeout or None)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise DeadlineExceededError(f"Request did not finish within {timeout:g} seconds")
+        finally:
+            # A rejected request never awaited its coroutine
+            coro.close()
+
+    def get_stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "timeout_seconds": self.timeout_seconds,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "average_wait_ms": self.total_wait_seconds * 1000.0 / self.admitted if self.admitted else 0.0
+        }
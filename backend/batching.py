@@ -0,0 +1,161 @@
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Collect concurrent requests into batches for a single batched call.
+
+    Callers await ``submit(item)``. A background task waits for the first
+    pending item, keeps gathering more until ``max_batch_size`` items are
+    queued or ``max_wait_ms`` has elapsed, then runs ``batch_fn`` once for
+    the whole batch and hands each caller its own result. Up to
+    ``max_concurrency`` batches run at once; while they are all busy, new
+    items keep queueing and form the next batch.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[Sequence[Any]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_concurrency: int = 1,
+        name: str = "batcher"
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrency = max(1, max_concurrency)
+        self.name = name
+
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._running = set()
+
+        # Counters
+        self.total_batches = 0
+        self.total_items = 0
+        self.largest_batch = 0
+        self.total_batch_seconds = 0.0
+        self.total_wait_seconds = 0.0
+        self.batch_sizes = Counter()
+        # Durations of recent batches, for latency percentiles
+        self.recent_batch_seconds = deque(maxlen=1000)
+
+    def _ensure_worker(self):
+        """Start the batching task on the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[tuple]:
+        """Wait for one item, then gather more until the batch is full or the window closes"""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # A batch is only gathered once a slot is free to run it, so items
+            # arriving while every slot is busy all go into the next one
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            # Callers that gave up while waiting do not need a slot in the batch
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = loop.create_task(self._dispatch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _dispatch(self, batch: List[tuple]):
+        """Run one batch and resolve its callers' futures"""
+        started = time.perf_counter()
+        self.total_wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+        try:
+            results = await self.batch_fn([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._record(len(batch), time.perf_counter() - started)
+            self._slots.release()
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _record(self, size: int, seconds: float):
+        self.total_batches += 1
+        self.total_items += size
+        self.largest_batch = max(self.largest_batch, size)
+        self.total_batch_seconds += seconds
+        self.batch_sizes[size] += 1
+        self.recent_batch_seconds.append(seconds)
+
+    def get_stats(self) -> Dict:
+        """Get batching counters"""
+        batches = self.total_batches
+        recent_ms = np.array(self.recent_batch_seconds) * 1000.0
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_concurrency": self.max_concurrency,
+            "running_batches": len(self._running),
+            "total_batches": batches,
+            "total_items": self.total_items,
+            "average_batch_size": self.total_items / batches if batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "average_batch_ms": self.total_batch_seconds * 1000.0 / batches if batches else 0.0,
+            "p50_batch_ms": float(np.percentile(recent_ms, 50)) if len(recent_ms) else 0.0,
+            "p95_batch_ms": float(np.percentile(recent_ms, 95)) if len(recent_ms) else 0.0,
+            # Time items spent queued before their batch started
+            "average_wait_ms": self.total_wait_seconds * 1000.0 / self.total_items if self.total_items else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "pending": self._queue.qsize() if self._queue else 0
+        }
+
+    async def stop(self):
+        """Cancel the batching task and any batches still running"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
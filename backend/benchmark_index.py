@@ -0,0 +1,158 @@
+"""Measure recall@k, latency and memory of index types on the stored corpus.
+
+Usage (from the backend directory):
+
+    python benchmark_index.py --index-path ./data/faiss_index --k 5 \
+        --types flat hnsw ivf ivfpq --storage float32 fp16 int8 \
+        --metric cosine --nprobe 1 4 16 64 --ef-search 16 64 256
+
+The live vectors are exported from the vector store, and an exact float32
+flat search over them with the chosen metric is the ground truth. Each
+candidate index type and storage mode is built from the same vectors and
+queried at every search knob setting. Queries are stored vectors with a
+little Gaussian noise added, so they look like real questions that land
+near, but not on, indexed chunks. Bytes per vector is the serialized index
+size divided by the number of vectors.
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from vector_store import (
+    INDEX_TYPES,
+    METRICS,
+    STORAGE_TYPES,
+    VectorStore,
+    create_index,
+    export_vectors,
+    needs_training,
+    normalize,
+    search_parameters,
+    train_index
+)
+
+
+def load_live_vectors(index_path: str, dimension: int) -> np.ndarray:
+    """Export the vectors of every live (non-deleted) chunk in a store"""
+    store = VectorStore(dimension=dimension, index_path=index_path, read_only=True, lexical=False)
+    try:
+        ids, vectors = export_vectors(store.index)
+        live = np.isin(ids, store.metadata.live_ids())
+        return np.ascontiguousarray(vectors[live])
+    finally:
+        store.close()
+
+
+def make_queries(vectors: np.ndarray, count: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)
+    queries = vectors[picks] + rng.normal(0, noise, size=(len(picks), vectors.shape[1]))
+    return queries.astype(np.float32)
+
+
+def measure(index: faiss.Index, index_type: str, queries: np.ndarray, truth: np.ndarray,
+            k: int, nprobe: int = None, ef_search: int = None) -> Dict:
+    """Run queries one at a time, like the API does, and score them against the truth"""
+    params = search_parameters(index_type, k, nprobe=nprobe, ef_search=ef_search)
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], k, params=params)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        hits += len(set(ids[0].tolist()) & set(expected.tolist()))
+
+    latencies = np.array(latencies)
+    return {
+        "recall": hits / (len(queries) * k),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-path", default="./data/faiss_index")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--storage", nargs="+", default=["float32"], choices=list(STORAGE_TYPES))
+    parser.add_argument("--metric", default="l2", choices=list(METRICS))
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ivf-nlist", type=int, default=None,
+                        help="IVF lists (default: about 4*sqrt(corpus size))")
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    args = parser.parse_args()
+
+    vectors = load_live_vectors(args.index_path, args.dimension)
+    if len(vectors) <= args.k:
+        raise SystemExit(f"Need more than k={args.k} vectors to benchmark, found {len(vectors)}")
+
+    ids = np.arange(len(vectors), dtype=np.int64)
+    queries = make_queries(vectors, args.queries, args.noise, args.seed)
+    if args.metric == "cosine":
+        vectors, queries = normalize(vectors), normalize(queries)
+    nlist = args.ivf_nlist or max(1, min(int(4 * np.sqrt(len(vectors))), len(vectors) // 39))
+
+    exact = faiss.IndexFlat(args.dimension, METRICS[args.metric])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"{len(vectors)} vectors, {len(queries)} queries, {args.metric} metric, "
+          f"recall@{args.k} against exact float32 flat search")
+    print(f"{'index':<28}{'storage':<9}{'knob':<16}{'recall':>8}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'bytes/vec':>11}{'build s':>10}")
+
+    for index_type in args.types:
+        # PQ codes replace the storage mode, so IVF-PQ is built once
+        storages = ["pq"] if index_type == "ivfpq" else args.storage
+        for storage in storages:
+            params = {
+                "hnsw_m": args.hnsw_m,
+                "ivf_nlist": nlist,
+                "pq_m": args.pq_m,
+                "metric": args.metric,
+                "storage": "float32" if storage == "pq" else storage
+            }
+            trainable = needs_training(index_type, params["storage"])
+            if trainable and len(vectors) < max(nlist, 256 if index_type == "ivfpq" else 1):
+                print(f"{index_type:<28}{storage:<9}skipped: not enough vectors to train")
+                continue
+
+            started = time.perf_counter()
+            index = create_index(index_type, args.dimension, params)
+            if trainable:
+                train_index(index, vectors, max_samples=max(nlist * 256, 100000))
+            index.add_with_ids(vectors, ids)
+            build_seconds = time.perf_counter() - started
+            size_per_vector = len(faiss.serialize_index(index)) / len(vectors)
+
+            if index_type in ("ivf", "ivfpq"):
+                knobs: List = [("nprobe", n) for n in args.nprobe if n <= nlist]
+            elif index_type == "hnsw":
+                knobs = [("ef_search", ef) for ef in args.ef_search]
+            else:
+                knobs = [("-", None)]
+
+            label = f"{index_type} (nlist={nlist})" if index_type in ("ivf", "ivfpq") else index_type
+            for knob, value in knobs:
+                result = measure(
+                    index, index_type, queries, truth, args.k,
+                    nprobe=value if knob == "nprobe" else None,
+                    ef_search=value if knob == "ef_search" else None
+                )
+                knob_label = f"{knob}={value}" if value is not None else knob
+                print(f"{label:<28}{storage:<9}{knob_label:<16}{result['recall']:>8.3f}{result['p50_ms']:>10.3f}"
+                      f"{result['p95_ms']:>10.3f}{size_per_vector:>11.0f}{build_seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Compare the onnx or int8 inference backend with PyTorch on the stored corpus.
+
+Usage (from the backend directory):
+
+    python check_inference_parity.py --backend int8 --index-path ./data/faiss_index \
+        --chunks 500 --questions 20
+
+Embeddings: chunk texts sampled from the vector store are encoded by the
+PyTorch model and by the candidate backend. The report gives the cosine
+similarity of each pair of vectors (mean, 1st percentile and minimum) and
+how many of the top-k chunks each question retrieves are the same under
+both, which is what drift costs at query time.
+
+Generation: each question is answered by both generators from the same
+prompt, built from the chunks PyTorch retrieves. The report gives exact
+answer agreement and mean token F1 between the two answers.
+
+Both halves also time each backend on the same inputs. Exported and
+quantized models are cached under --model-cache, as the server does.
+"""
+import argparse
+import time
+from collections import Counter
+from typing import List
+
+import numpy as np
+
+from inference_backends import INFERENCE_BACKENDS, load_embedding_model, load_generator
+from vector_store import VectorStore
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+GENERATION_MODEL = "google/flan-t5-base"
+
+# Typical questions for the corpus; --questions-file replaces them
+DEFAULT_QUESTIONS = [
+    "What were the total Scope 1 emissions?",
+    "How much did Scope 2 emissions change compared to the previous year?",
+    "What renewable energy targets does the company set?",
+    "Which climate risks are identified in the report?",
+    "What is the net zero target year?",
+    "How much water was withdrawn?",
+    "What share of electricity comes from renewable sources?",
+    "Which GRI standards does the report reference?",
+    "What are the Scope 3 emission categories reported?",
+    "How is executive pay linked to sustainability goals?",
+    "What waste reduction measures are described?",
+    "What is the carbon intensity per unit of revenue?",
+    "Which TCFD recommendations are addressed?",
+    "What biodiversity commitments are made?",
+    "How many employees received sustainability training?",
+    "What investments in energy efficiency were made?",
+    "What is the methane emissions reduction target?",
+    "How are supplier emissions managed?",
+    "What physical risks to facilities are mentioned?",
+    "What is the internal carbon price?"
+]
+
+
+def load_chunks(index_path: str, count: int, seed: int) -> List[str]:
+    """Texts of a random sample of live chunks in a store"""
+    store = VectorStore(index_path=index_path, read_only=True, lexical=False)
+    try:
+        ids = store.metadata.live_ids()
+        if len(ids) > count:
+            ids = np.sort(np.random.default_rng(seed).choice(ids, size=count, replace=False))
+        return [meta["text"] for meta in store.metadata.get(ids)]
+    finally:
+        store.close()
+
+
+def build_prompt(question: str, context: str) -> str:
+    return f"Context:\n{context}\n\nQuestion:\n{question}\n\nAnswer:\n"
+
+
+def token_f1(first: str, second: str) -> float:
+    first_tokens, second_tokens = first.lower().split(), second.lower().split()
+    if not first_tokens and not second_tokens:
+        return 1.0
+    common = sum((Counter(first_tokens) & Counter(second_tokens)).values())
+    if common == 0:
+        return 0.0
+    precision, recall = common / len(second_tokens), common / len(first_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="int8", choices=[b for b in INFERENCE_BACKENDS if b != "torch"])
+    parser.add_argument("--index-path", default="./data/faiss_index")
+    parser.add_argument("--model-cache", default="./data/models")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--questions-file", default=None, help="One question per line")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-generation", action="store_true")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.index_path, args.chunks, args.seed)
+    if len(chunks) <= args.k:
+        raise SystemExit(f"Need more than k={args.k} chunks to compare, found {len(chunks)}")
+    if args.questions_file:
+        with open(args.questions_file, encoding="utf-8") as file:
+            questions = [line.strip() for line in file if line.strip()]
+    else:
+        questions = DEFAULT_QUESTIONS
+    questions = questions[:args.questions]
+
+    # Embeddings
+    reference = load_embedding_model(EMBEDDING_MODEL, "torch")
+    candidate = load_embedding_model(EMBEDDING_MODEL, args.backend, args.model_cache)
+    encode = dict(batch_size=args.batch_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)
+    # One untimed call each so lazy session setup is not measured
+    reference.encode(chunks[:1], **encode)
+    candidate.encode(chunks[:1], **encode)
+    reference_vectors, reference_seconds = timed(reference.encode, chunks, **encode)
+    candidate_vectors, candidate_seconds = timed(candidate.encode, chunks, **encode)
+
+    cosines = (reference_vectors * candidate_vectors).sum(axis=1)
+    reference_queries = reference.encode(questions, **encode)
+    candidate_queries = candidate.encode(questions, **encode)
+    # Each backend searches its own chunk vectors, as an index built with it would
+    reference_top = np.argsort(-(reference_queries @ reference_vectors.T), axis=1)[:, :args.k]
+    candidate_top = np.argsort(-(candidate_queries @ candidate_vectors.T), axis=1)[:, :args.k]
+    overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(reference_top.tolist(), candidate_top.tolist())])
+
+    print(f"Embeddings: {EMBEDDING_MODEL}, {len(chunks)} chunks, torch vs {args.backend}")
+    print(f"  cosine similarity   mean {cosines.mean():.5f}  p1 {np.percentile(cosines, 1):.5f}  min {cosines.min():.5f}")
+    print(f"  top-{args.k} overlap       {overlap:.3f} over {len(questions)} questions")
+    print(f"  chunks per second   torch {len(chunks) / reference_seconds:.1f}  {args.backend} "
+          f"{len(chunks) / candidate_seconds:.1f}  speedup {reference_seconds / candidate_seconds:.2f}x")
+
+    if args.skip_generation:
+        return
+
+    # Generation, from the same prompts for both backends
+    prompts = [
+        build_prompt(question, "\n\n".join(chunks[i] for i in top))
+        for question, top in zip(questions, reference_top.tolist())
+    ]
+    generate = dict(max_length=256, do_sample=False, truncation=True)
+    reference_generator = load_generator(GENERATION_MODEL, "torch")
+    candidate_generator = load_generator(GENERATION_MODEL, args.backend, args.model_cache)
+    reference_generator(prompts[0], **generate)
+    candidate_generator(prompts[0], **generate)
+
+    reference_answers, candidate_answers = [], []
+    reference_seconds = candidate_seconds = 0.0
+    for prompt in prompts:
+        result, seconds = timed(reference_generator, prompt, **generate)
+        reference_answers.append(result[0]["generated_text"].strip())
+        reference_seconds += seconds
+        result, seconds = timed(candidate_generator, prompt, **generate)
+        candidate_answers.append(result[0]["generated_text"].strip())
+        candidate_seconds += seconds
+
+    agreement = np.mean([a == b for a, b in zip(reference_answers, candidate_answers)])
+    f1 = np.mean([token_f1(a, b) for a, b in zip(reference_answers, candidate_answers)])
+    print(f"Generation: {GENERATION_MODEL}, {len(prompts)} questions, torch vs {args.backend}")
+    print(f"  exact agreement     {agreement:.3f}")
+    print(f"  mean token F1       {f1:.3f}")
+    print(f"  seconds per answer  torch {reference_seconds / len(prompts):.3f}  {args.backend} "
+          f"{candidate_seconds / len(prompts):.3f}  speedup {reference_seconds / candidate_seconds:.2f}x")
+    for question, a, b in zip(questions, reference_answers, candidate_answers):
+        if a != b:
+            print(f"  differs: {question!r}\n    torch: {a!r}\n    {args.backend}: {b!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import re
+from typing import Awaitable, Callable, Dict, List, Sequence
+
+import numpy as np
+
+# Sentence ends, or paragraph breaks for text without punctuation
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+# Characters of a chunk's start used to find where it overlaps its predecessor
+_OVERLAP_PROBE = 40
+
+
+def merge_overlapping(previous: str, following: str) -> str:
+    """Join two consecutive chunks, dropping the overlap the chunker repeated"""
+    probe = following[:_OVERLAP_PROBE]
+    if probe:
+        start = previous.rfind(probe)
+        while start != -1:
+            if following.startswith(previous[start:]):
+                return previous[:start] + following
+            start = previous.rfind(probe, 0, start)
+    return previous + "\n\n" + following
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_BREAK.split(text) if sentence.strip()]
+
+
+class ContextBuilder:
+    """Pack retrieved chunks into the generator's input budget.
+
+    Consecutive chunks of a document are merged back into one passage so
+    their repeated overlap is only paid for once. If the passages still do
+    not fit, they are split into sentences, the sentences most similar to
+    the question are kept until the token budget is spent and they are
+    put back in reading order. Tokens are counted with the generator's own
+    tokenizer, since that is what the model truncates on.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        embed_fn: Callable[[List[str]], Awaitable[np.ndarray]],
+        max_input_tokens: int = 512
+    ):
+        self.tokenizer = tokenizer
+        self.embed_fn = embed_fn
+        self.max_input_tokens = max_input_tokens
+
+        # Counters
+        self.total_contexts = 0
+        self.trimmed_contexts = 0
+        self.context_tokens = 0
+        self.packed_tokens = 0
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def merge_passages(self, chunks: List[Dict]) -> List[str]:
+        """Merge runs of consecutive chunks per document, in retrieval order"""
+        passages = []
+        # (doc_id, chunk_index) of each passage's last chunk -> passage position
+        tails = {}
+        ranked = sorted(
+            enumerate(chunks),
+            key=lambda item: (item[1].get("doc_id") or "", item[1].get("chunk_index", 0))
+        )
+        first_rank = {}
+        for rank, chunk in ranked:
+            key = (chunk.get("doc_id"), chunk.get("chunk_index", 0) - 1)
+            if key in tails:
+                position = tails.pop(key)
+                passages[position] = merge_overlapping(passages[position], chunk.get("text", ""))
+            else:
+                position = len(passages)
+                passages.append(chunk.get("text", ""))
+                first_rank[position] = rank
+            tails[(chunk.get("doc_id"), chunk.get("chunk_index", 0))] = position
+
+        # The passage holding the best-ranked chunk comes first
+        order = sorted(range(len(passages)), key=lambda position: first_rank[position])
+        return [passages[position] for position in order if passages[position].strip()]
+
+    async def build(self, question_embedding: Sequence[float], chunks: List[Dict], prompt_tokens: int = 0) -> str:
+        """Context text for chunks that fits in the budget left after prompt_tokens"""
+        budget = max(0, self.max_input_tokens - prompt_tokens)
+        passages = self.merge_passages(chunks)
+        context = "\n\n".join(passages)
+        total = self.count_tokens(context)
+        self.total_contexts += 1
+        self.context_tokens += total
+        if total <= budget:
+            self.packed_tokens += total
+            return context
+
+        # (passage, sentence) positions keep the packed text in reading order
+        sentences = []
+        for passage_index, passage in enumerate(passages):
+            for sentence in split_sentences(passage):
+                sentences.append((passage_index, sentence, self.count_tokens(sentence)))
+
+        vectors = np.asarray(await self.embed_fn([sentence for _, sentence, _ in sentences]), dtype=np.float32)
+        query = np.asarray(question_embedding, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        similarities = vectors @ (query / (np.linalg.norm(query) + 1e-12))
+
+        chosen = []
+        remaining = budget
+        # Greedily take the most similar sentences that still fit
+        for position in np.argsort(-similarities):
+            tokens = sentences[position][2]
+            if tokens <= remaining:
+                chosen.append(position)
+                remaining -= tokens
+        if not chosen and sentences and budget:
+            # Even the best sentence is over budget: keep its opening tokens
+            best = int(np.argmax(similarities))
+            ids = self.tokenizer.encode(sentences[best][1], add_special_tokens=False)[:budget]
+            sentences[best] = (sentences[best][0], self.tokenizer.decode(ids), len(ids))
+            chosen = [best]
+
+        # Sentences from different passages stay in separate paragraphs
+        paragraphs = []
+        for position in sorted(chosen):
+            passage_index, sentence, tokens = sentences[position]
+            if paragraphs and paragraphs[-1][0] == passage_index:
+                paragraphs[-1][1].append(sentence)
+            else:
+                paragraphs.append((passage_index, [sentence]))
+            self.packed_tokens += tokens
+
+        self.trimmed_contexts += 1
+        return "\n\n".join(" ".join(group) for _, group in paragraphs)
+
+    def get_stats(self) -> Dict:
+        contexts = self.total_contexts
+        return {
+            "max_input_tokens": self.max_input_tokens,
+            "contexts": contexts,
+            "trimmed_contexts": self.trimmed_contexts,
+            # Generator tokens of the merged passages, before and after packing
+            "average_context_tokens": self.context_tokens / contexts if contexts else 0.0,
+            "average_packed_tokens": self.packed_tokens / contexts if contexts else 0.0
+        }
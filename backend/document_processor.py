@@ -1,30 +1,179 @@
-import PyPDF2
 import tiktoken
 import os
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional, Iterable, Iterator, AsyncIterator
 from pathlib import Path
 import asyncio
-from sentence_transformers import SentenceTransformer
+import concurrent.futures
+import itertools
+import multiprocessing
+import time
+from functools import partial
+import numpy as np
+from pdf_extraction import count_pdf_pages, extract_page_range
+from embedding_cache import EmbeddingCache
+from inference_backends import embedding_model_key, load_embedding_model
 
 class DocumentProcessor:
-    def __init__(self):
-        pass
-
+    def __init__(
+        self,
+        embedding_batch_size: int = 32,
+        embedding_workers: int = 1,
+        pdf_workers: int = None,
+        pdf_pages_per_task: int = 25,
+        pdf_task_timeout: float = 120.0,
+        embedding_cache_path: Optional[str] = None,
+        inference_backend: str = "torch",
+        model_cache_dir: str = "./data/models"
+    ):
         self.encoding = tiktoken.get_encoding("cl100k_base")
         # Use sentence-transformers for embeddings (384 dimensions)
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model_name = 'all-MiniLM-L6-v2'
+        # PyTorch, ONNX Runtime or int8 ONNX Runtime; exports are cached on disk
+        self.inference_backend = inference_backend
+        self.embedding_model = load_embedding_model(self.embedding_model_name, inference_backend, model_cache_dir)
+        self.embedding_dimension = self.embedding_model.get_sentence_embedding_dimension()
+        self.embedding_batch_size = embedding_batch_size
+
+        # Chunk embeddings survive restarts and are shared by re-uploads
+        self.embedding_cache = None
+        if embedding_cache_path:
+            self.embedding_cache = EmbeddingCache(
+                embedding_cache_path,
+                embedding_model_key(self.embedding_model_name, inference_backend),
+                self.embedding_dimension
+            )
+
+        # Long-lived pool for encode calls so each embedding request does not
+        # pay for creating and tearing down its own threads
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=embedding_workers,
+            thread_name_prefix="embedding"
+        )
+        # Questions get their own thread so a large ingest batch never
+        # holds up query embeddings
+        self.query_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="query-embedding"
+        )
+
+        # PDF parsing is CPU-bound pure Python, so it runs in worker processes
+        # split by page ranges. pdf_workers=0 parses inline instead.
+        if pdf_workers is None:
+            pdf_workers = os.cpu_count() or 1
+        self.pdf_workers = pdf_workers
+        self.pdf_pages_per_task = max(1, pdf_pages_per_task)
+        self.pdf_task_timeout = pdf_task_timeout
+        self._pdf_pool = None
+
+    @property
+    def pdf_pool(self) -> Optional[concurrent.futures.ProcessPoolExecutor]:
+        """Process pool for PDF extraction, created on first use"""
+        if self._pdf_pool is None and self.pdf_workers > 0:
+            # Spawned workers start clean instead of forking a process that
+            # holds model weights, inference threads and event loop state
+            self._pdf_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.pdf_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pdf_pool
+
+    def _discard_pdf_pool(self, pool: concurrent.futures.ProcessPoolExecutor):
+        """Kill a pool whose worker hung, so the next job starts a fresh one"""
+        if self._pdf_pool is pool:
+            self._pdf_pool = None
+        # A running task cannot be cancelled, only its process terminated
+        processes = list((pool._processes or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
         
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from PDF file"""
+    def iter_pdf_pages(self, pdf_path: str) -> Iterator[str]:
+        """Yield the text of each PDF page in order.
+
+        Page ranges are parsed in the process pool with a bounded number of
+        ranges in flight, and results are yielded in page order. Each range
+        must finish within pdf_task_timeout of being submitted; a range that
+        overruns it gets its pool torn down.
+        """
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            page_count = count_pdf_pages(pdf_path)
+            ranges = [
+                (start, min(start + self.pdf_pages_per_task, page_count))
+                for start in range(0, page_count, self.pdf_pages_per_task)
+            ]
+
+            pool = self.pdf_pool
+            if pool is None:
+                for start, end in ranges:
+                    yield from extract_page_range(pdf_path, start, end)
+                return
+
+            max_in_flight = self.pdf_workers * 2
+            pending = []
+            next_range = 0
+            try:
+                while pending or next_range < len(ranges):
+                    while next_range < len(ranges) and len(pending) < max_in_flight:
+                        start, end = ranges[next_range]
+                        deadline = time.monotonic() + self.pdf_task_timeout
+                        future = pool.submit(extract_page_range, pdf_path, start, end)
+                        pending.append((start, end, deadline, future))
+                        next_range += 1
+
+                    start, end, deadline, future = pending.pop(0)
+                    try:
+                        pages = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                    except concurrent.futures.TimeoutError:
+                        self._discard_pdf_pool(pool)
+                        raise Exception(f"Timed out parsing pages {start + 1}-{end}")
+                    yield from pages
+            finally:
+                for _, _, _, future in pending:
+                    future.cancel()
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
+
+    def iter_txt_blocks(self, txt_path: str, block_chars: int = 65536) -> Iterator[str]:
+        """Yield a text file in blocks of whole lines"""
+        try:
+            with open(txt_path, 'r', encoding='utf-8') as file:
+                block = []
+                size = 0
+                for line in file:
+                    block.append(line)
+                    size += len(line)
+                    if size >= block_chars:
+                        yield "".join(block)
+                        block = []
+                        size = 0
+                if block:
+                    yield "".join(block)
+        except Exception as e:
+            raise Exception(f"Error reading TXT file: {str(e)}")
+
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """Yield document text page by page (blocks of lines for plain text)"""
+        file_ext = Path(file_path).suffix.lower()
+
+        if file_ext == '.pdf':
+            return self.iter_pdf_pages(file_path)
+        elif file_ext in ['.txt', '.md', '.markdown']:
+            return self.iter_txt_blocks(file_path)
+        else:
+            raise ValueError(f"Unsupported file type: {file_ext}")
+
+    def count_pages(self, file_path: str) -> Optional[int]:
+        """Get the page count of a PDF, or None for other file types"""
+        if Path(file_path).suffix.lower() != '.pdf':
+            return None
+        try:
+            return count_pdf_pages(file_path)
+        except Exception as e:
+            raise Exception(f"Error extracting text from PDF: {str(e)}")
+
+    def extract_text_from_pdf(self, pdf_path: str) -> str:
+        """Extract text from PDF file"""
+        return "".join(self.iter_pdf_pages(pdf_path))
     
     def extract_text_from_txt(self, txt_path: str) -> str:
         """Extract text from TXT file"""
@@ -57,55 +206,205 @@ class DocumentProcessor:
     
     def chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[Dict[str, any]]:
         """Chunk text into smaller pieces with overlap"""
-        tokens = self.encoding.encode(text)
-        chunks = []
-        
-        start = 0
+        return list(self.iter_chunks([self.encoding.encode(text)], chunk_size, overlap))
+
+    def iter_chunks(
+        self,
+        token_pages: Iterable[List[int]],
+        chunk_size: int = 500,
+        overlap: int = 50
+    ) -> Iterator[Dict[str, any]]:
+        """Yield overlapping chunks from a stream of token lists.
+
+        Only the tokens of the chunk being filled are buffered, so the
+        overlap is carried across page boundaries without holding the
+        whole document.
+        """
+        step = max(1, chunk_size - overlap)
+        buffer = []
         chunk_index = 0
-        
-        while start < len(tokens):
-            end = start + chunk_size
-            chunk_tokens = tokens[start:end]
-            chunk_text = self.encoding.decode(chunk_tokens)
-            
-            chunks.append({
-                "text": chunk_text,
+
+        for tokens in token_pages:
+            buffer.extend(tokens)
+            while len(buffer) >= chunk_size:
+                chunk_tokens = buffer[:chunk_size]
+                yield {
+                    "text": self.encoding.decode(chunk_tokens),
+                    "chunk_index": chunk_index,
+                    "token_count": len(chunk_tokens)
+                }
+                chunk_index += 1
+                buffer = buffer[step:]
+
+        # Emit the tail unless it is only overlap already in the previous chunk
+        if buffer and (chunk_index == 0 or len(buffer) > chunk_size - step):
+            yield {
+                "text": self.encoding.decode(buffer),
                 "chunk_index": chunk_index,
-                "token_count": len(chunk_tokens)
-            })
-            
-            start += chunk_size - overlap
-            chunk_index += 1
-        
-        return chunks
-    
+                "token_count": len(buffer)
+            }
+
+    def stream_document(self, file_path: str, chunk_size: int = 500, overlap: int = 50) -> "ChunkStream":
+        """Open a lazily evaluated chunk stream over a document"""
+        return ChunkStream(self, file_path, chunk_size, overlap)
+
+    async def iter_chunk_batches(self, stream: "ChunkStream", batch_size: int = None) -> AsyncIterator[List[Dict]]:
+        """Pull chunk batches from a stream off the event loop.
+
+        The next batch is extracted while the caller works on the current
+        one, so parsing overlaps with embedding.
+        """
+        batch_size = batch_size or self.embedding_batch_size
+        loop = asyncio.get_running_loop()
+        chunks = iter(stream)
+
+        def take():
+            return list(itertools.islice(chunks, batch_size))
+
+        pending = loop.run_in_executor(None, take)
+        try:
+            while True:
+                batch = await pending
+                if not batch:
+                    break
+                pending = loop.run_in_executor(None, take)
+                yield batch
+        finally:
+            # Let an in-flight extraction finish before the generator is dropped
+            if not pending.done():
+                await asyncio.wait([pending])
+
     async def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for text using sentence-transformers"""
         try:
             # Encode text to get embedding (runs in executor to avoid blocking)
-            import concurrent.futures
-            loop = asyncio.get_event_loop()
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                embedding = await loop.run_in_executor(
-                    pool, 
-                    self.embedding_model.encode, 
-                    text
-                )
+            loop = asyncio.get_running_loop()
+            embedding = await loop.run_in_executor(
+                self.executor,
+                self.embedding_model.encode,
+                text
+            )
             return embedding.tolist()
         except Exception as e:
             raise Exception(f"Error generating embedding: {str(e)}")
-    
-    async def process_document(self, file_path: str) -> Dict:
-        """Process document: extract text and create chunks"""
+
+    def encode_batch(
+        self,
+        texts: List[str],
+        batch_size: int = None,
+        progress_callback: Optional[Callable[[int], None]] = None
+    ) -> np.ndarray:
+        """Encode texts in mini-batches into a contiguous float32 matrix.
+
+        Texts found in the embedding cache are not encoded again.
+        """
+        batch_size = batch_size or self.embedding_batch_size
+        embeddings = np.empty((len(texts), self.embedding_dimension), dtype=np.float32)
+
+        cached = self.embedding_cache.get_many(texts) if self.embedding_cache else {}
+        for position, vector in cached.items():
+            embeddings[position] = vector
+        missing = [position for position in range(len(texts)) if position not in cached]
+
+        for start in range(0, len(missing), batch_size):
+            positions = missing[start:start + batch_size]
+            batch = [texts[position] for position in positions]
+            vectors = self.embedding_model.encode(
+                batch,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+            embeddings[positions] = vectors
+            if self.embedding_cache:
+                self.embedding_cache.put_many(batch, vectors)
+            if progress_callback:
+                progress_callback(len(cached) + start + len(batch))
+
+        return embeddings
+
+    async def generate_embeddings(
+        self,
+        texts: List[str],
+        batch_size: int = None,
+        progress_callback: Optional[Callable[[int], None]] = None
+    ) -> np.ndarray:
+        """Generate embeddings for many texts with one executor hop"""
         try:
-            text = self.extract_text(file_path)
-            chunks = self.chunk_text(text)
-            
-            return {
-                "full_text": text,
-                "chunks": chunks,
-                "total_tokens": self.count_tokens(text),
-                "chunk_count": len(chunks)
-            }
+            if not texts:
+                return np.empty((0, self.embedding_dimension), dtype=np.float32)
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor,
+                self.encode_batch,
+                texts,
+                batch_size,
+                progress_callback
+            )
         except Exception as e:
-            raise Exception(f"Error processing document: {str(e)}")
+            raise Exception(f"Error generating embeddings: {str(e)}")
+
+    async def embed_queries(self, questions: List[str]) -> np.ndarray:
+        """Embed a batch of questions on the query thread, bypassing the chunk cache"""
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.query_executor,
+                partial(
+                    self.embedding_model.encode,
+                    questions,
+                    batch_size=len(questions),
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+            )
+        except Exception as e:
+            raise Exception(f"Error generating query embeddings: {str(e)}")
+
+    def shutdown(self):
+        """Release the embedding executors, PDF worker processes and embedding cache"""
+        self.executor.shutdown(wait=True)
+        self.query_executor.shutdown(wait=True)
+        if self.embedding_cache:
+            self.embedding_cache.close()
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown(wait=True, cancel_futures=True)
+
+
+class ChunkStream:
+    """Chunks of one document, extracted and tokenized page by page.
+
+    Iterating the stream drives extraction, so page and token counters
+    grow as chunks are consumed.
+    """
+
+    def __init__(self, processor: DocumentProcessor, file_path: str, chunk_size: int = 500, overlap: int = 50):
+        self.processor = processor
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+        self.pages_total = None
+        self.pages_read = 0
+        self.total_tokens = 0
+        self.chunk_count = 0
+        self._chunks = None
+
+    def _token_pages(self) -> Iterator[List[int]]:
+        for page in self.processor.iter_pages(self.file_path):
+            tokens = self.processor.encoding.encode(page)
+            self.pages_read += 1
+            self.total_tokens += len(tokens)
+            yield tokens
+
+    def _generate(self) -> Iterator[Dict]:
+        self.pages_total = self.processor.count_pages(self.file_path)
+        for chunk in self.processor.iter_chunks(self._token_pages(), self.chunk_size, self.overlap):
+            self.chunk_count += 1
+            yield chunk
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self._chunks is None:
+            self._chunks = self._generate()
+        return self._chunks
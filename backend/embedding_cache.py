@@ -0,0 +1,117 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Persistent chunk embeddings keyed by embedding model and text hash.
+
+    Re-uploaded files, revised versions of a report and re-indexing runs
+    share most of their chunk texts, so their embeddings are looked up
+    here instead of being recomputed. Entries are SQLite rows holding the
+    raw float32 vector; the database uses WAL journaling so several server
+    processes can read and write it at once.
+    """
+
+    def __init__(self, path: str, model_name: str, dimension: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.dimension = dimension
+
+        # One connection shared by the embedding worker threads
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        # Counted once here and kept up to date by put_many, so stats never
+        # scan a table that only grows; rows other processes add are not seen
+        self.entries = self._conn.execute(
+            "SELECT COUNT(*) FROM embeddings WHERE model = ?", [self.model_name]
+        ).fetchone()[0]
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode('utf-8')).digest()
+
+    def get_many(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Cached embeddings by position in texts"""
+        hashes = [self.text_hash(text) for text in texts]
+        found = {}
+        try:
+            with self._lock:
+                # Stay well below SQLite's bound-parameter limit
+                for start in range(0, len(hashes), 500):
+                    batch = list(set(hashes[start:start + 500]))
+                    rows = self._conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                        f"AND text_hash IN ({','.join('?' * len(batch))})",
+                        [self.model_name, *batch]
+                    ).fetchall()
+                    found.update(rows)
+        except sqlite3.Error as e:
+            # A locked or damaged cache only means the chunks get encoded
+            logger.warning(f"Could not read embedding cache: {str(e)}")
+            found = {}
+
+        results = {}
+        for position, text_hash in enumerate(hashes):
+            vector = found.get(text_hash)
+            if vector is not None and len(vector) == self.dimension * 4:
+                results[position] = np.frombuffer(vector, dtype=np.float32)
+        self.hits += len(results)
+        self.misses += len(texts) - len(results)
+        return results
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Store embeddings for texts"""
+        rows = [
+            (self.model_name, self.text_hash(text), np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        try:
+            with self._lock, self._conn:
+                inserted = self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                    rows
+                ).rowcount
+                self.entries += max(inserted, 0)
+        except sqlite3.Error as e:
+            # A cache write failure only costs a recomputation later
+            logger.warning(f"Could not write embedding cache: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": self.entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
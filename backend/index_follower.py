@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class IndexFollower:
+    """Keep a read-only vector store in step with the process writing it.
+
+    On every tick the follower first tries to take over as the writer, so
+    one worker promotes itself as soon as the writer exits. Otherwise it
+    applies the records the writer has logged since the last tick, or
+    reloads the store once the writer has compacted into a new generation.
+    The blocking work runs in a worker thread while searches continue.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        interval_seconds: float = 1.0,
+        on_promote: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        self.vector_store = vector_store
+        self.interval_seconds = interval_seconds
+        self.on_promote = on_promote
+        self._task = None
+        self._last_check = None
+
+        # Counters
+        self.checks = 0
+        self.records_applied = 0
+        self.reloads = 0
+        self.errors = 0
+        self.promoted = False
+
+    def start(self):
+        """Start following on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                if await asyncio.to_thread(self.vector_store.promote):
+                    self.promoted = True
+                    if self.on_promote is not None:
+                        await self.on_promote()
+                    return
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Could not follow vector store changes: {str(e)}")
+
+    def refresh(self):
+        """Bring the store up to date with the files on disk"""
+        self.checks += 1
+        self._last_check = time.monotonic()
+        if not self.vector_store.stale:
+            try:
+                self.records_applied += self.vector_store.catch_up()
+                return
+            except FileNotFoundError:
+                # A compaction removed a log before it was read; the new
+                # snapshot holds everything it did
+                pass
+        self.vector_store.reload()
+        self.reloads += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "role": "reader" if self.vector_store.read_only else "writer",
+            "interval_seconds": self.interval_seconds,
+            "checks": self.checks,
+            "records_applied": self.records_applied,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "promoted": self.promoted,
+            "seconds_since_check": time.monotonic() - self._last_check if self._last_check else None
+        }
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
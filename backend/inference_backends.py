@@ -0,0 +1,144 @@
+import logging
+import os
+import platform
+import shutil
+from pathlib import Path
+from typing import Callable
+
+from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer, pipeline
+
+logger = logging.getLogger(__name__)
+
+# PyTorch fp32, ONNX Runtime fp32, or ONNX Runtime with int8 weights
+INFERENCE_BACKENDS = ("torch", "onnx", "int8")
+
+# ONNX Runtime dynamic quantization preset; avx2 runs on any recent x86 CPU
+QUANTIZATION_TARGET = "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2"
+
+ONNX_INSTALL_HINT = 'The onnx and int8 inference backends need Optimum and ONNX Runtime: pip install "sentence-transformers[onnx]"'
+
+
+def check_backend(backend: str):
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unsupported inference backend: {backend}. Allowed: {', '.join(INFERENCE_BACKENDS)}")
+
+
+def embedding_model_key(model_name: str, backend: str) -> str:
+    """Name embeddings are cached under: int8 vectors differ slightly from fp32 ones"""
+    return f"{model_name}@int8" if backend == "int8" else model_name
+
+
+def _model_dir(cache_dir: str, model_name: str, variant: str) -> Path:
+    return Path(cache_dir) / model_name.replace("/", "--") / variant
+
+
+def _build_once(path: Path, build: Callable[[Path], None]) -> Path:
+    """Build a model directory with build(work_dir) unless it already exists.
+
+    The directory is built under a temporary name and renamed into place
+    when complete, so an interrupted export is never mistaken for a finished
+    one and concurrent server processes do not read a half-written model.
+    """
+    if path.exists():
+        return path
+    work_dir = path.with_name(f"{path.name}.partial-{os.getpid()}")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True)
+    try:
+        build(work_dir)
+        work_dir.rename(path)
+    except OSError:
+        # Another process finished the same export first
+        if not path.exists():
+            raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return path
+
+
+def load_embedding_model(model_name: str, backend: str = "torch", cache_dir: str = "./data/models") -> SentenceTransformer:
+    """SentenceTransformer running on a backend.
+
+    ONNX exports and their int8 quantization are made on first use and
+    kept under cache_dir, so later starts only load them.
+    """
+    check_backend(backend)
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    try:
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        raise ImportError(ONNX_INSTALL_HINT)
+
+    def export(work_dir: Path):
+        logger.info(f"Exporting {model_name} to ONNX")
+        SentenceTransformer(model_name, backend="onnx").save_pretrained(str(work_dir))
+
+    onnx_dir = _build_once(_model_dir(cache_dir, model_name, "embedding-onnx"), export)
+    if backend == "onnx":
+        return SentenceTransformer(str(onnx_dir), backend="onnx")
+
+    def quantize(work_dir: Path):
+        logger.info(f"Quantizing {model_name} to int8 ({QUANTIZATION_TARGET})")
+        shutil.copytree(onnx_dir, work_dir, dirs_exist_ok=True)
+        model = SentenceTransformer(str(work_dir), backend="onnx")
+        # Written next to the fp32 file as onnx/model_qint8_<target>.onnx
+        export_dynamic_quantized_onnx_model(model, QUANTIZATION_TARGET, str(work_dir))
+
+    int8_dir = _build_once(_model_dir(cache_dir, model_name, "embedding-int8"), quantize)
+    return SentenceTransformer(
+        str(int8_dir),
+        backend="onnx",
+        model_kwargs={"file_name": f"onnx/model_qint8_{QUANTIZATION_TARGET}.onnx"}
+    )
+
+
+def load_generator(model_name: str, backend: str = "torch", cache_dir: str = "./data/models"):
+    """text2text-generation pipeline running on a backend.
+
+    The ONNX backends export the encoder and decoders with Optimum on first
+    use; int8 then quantizes each exported file's weights dynamically.
+    Both are kept under cache_dir.
+    """
+    check_backend(backend)
+    if backend == "torch":
+        return pipeline("text2text-generation", model=model_name, device=-1)  # CPU
+
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError:
+        raise ImportError(ONNX_INSTALL_HINT)
+
+    def export(work_dir: Path):
+        logger.info(f"Exporting {model_name} to ONNX")
+        ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True).save_pretrained(work_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(work_dir)
+
+    model_dir = _build_once(_model_dir(cache_dir, model_name, "generation-onnx"), export)
+
+    if backend == "int8":
+        source_dir = model_dir
+
+        def quantize(work_dir: Path):
+            logger.info(f"Quantizing {model_name} to int8 ({QUANTIZATION_TARGET})")
+            config = getattr(AutoQuantizationConfig, QUANTIZATION_TARGET)(is_static=False, per_channel=False)
+            # The quantizer handles one file at a time; names are kept so the
+            # model loads from the quantized directory unchanged
+            for onnx_file in sorted(source_dir.glob("*.onnx")):
+                quantizer = ORTQuantizer.from_pretrained(source_dir, file_name=onnx_file.name)
+                quantizer.quantize(quantization_config=config, save_dir=work_dir, file_suffix=None)
+            for other in source_dir.iterdir():
+                if other.is_file() and other.suffix != ".onnx" and not (work_dir / other.name).exists():
+                    shutil.copy2(other, work_dir / other.name)
+
+        model_dir = _build_once(_model_dir(cache_dir, model_name, "generation-int8"), quantize)
+
+    return pipeline(
+        "text2text-generation",
+        model=ORTModelForSeq2SeqLM.from_pretrained(model_dir),
+        tokenizer=AutoTokenizer.from_pretrained(model_dir)
+    )
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue cannot accept another job"""
+
+
+class IngestionJob:
+    """Progress record for one or more documents moving through the ingest pipeline"""
+
+    def __init__(self, files: List[Dict], job_id: Optional[str] = None):
+        self.job_id = job_id or str(uuid.uuid4())
+        # Each entry carries doc_id, filename and file_path plus per-file results
+        self.files = [
+            {
+                **file,
+                "status": "queued",
+                "chunk_count": 0,
+                "total_tokens": 0,
+                "pages_done": 0,
+                "pages_total": None,
+                "error": None
+            }
+            for file in files
+        ]
+
+        # Documents deleted while the job runs; their chunks are not indexed
+        self.deleted = set()
+
+        self.stage = "queued"
+        self.chunks_done = 0
+        self.chunks_total = None
+        self.error = None
+
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+        self._started = None
+        self._finished = None
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in ("done", "error")
+
+    def set_stage(self, stage: str):
+        self.stage = stage
+        if stage == "extracting" and self._started is None:
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.perf_counter()
+        if stage in ("done", "error"):
+            self.finished_at = datetime.now(timezone.utc)
+            self._finished = time.perf_counter()
+
+    def mark_deleted(self, doc_id: str):
+        for file in self.files:
+            if file["doc_id"] == doc_id:
+                file["status"] = "deleted"
+                self.deleted.add(doc_id)
+
+    def estimate_chunks(self):
+        """Estimate chunks_total from the pages parsed so far.
+
+        A file being parsed is extrapolated from its chunks per page and
+        files not started yet are assumed to match the average of the rest.
+        """
+        estimates = []
+        unstarted = 0
+        for file in self.files:
+            if file["status"] == "queued":
+                unstarted += 1
+            elif file["status"] == "processing" and file["pages_total"] and file["pages_done"]:
+                estimates.append(file["chunk_count"] * file["pages_total"] / file["pages_done"])
+            else:
+                estimates.append(file["chunk_count"])
+        total = sum(estimates)
+        if estimates and unstarted:
+            total += unstarted * total / len(estimates)
+        self.chunks_total = max(self.chunks_done, round(total))
+
+    def throughput(self) -> float:
+        """Chunks processed per second since the job started"""
+        if self._started is None:
+            return 0.0
+        elapsed = (self._finished or time.perf_counter()) - self._started
+        return self.chunks_done / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "stage": self.stage,
+            "files_total": len(self.files),
+            "files_done": sum(1 for file in self.files if file["status"] in ("ready", "error", "deleted")),
+            "chunks_done": self.chunks_done,
+            "chunks_total": self.chunks_total,
+            "chunks_per_second": round(self.throughput(), 2),
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "files": [
+                {key: value for key, value in file.items() if key != "file_path"}
+                for file in self.files
+            ]
+        }
+
+
+class IngestionQueue:
+    """Bounded queue of ingest jobs drained by a fixed pool of worker tasks"""
+
+    def __init__(
+        self,
+        handler: Callable[[IngestionJob], Awaitable[None]],
+        workers: int = 2,
+        max_pending: int = 100,
+        max_retained: int = 1000
+    ):
+        self.handler = handler
+        self.worker_count = max(1, workers)
+        self.max_pending = max_pending
+        self.max_retained = max_retained
+
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue = None
+        self._workers = []
+
+    def start(self):
+        """Start worker tasks on the running event loop"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        loop = asyncio.get_running_loop()
+        self._workers = [
+            loop.create_task(self._worker(i)) for i in range(self.worker_count)
+        ]
+
+    def is_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def submit(self, job: IngestionJob) -> IngestionJob:
+        """Queue a job without waiting; raises QueueFullError when at capacity"""
+        if self._queue is None:
+            raise RuntimeError("Ingestion queue has not been started")
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("Ingestion queue is full, retry later")
+
+        self.jobs[job.job_id] = job
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def mark_deleted(self, doc_id: str):
+        """Stop unfinished jobs from indexing a document that has been deleted"""
+        for job in self.jobs.values():
+            if not job.finished:
+                job.mark_deleted(doc_id)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the retention limit"""
+        excess = len(self.jobs) - self.max_retained
+        if excess <= 0:
+            return
+        for job_id in [j for j, job in self.jobs.items() if job.finished][:excess]:
+            del self.jobs[job_id]
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.handler(job)
+                if not job.finished:
+                    job.set_stage("done")
+            except Exception as e:
+                logger.error(f"Ingestion job {job.job_id} failed: {str(e)}")
+                job.error = str(e)
+                job.set_stage("error")
+            finally:
+                self._queue.task_done()
+
+    def get_stats(self) -> Dict:
+        """Get queue occupancy"""
+        active = sum(1 for job in self.jobs.values() if not job.finished and job.stage != "queued")
+        return {
+            "workers": self.worker_count,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "max_pending": self.max_pending,
+            "active": active
+        }
+
+    async def stop(self):
+        """Cancel worker tasks"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,173 @@
+import pickle
+import re
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Words, numbers and identifiers such as "305-1", "tco2e" or "market-based"
+_TERM = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+
+# Very common words carry no BM25 signal but have the longest postings
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have how in into is it its of on or "
+    "so than that the their there these this those to was were what when where which who why "
+    "will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms; compound identifiers are kept whole and also split"""
+    terms = []
+    for match in _TERM.finditer(text.lower()):
+        term = match.group()
+        if term in STOPWORDS:
+            continue
+        terms.append(term)
+        if not term.isalnum():
+            terms.extend(part for part in re.split(r"[-./]", term) if part and part not in STOPWORDS)
+    return terms
+
+
+class LexicalIndex:
+    """Incremental BM25 inverted index over chunk texts, keyed by vector ID.
+
+    Postings are append-only arrays of (ID, term frequency) per term, which
+    stay sorted because vector IDs only grow. Removing an ID only marks its
+    length as deleted; compact() drops its postings later, the same way
+    the vector index handles tombstones.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> (IDs, term frequencies)
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # Term count per ID; -1 for IDs never added or removed since
+        self._lengths = array('i')
+        self.live_count = 0
+        self.total_length = 0
+        self.removed_count = 0
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def add(self, ids: Iterable[int], texts: Iterable[str]):
+        for vector_id, text in zip(ids, texts):
+            vector_id = int(vector_id)
+            terms = tokenize(text)
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array('q'), array('i'))
+                postings[0].append(vector_id)
+                postings[1].append(count)
+
+            if vector_id >= len(self._lengths):
+                self._lengths.extend([-1] * (vector_id + 1 - len(self._lengths)))
+            self._lengths[vector_id] = len(terms)
+            self.live_count += 1
+            self.total_length += len(terms)
+
+    def remove(self, ids: Iterable[int]):
+        for vector_id in ids:
+            vector_id = int(vector_id)
+            if vector_id < len(self._lengths) and self._lengths[vector_id] >= 0:
+                self.total_length -= self._lengths[vector_id]
+                self._lengths[vector_id] = -1
+                self.live_count -= 1
+                self.removed_count += 1
+
+    def search(self, text: str, k: int, ids: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top k (IDs, BM25 scores), best first; ids limits the IDs that can match"""
+        terms = set(tokenize(text))
+        if not terms or self.live_count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)
+        average_length = max(self.total_length / self.live_count, 1.0)
+        # Score only the matched postings rather than a vector over every ID
+        matched_ids, contributions = [], []
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            term_ids = np.frombuffer(postings[0], dtype=np.int64)
+            frequencies = np.frombuffer(postings[1], dtype=np.int32).astype(np.float32)
+            doc_lengths = lengths[term_ids]
+            live = doc_lengths >= 0
+            if not live.any():
+                continue
+            term_ids, frequencies, doc_lengths = term_ids[live], frequencies[live], doc_lengths[live]
+            idf = np.log(1.0 + (self.live_count - len(term_ids) + 0.5) / (len(term_ids) + 0.5))
+            if ids is not None:
+                # Term statistics stay corpus-wide; only the candidates are limited
+                allowed = np.isin(term_ids, ids)
+                term_ids, frequencies, doc_lengths = term_ids[allowed], frequencies[allowed], doc_lengths[allowed]
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths / average_length)
+            matched_ids.append(term_ids)
+            contributions.append(idf * frequencies * (self.k1 + 1.0) / (frequencies + norm))
+
+        if not matched_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        unique_ids, positions = np.unique(np.concatenate(matched_ids), return_inverse=True)
+        scores = np.bincount(positions, weights=np.concatenate(contributions)).astype(np.float32)
+        top = np.arange(len(scores))
+        if len(top) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return unique_ids[top], scores[top]
+
+    def compact(self):
+        """Drop the postings of removed IDs"""
+        if self.removed_count == 0:
+            return
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)
+        for term in list(self._postings):
+            ids, frequencies = self._postings[term]
+            id_array = np.frombuffer(ids, dtype=np.int64)
+            live = lengths[id_array] >= 0
+            if live.all():
+                continue
+            if not live.any():
+                del self._postings[term]
+                continue
+            self._postings[term] = (
+                array('q', id_array[live].tobytes()),
+                array('i', np.frombuffer(frequencies, dtype=np.int32)[live].tobytes())
+            )
+        self.removed_count = 0
+
+    def serialize(self) -> bytes:
+        return pickle.dumps({
+            "k1": self.k1,
+            "b": self.b,
+            "postings": {term: (ids.tobytes(), freqs.tobytes()) for term, (ids, freqs) in self._postings.items()},
+            "lengths": self._lengths.tobytes(),
+            "live_count": self.live_count,
+            "total_length": self.total_length,
+            "removed_count": self.removed_count
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> "LexicalIndex":
+        state = pickle.loads(data)
+        index = cls(k1=state["k1"], b=state["b"])
+        for term, (ids, freqs) in state["postings"].items():
+            index._postings[term] = (array('q', ids), array('i', freqs))
+        index._lengths = array('i', state["lengths"])
+        index.live_count = state["live_count"]
+        index.total_length = state["total_length"]
+        index.removed_count = state["removed_count"]
+        return index
+
+    def get_stats(self) -> Dict:
+        return {
+            "chunks": self.live_count,
+            "terms": len(self._postings),
+            "postings": sum(len(ids) for ids, _ in self._postings.values()),
+            "removed": self.removed_count
+        }
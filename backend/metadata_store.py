@@ -0,0 +1,451 @@
+import mmap
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# One fixed-width row per chunk. Rows stay sorted by vector ID, and text
+# lives in a separate file addressed by (offset, length).
+ROW_DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('offset', '<i8'),
+    ('doc', '<i4'),
+    ('chunk_index', '<i4'),
+    ('token_count', '<i4'),
+    ('length', '<i4')
+])
+
+# Deleted rows keep their slot until compaction with doc set to -1
+DELETED = -1
+
+# Largest slice of text copied at once when writing a snapshot
+COPY_BYTES = 16 * 1024 * 1024
+
+
+@contextmanager
+def atomic_writer(path: Path) -> Iterator:
+    """Write a file under a temporary name and move it into place once synced"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class TextFile:
+    """Append-only UTF-8 text read back through a memory map.
+
+    Without a path the text is held in memory; legacy metadata is imported
+    that way until compaction writes it to disk.
+    """
+
+    def __init__(self, path: Optional[Path] = None, writable: bool = False):
+        self.path = Path(path) if path is not None else None
+        self._buffer = bytearray() if path is None else None
+        self._writer = open(self.path, 'ab') if path is not None and writable else None
+        self._size = self.path.stat().st_size if self.path is not None and self.path.exists() else 0
+        self._map = None
+        self._lock = threading.Lock()
+
+    def size(self) -> int:
+        return self._size
+
+    def refresh(self):
+        """Pick up text another process has appended to the file since"""
+        if self._writer is None and self.path is not None and self.path.exists():
+            self._size = self.path.stat().st_size
+
+    def append(self, data: bytes) -> int:
+        """Append bytes and return the offset they start at"""
+        offset = self._size
+        if self._buffer is not None:
+            self._buffer += data
+        else:
+            self._writer.write(data)
+            self._writer.flush()
+        self._size += len(data)
+        return offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        if length == 0:
+            return b""
+        if self._buffer is not None:
+            return bytes(self._buffer[offset:offset + length])
+        with self._lock:
+            # Appends past the mapped region need a fresh mapping
+            if self._map is None or len(self._map) < offset + length:
+                if self._map is not None:
+                    self._map.close()
+                with open(self.path, 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[offset:offset + length]
+
+    def sync(self):
+        if self._writer is not None:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None and not self._writer.closed:
+                self.sync()
+                self._writer.close()
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+
+class MetadataStore:
+    """Chunk metadata as fixed-width columns with chunk text kept on disk.
+
+    Each chunk is one row of ``ROW_DTYPE`` (doc_id and filename are stored
+    once per document in a small document table), so resident memory is a
+    few dozen bytes per chunk regardless of chunk size. Text is only read,
+    through a memory map, for the rows a caller asks for.
+
+    Files follow the vector store generations: ``chunks-<gen>.npy`` and
+    ``text-<gen>.bin`` are the snapshot written at compaction, and
+    ``text-<gen>.log`` receives the text of chunks added during that
+    generation. Write-ahead log records carry the rows, which point into
+    the text log, so the text must be appended before the record.
+
+    With ``mmap`` snapshot rows are mapped copy-on-write: they stay shared
+    with other processes until this one deletes or appends rows.
+    """
+
+    def __init__(self, directory: Path, read_only: bool = False, mmap: bool = False):
+        self.directory = Path(directory)
+        self.read_only = read_only
+        self.mmap = mmap
+
+        self._rows = np.zeros(0, dtype=ROW_DTYPE)
+        # Text segment each row's offset refers to
+        self._segment = np.zeros(0, dtype=np.int32)
+        self._size = 0
+        self._live = 0
+
+        # Document table: index -> (doc_id, filename), None once deleted
+        self._documents: List[Optional[Tuple[str, str]]] = []
+        self._doc_index: Dict[str, int] = {}
+        # Vector IDs belonging to each document index
+        self._doc_rows: Dict[int, List[np.ndarray]] = {}
+
+        self._segments: Dict[int, TextFile] = {}
+        self._next_segment = 0
+        self._log_segment = None
+        self._legacy_segment = None
+
+    def _snapshot_files(self, generation: int) -> Tuple[Path, Path]:
+        return (
+            self.directory / f"chunks-{generation:06d}.npy",
+            self.directory / f"text-{generation:06d}.bin"
+        )
+
+    def _log_file(self, generation: int) -> Path:
+        return self.directory / f"text-{generation:06d}.log"
+
+    def _add_segment(self, text_file: TextFile) -> int:
+        segment = self._next_segment
+        self._next_segment += 1
+        self._segments[segment] = text_file
+        return segment
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def needs_rewrite(self) -> bool:
+        """Whether imported legacy metadata is waiting to be written out by compaction"""
+        return self._legacy_segment is not None
+
+    def open_log(self, generation: int):
+        """Make the text log of a generation the target for new chunks"""
+        self._log_segment = self._add_segment(
+            TextFile(self._log_file(generation), writable=not self.read_only)
+        )
+
+    def load_snapshot(self, generation: int, documents: List[Optional[Tuple[str, str]]]):
+        """Load the rows and document table of a snapshot generation"""
+        chunks_file, text_file = self._snapshot_files(generation)
+        rows = np.load(chunks_file, mmap_mode='c' if self.mmap else None)
+        segment = self._add_segment(TextFile(text_file))
+
+        self._rows = rows
+        self._segment = np.full(len(rows), segment, dtype=np.int32)
+        self._size = len(rows)
+        self._live = len(rows)
+
+        self._documents = [tuple(doc) if doc is not None else None for doc in documents]
+        self._doc_index = {doc[0]: index for index, doc in enumerate(self._documents) if doc is not None}
+        self._doc_rows = {}
+        if len(rows):
+            order = np.argsort(rows['doc'], kind='stable')
+            doc_numbers, starts = np.unique(rows['doc'][order], return_index=True)
+            for doc, ids in zip(doc_numbers.tolist(), np.split(rows['id'][order], starts[1:])):
+                self._doc_rows[doc] = [ids]
+
+    def _reserve(self, count: int):
+        needed = self._size + count
+        if needed <= len(self._rows):
+            return
+        capacity = max(needed, 2 * len(self._rows), 1024)
+        rows = np.zeros(capacity, dtype=ROW_DTYPE)
+        rows[:self._size] = self._rows[:self._size]
+        segment = np.zeros(capacity, dtype=np.int32)
+        segment[:self._size] = self._segment[:self._size]
+        self._rows, self._segment = rows, segment
+
+    def _register_document(self, doc_id: str, filename: str) -> Tuple[int, bool]:
+        index = self._doc_index.get(doc_id)
+        if index is not None:
+            return index, False
+        index = len(self._documents)
+        self._documents.append((doc_id, filename))
+        self._doc_index[doc_id] = index
+        return index, True
+
+    def _append_rows(self, rows: np.ndarray, segment: int):
+        # Vector IDs only ever grow, which keeps the rows sorted for lookups
+        self._reserve(len(rows))
+        self._rows[self._size:self._size + len(rows)] = rows
+        self._segment[self._size:self._size + len(rows)] = segment
+        self._size += len(rows)
+        self._live += len(rows)
+
+        order = np.argsort(rows['doc'], kind='stable')
+        doc_numbers, starts = np.unique(rows['doc'][order], return_index=True)
+        for doc, ids in zip(doc_numbers.tolist(), np.split(rows['id'][order], starts[1:])):
+            self._doc_rows.setdefault(doc, []).append(ids)
+
+    def _build_rows(self, ids: np.ndarray, metadata_list: List[Dict], text_file: TextFile) -> Tuple[np.ndarray, List]:
+        encoded = [meta.get('text', '').encode('utf-8') for meta in metadata_list]
+        lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+        start = text_file.append(b"".join(encoded))
+
+        rows = np.zeros(len(metadata_list), dtype=ROW_DTYPE)
+        rows['id'] = ids
+        rows['offset'] = start + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        rows['length'] = lengths
+        rows['chunk_index'] = [meta.get('chunk_index', 0) for meta in metadata_list]
+        rows['token_count'] = [meta.get('token_count', 0) for meta in metadata_list]
+
+        new_documents = []
+        doc_numbers = []
+        for meta in metadata_list:
+            index, created = self._register_document(meta.get('doc_id'), meta.get('filename', 'Unknown'))
+            if created:
+                new_documents.append((index, *self._documents[index]))
+            doc_numbers.append(index)
+        rows['doc'] = doc_numbers
+        return rows, new_documents
+
+    def add(self, ids: np.ndarray, metadata_list: List[Dict]) -> Dict:
+        """Add chunk metadata and return the fields its log record needs.
+
+        Only doc_id, filename, chunk_index, text and token_count are kept.
+        """
+        rows, new_documents = self._build_rows(ids, metadata_list, self._segments[self._log_segment])
+        self._append_rows(rows, self._log_segment)
+        return {"rows": rows, "documents": new_documents}
+
+    def apply(self, record: Dict) -> bool:
+        """Apply a logged add; False if its text never reached the text log"""
+        rows = record["rows"]
+        text_file = self._segments[self._log_segment]
+        end = int((rows['offset'] + rows['length']).max()) if len(rows) else 0
+        if end > text_file.size():
+            # A read-only store may be following a log another process writes
+            text_file.refresh()
+            if end > text_file.size():
+                return False
+        for index, doc_id, filename in record["documents"]:
+            self._documents.extend([None] * (index + 1 - len(self._documents)))
+            self._documents[index] = (doc_id, filename)
+            self._doc_index[doc_id] = index
+        self._append_rows(rows, self._log_segment)
+        return True
+
+    def import_legacy(self, ids: np.ndarray, metadata_list: List[Dict]):
+        """Load metadata dicts from older snapshots and logs into memory"""
+        if self._legacy_segment is None:
+            self._legacy_segment = self._add_segment(TextFile())
+        rows, _ = self._build_rows(ids, metadata_list, self._segments[self._legacy_segment])
+        self._append_rows(rows, self._legacy_segment)
+
+    def delete_document(self, doc_id: str) -> Optional[np.ndarray]:
+        """Mark a document's rows deleted and return their vector IDs"""
+        index = self._doc_index.pop(doc_id, None)
+        if index is None:
+            return None
+        self._documents[index] = None
+        ids = np.concatenate(self._doc_rows.pop(index, [np.empty(0, dtype=np.int64)]))
+        positions = np.searchsorted(self._rows['id'][:self._size], ids)
+        self._rows['doc'][positions] = DELETED
+        self._live -= len(ids)
+        return ids
+
+    def _positions(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Row positions of IDs and whether each one is a live row"""
+        ids = np.asarray(ids, dtype=np.int64)
+        stored = self._rows['id'][:self._size]
+        positions = np.minimum(np.searchsorted(stored, ids), max(self._size - 1, 0))
+        if self._size == 0:
+            return positions, np.zeros(len(ids), dtype=bool)
+        found = (stored[positions] == ids) & (self._rows['doc'][positions] != DELETED)
+        return positions, found
+
+    def live_mask(self, ids: np.ndarray) -> np.ndarray:
+        return self._positions(ids)[1]
+
+    def ids_for_documents(self, doc_ids: List[str]) -> np.ndarray:
+        """Sorted vector IDs of the live rows of some documents"""
+        parts = []
+        for doc_id in dict.fromkeys(doc_ids):
+            index = self._doc_index.get(doc_id)
+            if index is not None:
+                parts.extend(self._doc_rows.get(index, []))
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts))
+
+    def live_ids(self) -> np.ndarray:
+        rows = self._rows[:self._size]
+        return rows['id'][rows['doc'] != DELETED]
+
+    def get(self, ids: np.ndarray) -> List[Optional[Dict]]:
+        """Full metadata, including text, for each ID (None if not live)"""
+        positions, found = self._positions(ids)
+        results = []
+        for position, live in zip(positions.tolist(), found.tolist()):
+            if not live:
+                results.append(None)
+                continue
+            row = self._rows[position]
+            doc_id, filename = self._documents[row['doc']]
+            text = self._segments[int(self._segment[position])].read(int(row['offset']), int(row['length']))
+            results.append({
+                'doc_id': doc_id,
+                'filename': filename,
+                'chunk_index': int(row['chunk_index']),
+                'text': text.decode('utf-8'),
+                'token_count': int(row['token_count'])
+            })
+        return results
+
+    def capture(self) -> Dict:
+        """Copy the live rows for a snapshot"""
+        rows = self._rows[:self._size]
+        live = rows['doc'] != DELETED
+        return {
+            "rows": rows[live].copy(),
+            "segments": self._segment[:self._size][live].copy(),
+            "documents": list(self._documents)
+        }
+
+    def write_snapshot(self, generation: int, capture: Dict):
+        """Write captured rows and their text as a snapshot generation.
+
+        Safe to run without the caller's lock: the captured segments no
+        longer receive appends once a new log has been opened.
+        """
+        chunks_file, text_file = self._snapshot_files(generation)
+        rows = capture["rows"]
+        segments = capture["segments"]
+        offsets, lengths = rows['offset'], rows['length'].astype(np.int64)
+
+        # Rows are mostly contiguous in their source files, so copy runs
+        # of them at a time rather than one chunk at a time
+        with atomic_writer(text_file) as f:
+            if len(rows):
+                breaks = np.flatnonzero(
+                    (segments[1:] != segments[:-1]) | (offsets[1:] != offsets[:-1] + lengths[:-1])
+                ) + 1
+                for start, end in zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [len(rows)]))):
+                    source = self._segments[int(segments[start])]
+                    begin = int(offsets[start])
+                    total = int(offsets[end - 1] + lengths[end - 1]) - begin
+                    for position in range(0, total, COPY_BYTES):
+                        f.write(source.read(begin + position, min(COPY_BYTES, total - position)))
+
+        snapshot_rows = rows.copy()
+        snapshot_rows['offset'] = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(rows) else []
+        with atomic_writer(chunks_file) as f:
+            np.save(f, snapshot_rows)
+        capture["offsets"] = snapshot_rows['offset']
+
+    def finish_snapshot(self, generation: int, capture: Dict):
+        """Point captured rows at the written snapshot and drop deleted rows"""
+        chunks_file, text_file = self._snapshot_files(generation)
+        segment = self._add_segment(TextFile(text_file))
+        positions = np.searchsorted(self._rows['id'][:self._size], capture["rows"]['id'])
+        self._rows['offset'][positions] = capture["offsets"]
+        self._segment[positions] = segment
+
+        if self.mmap:
+            # Share the new rows through the page cache, as after a load
+            self._map_snapshot(chunks_file, positions, segment)
+        else:
+            keep = self._rows['doc'][:self._size] != DELETED
+            self._rows = self._rows[:self._size][keep]
+            self._segment = self._segment[:self._size][keep]
+            self._size = len(self._rows)
+
+        # Only the new snapshot and the current log are referenced now
+        for number in list(self._segments):
+            if number not in (segment, self._log_segment):
+                self._segments.pop(number).close()
+        self._legacy_segment = None
+
+    def _map_snapshot(self, chunks_file: Path, positions: np.ndarray, segment: int):
+        """Swap the in-memory rows for a mapping of the snapshot just written.
+
+        Rows deleted since the capture stay in the mapping marked deleted,
+        and rows added since are appended after it, like after a load.
+        """
+        rows = self._rows[:self._size]
+        mapped = np.load(chunks_file, mmap_mode='c')
+        deleted = rows['doc'][positions] == DELETED
+        if deleted.any():
+            mapped['doc'][deleted] = DELETED
+        added = np.ones(self._size, dtype=bool)
+        added[positions] = False
+        added &= rows['doc'] != DELETED
+        later_rows, later_segments = rows[added], self._segment[:self._size][added]
+
+        self._rows = mapped
+        self._segment = np.full(len(mapped), segment, dtype=np.int32)
+        self._size = len(mapped)
+        if len(later_rows):
+            self._reserve(len(later_rows))
+            self._rows[self._size:self._size + len(later_rows)] = later_rows
+            self._segment[self._size:self._size + len(later_rows)] = later_segments
+            self._size += len(later_rows)
+
+    def remove_files(self, generation: int):
+        """Delete files from generations older than a completed snapshot"""
+        for path in self.directory.glob("*"):
+            match = re.fullmatch(r"(chunks|text)-(\d+)\.(npy|bin|log)", path.name)
+            if match and int(match.group(2)) < generation:
+                path.unlink(missing_ok=True)
+
+    def sync(self):
+        """Flush appended text to stable storage"""
+        if self._log_segment is not None:
+            self._segments[self._log_segment].sync()
+
+    def get_stats(self) -> Dict:
+        return {
+            "chunks": self._live,
+            "documents": len(self._doc_index),
+            "column_bytes": int(self._rows.nbytes + self._segment.nbytes),
+            "text_bytes": sum(text_file.size() for text_file in self._segments.values())
+        }
+
+    def close(self):
+        for text_file in self._segments.values():
+            text_file.close()
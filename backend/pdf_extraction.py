@@ -0,0 +1,24 @@
+"""PDF text extraction helpers that run inside worker processes.
+
+This module only depends on PyPDF2 so that pool workers started with the
+spawn method do not have to import the embedding or generation models.
+"""
+from typing import List
+
+import PyPDF2
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    """Get the number of pages in a PDF"""
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) of a PDF"""
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [
+            reader.pages[number].extract_text() + "\n"
+            for number in range(start, min(end, len(reader.pages)))
+        ]
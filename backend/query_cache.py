@@ -0,0 +1,210 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import faiss
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Cache key form of a question: case-folded with whitespace collapsed"""
+    return _WHITESPACE.sub(" ", question).strip().casefold()
+
+
+class LRUCache:
+    """Bounded in-memory cache with least-recently-used eviction and a TTL.
+
+    Entries older than ``ttl_seconds`` are treated as missing (0 disables
+    expiry). A ``max_entries`` of 0 disables the cache entirely.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 0, name: str = "cache"):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value for key, or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class SemanticCache:
+    """Answers to past questions, matched by question embedding similarity.
+
+    Question embeddings are kept normalized in a small inner-product FAISS
+    index, so a paraphrase whose cosine similarity to a cached question is
+    at least ``threshold`` reuses its answer. Entries also carry the search
+    parameters they were answered with, and belong to a single vector store
+    version: a newer version empties the cache and answers computed against
+    an older one are dropped.
+    """
+
+    # Nearest cached questions checked for matching search parameters
+    CANDIDATES = 8
+
+    def __init__(
+        self,
+        dimension: int,
+        max_entries: int = 1000,
+        threshold: float = 0.95,
+        ttl_seconds: float = 0,
+        name: str = "semantic_answers"
+    ):
+        self.dimension = dimension
+        self.max_entries = max(0, max_entries)
+        self.threshold = threshold
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.name = name
+        self.version = None
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        # Entry ID -> (created, params, value), oldest use first
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _embedding(self, embedding) -> np.ndarray:
+        vector = np.array(embedding, dtype=np.float32).reshape(1, self.dimension)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _sync_version(self, version: int) -> bool:
+        """Move to version if it is newer; False if version is already stale"""
+        if self.version is not None and version < self.version:
+            return False
+        if version != self.version:
+            self._index.reset()
+            self._entries.clear()
+            self.version = version
+        return True
+
+    def _remove(self, entry_id: int):
+        del self._entries[entry_id]
+        self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    def get(self, embedding, params: Hashable, version: int) -> Optional[Any]:
+        """Answer cached for a similar question with the same params, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if not self._sync_version(version) or self._index.ntotal == 0:
+                self.misses += 1
+                return None
+            k = min(self.CANDIDATES, self._index.ntotal)
+            similarities, ids = self._index.search(self._embedding(embedding), k)
+            now = time.monotonic()
+            for similarity, entry_id in zip(similarities[0], ids[0].tolist()):
+                if similarity < self.threshold:
+                    break
+                created, entry_params, value = self._entries[entry_id]
+                if self.ttl_seconds and now - created > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                if entry_params == params:
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, embedding, params: Hashable, version: int, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            if not self._sync_version(version):
+                return
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(self._embedding(embedding), np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (time.monotonic(), params, value)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._index.reset()
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
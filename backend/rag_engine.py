@@ -1,18 +1,74 @@
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict
+import asyncio
+import concurrent.futures
+import threading
 import uuid
-from transformers import pipeline
+from functools import partial
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+from batching import MicroBatcher
+from context_builder import ContextBuilder
+from inference_backends import load_generator
+from query_cache import normalize_question
+
+
+def document_filter_key(doc_ids: List[str] = None):
+    """Hashable form of a document filter for cache keys; None when unfiltered"""
+    return None if doc_ids is None else tuple(sorted(set(doc_ids)))
 
 
 class RAGEngine:
-    def __init__(self, vector_store, document_processor):
+    def __init__(
+        self,
+        vector_store,
+        document_processor,
+        query_embedder=None,
+        question_cache=None,
+        answer_cache=None,
+        semantic_cache=None,
+        generation_max_batch: int = 8,
+        generation_max_wait_ms: float = 10.0,
+        generation_workers: int = 1,
+        max_input_tokens: int = 512,
+        inference_backend: str = "torch",
+        model_cache_dir: str = "./data/models"
+    ):
         self.vector_store = vector_store
         self.document_processor = document_processor
+        # Optional MicroBatcher that coalesces question embeddings across requests
+        self.query_embedder = query_embedder
+        # Optional LRUCaches for question embeddings and for finished answers
+        self.question_cache = question_cache
+        self.answer_cache = answer_cache
+        # Optional SemanticCache answering paraphrases of past questions
+        self.semantic_cache = semantic_cache
+
+        # Hugging Face local model (FREE), on PyTorch, ONNX Runtime or int8
+        # ONNX Runtime; exports are cached on disk
+        self.inference_backend = inference_backend
+        self.generator = load_generator("google/flan-t5-base", inference_backend, model_cache_dir)
+        # flan-t5 attends to about 512 input tokens; retrieved text is packed
+        # to fit rather than encoded in full and ignored
+        self.context_builder = ContextBuilder(
+            self.generator.tokenizer,
+            embed_fn=document_processor.embed_queries,
+            max_input_tokens=max_input_tokens
+        )
 
-        # Hugging Face local model (FREE)
-        self.generator = pipeline(
-            "text2text-generation",
-            model="google/flan-t5-base",
-            device=-1  # CPU
+        # Decoding runs on its own threads so the event loop, and searches
+        # and embeddings on other pools, never wait behind a slow answer
+        self.generation_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, generation_workers),
+            thread_name_prefix="generation"
+        )
+        # Concurrent answers are decoded together as one padded batch, with
+        # one batch in flight per generation thread
+        self.generation_batcher = MicroBatcher(
+            self._generate_batch,
+            max_batch_size=generation_max_batch,
+            max_wait_ms=generation_max_wait_ms,
+            max_concurrency=max(1, generation_workers),
+            name="generation"
         )
 
         self.system_prompt = (
@@ -22,30 +78,37 @@ class RAGEngine:
             "'The document does not contain this information.'"
         )
 
-    async def query(self, question: str, top_k: int = 5) -> Dict:
+    async def query(
+        self,
+        question: str,
+        top_k: int = 5,
+        nprobe: int = None,
+        ef_search: int = None,
+        doc_ids: List[str] = None
+    ) -> Dict:
+        """Answer a question; doc_ids limits retrieval to those documents"""
         try:
-            # Generate embedding
-            question_embedding = await self.document_processor.generate_embedding(question)
-
-            # Retrieve chunks
-            retrieved_chunks = self.vector_store.search(question_embedding, k=top_k)
+            retrieval = await self._retrieve(question, top_k, nprobe, ef_search, doc_ids)
+            if retrieval["cached"] is not None:
+                return self._cached_result(retrieval["cached"], retrieval["version"])
 
+            retrieved_chunks = retrieval["chunks"]
             if not retrieved_chunks:
-                return {
-                    "answer": "No relevant documents found.",
-                    "sources": [],
-                    "query_id": str(uuid.uuid4())
-                }
+                answer = "No relevant documents found."
+                sources = []
+            else:
+                context = await self._build_context(question, retrieval["embedding"], retrieved_chunks)
 
-            context = self._format_context(retrieved_chunks)
-
-            answer = self._generate_answer(question, context)
-            sources = self._format_sources(retrieved_chunks)
+                answer = await self._generate_answer(question, context)
+                sources = self._format_sources(retrieved_chunks)
 
+            self._remember(retrieval, answer, sources)
             return {
                 "answer": answer,
                 "sources": sources,
-                "query_id": str(uuid.uuid4())
+                "query_id": str(uuid.uuid4()),
+                "cached": False,
+                "index_version": retrieval["version"]
             }
 
         except Exception as e:
@@ -55,13 +118,332 @@ class RAGEngine:
                 "query_id": str(uuid.uuid4())
             }
 
-    def _format_context(self, chunks: List[Dict]) -> str:
-        context_parts = []
-        for chunk in chunks:
-            context_parts.append(
-                f"{chunk.get('text', '')}"
-            )
-        return "\n\n".join(context_parts)
+    async def query_stream(
+        self,
+        question: str,
+        top_k: int = 5,
+        nprobe: int = None,
+        ef_search: int = None,
+        doc_ids: List[str] = None
+    ) -> AsyncIterator[Dict]:
+        """Answer a question as a stream of events.
+
+        Yields a "sources" event once retrieval is done, a "token" event for
+        each piece of generated text and a final "done" event carrying the
+        whole result in the same shape query() returns. Failures end the
+        stream with an "error" event instead.
+        """
+        query_id = str(uuid.uuid4())
+        try:
+            retrieval = await self._retrieve(question, top_k, nprobe, ef_search, doc_ids)
+            if retrieval["cached"] is not None:
+                result = self._cached_result(retrieval["cached"], retrieval["version"])
+                result["query_id"] = query_id
+                yield {"event": "sources", "query_id": query_id, "sources": result["sources"], "cached": True}
+                yield {"event": "token", "text": result["answer"]}
+                yield {"event": "done", **result}
+                return
+
+            retrieved_chunks = retrieval["chunks"]
+            sources = self._format_sources(retrieved_chunks)
+            yield {"event": "sources", "query_id": query_id, "sources": sources, "cached": False}
+
+            if not retrieved_chunks:
+                answer = "No relevant documents found."
+                yield {"event": "token", "text": answer}
+            else:
+                pieces = []
+                context = await self._build_context(question, retrieval["embedding"], retrieved_chunks)
+                async for piece in self._stream_answer(question, context):
+                    pieces.append(piece)
+                    yield {"event": "token", "text": piece}
+                answer = "".join(pieces).strip()
+
+            self._remember(retrieval, answer, sources)
+            yield {
+                "event": "done",
+                "answer": answer,
+                "sources": sources,
+                "query_id": query_id,
+                "cached": False,
+                "index_version": retrieval["version"]
+            }
+
+        except Exception as e:
+            yield {"event": "error", "query_id": query_id, "answer": f"Error processing query: {str(e)}"}
+
+    async def query_batch(
+        self,
+        questions: List[str],
+        top_k: int = 5,
+        nprobe: int = None,
+        ef_search: int = None,
+        doc_ids: List[str] = None
+    ) -> List[Dict]:
+        """Answer many questions at once, returning one query() result per question.
+
+        Uncached questions are embedded in one call and searched with one
+        matrix search, and their answers are decoded in generation batches.
+        A failed answer only turns its own result into an error.
+        """
+        version = self.vector_store.version
+        search_params = (top_k, nprobe, ef_search, document_filter_key(doc_ids))
+        retrievals = []
+        for question in questions:
+            normalized = normalize_question(question)
+            retrieval = {
+                "question": question,
+                "normalized": normalized,
+                "version": version,
+                "cache_key": (normalized, *search_params, version),
+                "search_params": search_params,
+                "embedding": None,
+                "chunks": [],
+                "cached": None
+            }
+            if self.answer_cache is not None:
+                retrieval["cached"] = self.answer_cache.get(retrieval["cache_key"])
+            retrievals.append(retrieval)
+
+        results = [None] * len(questions)
+        try:
+            # One embedding call for every question missing from the question cache
+            pending = [retrieval for retrieval in retrievals if retrieval["cached"] is None]
+            unembedded = []
+            for retrieval in pending:
+                if self.question_cache is not None:
+                    retrieval["embedding"] = self.question_cache.get(retrieval["normalized"])
+                if retrieval["embedding"] is None:
+                    unembedded.append(retrieval)
+            if unembedded:
+                embeddings = await self.document_processor.embed_queries(
+                    [retrieval["question"] for retrieval in unembedded]
+                )
+                for retrieval, embedding in zip(unembedded, embeddings):
+                    retrieval["embedding"] = embedding
+                    if self.question_cache is not None:
+                        self.question_cache.put(retrieval["normalized"], embedding)
+
+            if self.semantic_cache is not None:
+                for retrieval in pending:
+                    retrieval["cached"] = self.semantic_cache.get(retrieval["embedding"], search_params, version)
+            pending = [retrieval for retrieval in pending if retrieval["cached"] is None]
+
+            # One matrix search for the rest
+            if pending:
+                hits = await asyncio.to_thread(
+                    self.vector_store.search_batch,
+                    [retrieval["embedding"] for retrieval in pending],
+                    k=top_k,
+                    nprobe=nprobe,
+                    ef_search=ef_search,
+                    query_texts=[retrieval["question"] for retrieval in pending],
+                    doc_ids=doc_ids
+                )
+                for retrieval, chunks in zip(pending, hits):
+                    retrieval["chunks"] = chunks
+        except Exception as e:
+            return [
+                {"answer": f"Error processing query: {str(e)}", "sources": [], "query_id": str(uuid.uuid4())}
+                for _ in questions
+            ]
+
+        answered = [retrieval for retrieval in pending if retrieval["chunks"]]
+        contexts = await asyncio.gather(
+            *[
+                self._build_context(retrieval["question"], retrieval["embedding"], retrieval["chunks"])
+                for retrieval in answered
+            ],
+            return_exceptions=True
+        )
+        prompts = {}
+        for retrieval, context in zip(answered, contexts):
+            if isinstance(context, Exception):
+                retrieval["error"] = context
+            else:
+                prompts[id(retrieval)] = self._build_prompt(retrieval["question"], context)
+
+        # Decode in generation-sized batches straight on the generation
+        # executor, so interactive queries interleave with a large batch
+        # instead of queueing behind all of it
+        answers = {}
+        keys = list(prompts)
+        batch_size = self.generation_batcher.max_batch_size
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            try:
+                decoded = await self._generate_batch([prompts[key] for key in batch])
+            except Exception as e:
+                decoded = [e] * len(batch)
+            answers.update(zip(batch, decoded))
+
+        for position, retrieval in enumerate(retrievals):
+            if retrieval["cached"] is not None:
+                results[position] = self._cached_result(retrieval["cached"], version)
+                continue
+            answer = answers.get(id(retrieval))
+            error = retrieval.get("error") or (answer if isinstance(answer, Exception) else None)
+            if error is not None:
+                results[position] = {
+                    "answer": f"Error processing query: {str(error)}",
+                    "sources": [],
+                    "query_id": str(uuid.uuid4())
+                }
+                continue
+            if not retrieval["chunks"]:
+                answer, sources = "No relevant documents found.", []
+            else:
+                sources = self._format_sources(retrieval["chunks"])
+            self._remember(retrieval, answer, sources)
+            results[position] = {
+                "answer": answer,
+                "sources": sources,
+                "query_id": str(uuid.uuid4()),
+                "cached": False,
+                "index_version": version
+            }
+        return results
+
+    async def _retrieve(
+        self,
+        question: str,
+        top_k: int,
+        nprobe: int,
+        ef_search: int,
+        doc_ids: List[str] = None
+    ) -> Dict:
+        """Check the answer caches, then search; "cached" holds a cache hit"""
+        normalized = normalize_question(question)
+        search_params = (top_k, nprobe, ef_search, document_filter_key(doc_ids))
+        # Read the version before searching: an add or delete that lands
+        # mid-query moves the version on, so this answer is never served
+        # for the newer index
+        version = self.vector_store.version
+        retrieval = {
+            "version": version,
+            "cache_key": (normalized, *search_params, version),
+            "search_params": search_params,
+            "embedding": None,
+            "chunks": [],
+            "cached": None
+        }
+        if self.answer_cache is not None:
+            retrieval["cached"] = self.answer_cache.get(retrieval["cache_key"])
+            if retrieval["cached"] is not None:
+                return retrieval
+
+        # Generate embedding
+        retrieval["embedding"] = await self._embed_question(question, normalized)
+
+        if self.semantic_cache is not None:
+            retrieval["cached"] = self.semantic_cache.get(retrieval["embedding"], search_params, version)
+            if retrieval["cached"] is not None:
+                return retrieval
+
+        # Retrieve chunks; FAISS releases the GIL, so search off the event loop
+        retrieval["chunks"] = await asyncio.to_thread(
+            self.vector_store.search,
+            retrieval["embedding"],
+            k=top_k,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            query_text=question,
+            doc_ids=doc_ids
+        )
+        return retrieval
+
+    def _remember(self, retrieval: Dict, answer: str, sources: List[Dict]):
+        """Store a freshly generated answer in the answer caches"""
+        entry = {"answer": answer, "sources": [dict(source) for source in sources]}
+        if self.answer_cache is not None:
+            self.answer_cache.put(retrieval["cache_key"], entry)
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(retrieval["embedding"], retrieval["search_params"], retrieval["version"], entry)
+
+    def _cached_result(self, cached: Dict, version: int) -> Dict:
+        return {
+            "answer": cached["answer"],
+            "sources": [dict(source) for source in cached["sources"]],
+            "query_id": str(uuid.uuid4()),
+            "cached": True,
+            "index_version": version
+        }
+
+    async def warm_caches(self, history: List[Dict]):
+        """Seed the answer caches from past queries, oldest first.
+
+        Each entry needs question, answer, sources, top_k and index_version,
+        plus doc_ids if it was filtered; only those answered against the
+        current vector store version are used.
+        """
+        version = self.vector_store.version
+        if self.answer_cache is None and self.semantic_cache is None:
+            return 0
+
+        # The latest answer to a repeated question wins
+        latest = {}
+        for entry in history:
+            if entry.get("index_version") == version:
+                key = (
+                    normalize_question(entry["question"]),
+                    (
+                        entry.get("top_k", 5),
+                        entry.get("nprobe"),
+                        entry.get("ef_search"),
+                        document_filter_key(entry.get("doc_ids"))
+                    )
+                )
+                latest.pop(key, None)
+                latest[key] = entry
+        if not latest:
+            return 0
+
+        # Questions are embedded like live queries, so the cached embeddings
+        # match them exactly and stay out of the chunk embedding cache
+        embeddings = await self.document_processor.embed_queries(
+            [entry["question"] for entry in latest.values()]
+        )
+        for ((key, search_params), entry), embedding in zip(latest.items(), embeddings):
+            cached = {"answer": entry["answer"], "sources": [dict(source) for source in entry["sources"]]}
+            if self.question_cache is not None:
+                self.question_cache.put(key, embedding)
+            if self.answer_cache is not None:
+                self.answer_cache.put((key, *search_params, version), cached)
+            if self.semantic_cache is not None:
+                self.semantic_cache.put(embedding, search_params, version, cached)
+        return len(latest)
+
+    async def warm_up(self, question: str = "What are the total Scope 1 emissions?"):
+        """Run one question through embedding, search and generation.
+
+        The first call into each model and index pays for lazy setup (thread
+        pools, ONNX sessions, memory-mapped pages); doing it here keeps that
+        off the first real query. Nothing is cached.
+        """
+        embeddings = await self.document_processor.embed_queries([question])
+        await asyncio.to_thread(self.vector_store.search, embeddings[0], k=5, query_text=question)
+        await self._generate_batch([self._build_prompt(question, "")])
+
+    async def _embed_question(self, question: str, normalized: str = None):
+        normalized = normalized or normalize_question(question)
+        if self.question_cache is not None:
+            embedding = self.question_cache.get(normalized)
+            if embedding is not None:
+                return embedding
+
+        if self.query_embedder is not None:
+            embedding = await self.query_embedder.submit(question)
+        else:
+            embedding = await self.document_processor.generate_embedding(question)
+
+        if self.question_cache is not None:
+            self.question_cache.put(normalized, embedding)
+        return embedding
+
+    async def _build_context(self, question: str, question_embedding, chunks: List[Dict]) -> str:
+        # The budget left for context is what the prompt around it does not use
+        prompt_tokens = self.context_builder.count_tokens(self._build_prompt(question, ""))
+        return await self.context_builder.build(question_embedding, chunks, prompt_tokens)
 
     def _format_sources(self, chunks: List[Dict]) -> List[Dict]:
         sources = []
@@ -79,8 +461,8 @@ class RAGEngine:
 
         return sources
 
-    def _generate_answer(self, question: str, context: str) -> str:
-        prompt = f"""
+    def _build_prompt(self, question: str, context: str) -> str:
+        return f"""
         Context:
         {context}
 
@@ -90,10 +472,74 @@ class RAGEngine:
         Answer:
         """
 
-        result = self.generator(
-            prompt,
-            max_length=256,
-            do_sample=False
+    async def _generate_answer(self, question: str, context: str) -> str:
+        return await self.generation_batcher.submit(self._build_prompt(question, context))
+
+    async def _generate_batch(self, prompts: List[str]) -> List[str]:
+        """Decode a batch of prompts with one pipeline call off the event loop"""
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            self.generation_executor,
+            partial(
+                self.generator,
+                prompts,
+                batch_size=len(prompts),
+                max_length=256,
+                do_sample=False
+            )
         )
+        return [result["generated_text"].strip() for result in results]
+
+    async def _stream_answer(self, question: str, context: str) -> AsyncIterator[str]:
+        """Generate an answer in a worker thread, yielding text as it is decoded"""
+        tokenizer = self.generator.tokenizer
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop = _StopEvent()
+        inputs = tokenizer(self._build_prompt(question, context), return_tensors="pt")
+
+        def generate():
+            try:
+                self.generator.model.generate(
+                    **inputs,
+                    streamer=streamer,
+                    stopping_criteria=StoppingCriteriaList([stop]),
+                    max_length=256,
+                    do_sample=False
+                )
+            except BaseException:
+                # Wake the reader; generate() only ends the stream on success
+                streamer.end()
+                raise
+
+        loop = asyncio.get_running_loop()
+        generation = loop.run_in_executor(self.generation_executor, generate)
+        pieces = iter(streamer)
+        try:
+            while True:
+                piece = await loop.run_in_executor(None, next, pieces, None)
+                if piece is None:
+                    break
+                if piece:
+                    yield piece
+        finally:
+            # A client that disconnects stops the decode at the next token
+            stop.set()
+            await generation
+
+
+    def shutdown(self):
+        """Wait for in-flight decodes and release the generation threads"""
+        self.generation_executor.shutdown(wait=True)
+
+
+class _StopEvent(StoppingCriteria):
+    """Stopping criterion that ends generation once set from another thread"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def set(self):
+        self._event.set()
 
-        return result[0]["generated_text"].strip()
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self._event.is_set()
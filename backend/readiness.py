@@ -0,0 +1,64 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+class ComponentLoader:
+    """Load the server's components in the background and track their state.
+
+    Each component goes from "pending" through "loading" to "ready", or to
+    "error" if loading it raised. Blocking loads run in worker threads, so
+    the event loop keeps answering health checks while models and indexes
+    load. The server is ready once every component is.
+    """
+
+    def __init__(self, names: List[str]):
+        self.started = time.monotonic()
+        self._components = {
+            name: {"state": "pending", "started": None, "seconds": None, "error": None}
+            for name in names
+        }
+
+    async def track(self, name: str, awaitable: Awaitable) -> Any:
+        """Await the loading of component name and return its result"""
+        component = self._components[name]
+        component["state"] = "loading"
+        component["started"] = time.monotonic()
+        try:
+            result = await awaitable
+        except Exception as e:
+            component["state"] = "error"
+            component["error"] = str(e)
+            raise
+        finally:
+            component["seconds"] = time.monotonic() - component["started"]
+        component["state"] = "ready"
+        return result
+
+    async def load(self, name: str, fn: Callable[[], Any]) -> Any:
+        """Run a blocking loader for component name in a worker thread"""
+        return await self.track(name, asyncio.to_thread(fn))
+
+    @property
+    def ready(self) -> bool:
+        return all(component["state"] == "ready" for component in self._components.values())
+
+    @property
+    def failed(self) -> bool:
+        return any(component["state"] == "error" for component in self._components.values())
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        components = {}
+        for name, component in self._components.items():
+            seconds = component["seconds"]
+            if seconds is None and component["started"] is not None:
+                # Still loading: time spent so far
+                seconds = now - component["started"]
+            components[name] = {"state": component["state"], "seconds": seconds, "error": component["error"]}
+        return {
+            "ready": self.ready,
+            "failed": self.failed,
+            "uptime_seconds": now - self.started,
+            "components": components
+        }
@@ -1,19 +1,30 @@
-from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import uuid
 from datetime import datetime, timezone
-import shutil
+import asyncio
+import hashlib
+import json
+import time
+import zipfile
 
-from document_processor import DocumentProcessor
 from vector_store import VectorStore
-from rag_engine import RAGEngine
+from writer_lock import WriterLockedError
+from admission import AdmissionController, DeadlineExceededError, OverloadedError
+from batching import MicroBatcher
+from query_cache import LRUCache, SemanticCache
+from ingestion import IngestionJob, IngestionQueue, QueueFullError
+from readiness import ComponentLoader
+from index_follower import IndexFollower
 
 # Configure logging first
 logging.basicConfig(
@@ -43,13 +54,201 @@ except Exception as e:
     client = AsyncIOMotorClient(mongo_url)
     db = client[os.environ['DB_NAME']]
 
-# Initialize RAG components
-document_processor = DocumentProcessor()
-vector_store = VectorStore(dimension=384, index_path="./data/faiss_index")
+# Embedding settings
+EMBEDDING_BATCH_SIZE = int(os.environ.get('EMBEDDING_BATCH_SIZE', '32'))
+EMBEDDING_WORKERS = int(os.environ.get('EMBEDDING_WORKERS', '1'))
+QUERY_EMBED_MAX_BATCH = int(os.environ.get('QUERY_EMBED_MAX_BATCH', '32'))
+QUERY_EMBED_MAX_WAIT_MS = float(os.environ.get('QUERY_EMBED_MAX_WAIT_MS', '5'))
 
-rag_engine = RAGEngine(
-    vector_store=vector_store,
-    document_processor=document_processor
+# Answer generation batching: concurrent prompts are decoded together
+GENERATION_MAX_BATCH = int(os.environ.get('GENERATION_MAX_BATCH', '8'))
+GENERATION_MAX_WAIT_MS = float(os.environ.get('GENERATION_MAX_WAIT_MS', '10'))
+GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', '1'))
+# Generator input budget in tokens; retrieved context is packed to fit
+GENERATOR_MAX_INPUT_TOKENS = int(os.environ.get('GENERATOR_MAX_INPUT_TOKENS', '512'))
+
+# Query admission: queries running at once, queries waiting for a slot
+# (more are rejected with 503) and the per-query deadline (0 disables)
+QUERY_MAX_CONCURRENT = int(os.environ.get('QUERY_MAX_CONCURRENT', '16'))
+QUERY_MAX_QUEUED = int(os.environ.get('QUERY_MAX_QUEUED', '64'))
+QUERY_TIMEOUT_SECONDS = float(os.environ.get('QUERY_TIMEOUT_SECONDS', '60'))
+
+# Batch queries: questions per request, batches running at once and
+# waiting, and the per-batch deadline (0 disables)
+BATCH_QUERY_MAX_QUESTIONS = int(os.environ.get('BATCH_QUERY_MAX_QUESTIONS', '1000'))
+BATCH_QUERY_MAX_CONCURRENT = int(os.environ.get('BATCH_QUERY_MAX_CONCURRENT', '2'))
+BATCH_QUERY_MAX_QUEUED = int(os.environ.get('BATCH_QUERY_MAX_QUEUED', '4'))
+BATCH_QUERY_TIMEOUT_SECONDS = float(os.environ.get('BATCH_QUERY_TIMEOUT_SECONDS', '900'))
+
+# Background ingestion settings
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', '2'))
+INGEST_MAX_PENDING = int(os.environ.get('INGEST_MAX_PENDING', '100'))
+
+# PDF parsing pool settings
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.environ.get('PDF_PAGES_PER_TASK', '25'))
+PDF_TASK_TIMEOUT = float(os.environ.get('PDF_TASK_TIMEOUT', '120'))
+
+# Persistent chunk embedding cache; set to an empty value to disable it
+EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH', './data/embedding_cache.sqlite3')
+
+# Inference backends for the embedding and generation models: torch, onnx
+# or int8 (the ONNX backends need optimum and onnxruntime), and where their
+# exported models are cached
+EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'torch').lower()
+GENERATION_BACKEND = os.environ.get('GENERATION_BACKEND', 'torch').lower()
+MODEL_CACHE_PATH = os.environ.get('MODEL_CACHE_PATH', './data/models')
+
+# In-memory caches for repeated questions; a size of 0 disables a cache
+QUESTION_CACHE_SIZE = int(os.environ.get('QUESTION_CACHE_SIZE', '10000'))
+ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', '1000'))
+ANSWER_CACHE_TTL_SECONDS = float(os.environ.get('ANSWER_CACHE_TTL_SECONDS', '3600'))
+# Paraphrases of recent questions reuse their answers above this cosine similarity
+SEMANTIC_CACHE_SIZE = int(os.environ.get('SEMANTIC_CACHE_SIZE', '1000'))
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', '0.95'))
+
+# Vector store write-ahead log is compacted into a new snapshot past this size
+VECTOR_COMPACT_WAL_MB = int(os.environ.get('VECTOR_COMPACT_WAL_MB', '64'))
+# ...or once this fraction of indexed vectors belongs to deleted documents
+VECTOR_COMPACT_TOMBSTONE_RATIO = float(os.environ.get('VECTOR_COMPACT_TOMBSTONE_RATIO', '0.1'))
+
+# Vector index type: flat (exact), hnsw, ivf or ivfpq
+VECTOR_INDEX_TYPE = os.environ.get('VECTOR_INDEX_TYPE', 'flat').lower()
+VECTOR_HNSW_M = int(os.environ.get('VECTOR_HNSW_M', '32'))
+VECTOR_IVF_NLIST = int(os.environ.get('VECTOR_IVF_NLIST', '1024'))
+VECTOR_PQ_M = int(os.environ.get('VECTOR_PQ_M', '48'))
+VECTOR_NPROBE = int(os.environ.get('VECTOR_NPROBE', '16'))
+VECTOR_EF_SEARCH = int(os.environ.get('VECTOR_EF_SEARCH', '64'))
+VECTOR_TRAIN_MIN = int(os.environ['VECTOR_TRAIN_MIN']) if os.environ.get('VECTOR_TRAIN_MIN') else None
+# Distance metric (l2 or cosine) and vector storage (float32, fp16 or int8)
+VECTOR_METRIC = os.environ.get('VECTOR_METRIC', 'l2').lower()
+VECTOR_STORAGE = os.environ.get('VECTOR_STORAGE', 'float32').lower()
+# Map index snapshots read-only so workers on one host share them
+VECTOR_MMAP = os.environ.get('VECTOR_MMAP', 'false').lower() in ('1', 'true', 'yes')
+# Hybrid retrieval: BM25 over chunk text fused with vector hits by reciprocal rank
+LEXICAL_INDEX = os.environ.get('LEXICAL_INDEX', 'true').lower() in ('1', 'true', 'yes')
+HYBRID_CANDIDATES = int(os.environ.get('HYBRID_CANDIDATES', '50'))
+HYBRID_RRF_K = int(os.environ.get('HYBRID_RRF_K', '60'))
+# Several server processes (uvicorn --workers) share one index: the first
+# to start writes it, the others follow its changes read-only and hand
+# uploads and deletes to it through MongoDB
+VECTOR_SHARED_INDEX = os.environ.get('VECTOR_SHARED_INDEX', 'false').lower() in ('1', 'true', 'yes')
+# How often followers check for index changes and the writer for queued work
+VECTOR_REFRESH_SECONDS = float(os.environ.get('VECTOR_REFRESH_SECONDS', '1.0'))
+
+# Question embeddings only depend on the model; answers are also keyed on
+# the vector store version, so any add or delete invalidates them
+question_cache = LRUCache(max_entries=QUESTION_CACHE_SIZE, name="question_embeddings")
+answer_cache = LRUCache(
+    max_entries=ANSWER_CACHE_SIZE,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    name="answers"
+)
+semantic_cache = SemanticCache(
+    dimension=384,
+    max_entries=SEMANTIC_CACHE_SIZE,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS
+)
+
+# Models and the index load in the background after startup (see
+# load_components), so the server answers health checks while they load
+document_processor = None
+vector_store = None
+query_embedder = None
+rag_engine = None
+index_follower = None
+startup = ComponentLoader(["embedding_model", "vector_store", "generator", "warmup"])
+
+
+def create_document_processor():
+    # Imported here so importing the server does not wait for torch
+    from document_processor import DocumentProcessor
+    return DocumentProcessor(
+        embedding_batch_size=EMBEDDING_BATCH_SIZE,
+        embedding_workers=EMBEDDING_WORKERS,
+        pdf_workers=PDF_WORKERS,
+        pdf_pages_per_task=PDF_PAGES_PER_TASK,
+        pdf_task_timeout=PDF_TASK_TIMEOUT,
+        embedding_cache_path=EMBEDDING_CACHE_PATH or None,
+        inference_backend=EMBEDDING_BACKEND,
+        model_cache_dir=MODEL_CACHE_PATH
+    )
+
+
+def create_vector_store(read_only: bool = False) -> VectorStore:
+    return VectorStore(
+        dimension=384,
+        index_path="./data/faiss_index",
+        compact_wal_bytes=VECTOR_COMPACT_WAL_MB * 1024 * 1024,
+        compact_tombstone_ratio=VECTOR_COMPACT_TOMBSTONE_RATIO,
+        index_type=VECTOR_INDEX_TYPE,
+        hnsw_m=VECTOR_HNSW_M,
+        ivf_nlist=VECTOR_IVF_NLIST,
+        pq_m=VECTOR_PQ_M,
+        nprobe=VECTOR_NPROBE,
+        ef_search=VECTOR_EF_SEARCH,
+        train_min_vectors=VECTOR_TRAIN_MIN,
+        mmap=VECTOR_MMAP,
+        metric=VECTOR_METRIC,
+        storage=VECTOR_STORAGE,
+        lexical=LEXICAL_INDEX,
+        hybrid_candidates=HYBRID_CANDIDATES,
+        rrf_k=HYBRID_RRF_K,
+        read_only=read_only
+    )
+
+
+def open_vector_store() -> VectorStore:
+    """Open the index for writing or, with a shared index, follow the worker that does"""
+    try:
+        return create_vector_store()
+    except WriterLockedError:
+        if not VECTOR_SHARED_INDEX:
+            raise
+        logger.info("Another worker writes the vector store; following it read-only")
+        return create_vector_store(read_only=True)
+
+
+def create_query_embedder() -> MicroBatcher:
+    # Shared query embedding service: concurrent questions are encoded together
+    return MicroBatcher(
+        document_processor.embed_queries,
+        max_batch_size=QUERY_EMBED_MAX_BATCH,
+        max_wait_ms=QUERY_EMBED_MAX_WAIT_MS,
+        name="query_embedding"
+    )
+
+
+def create_rag_engine():
+    from rag_engine import RAGEngine
+    return RAGEngine(
+        vector_store=vector_store,
+        document_processor=document_processor,
+        query_embedder=query_embedder,
+        question_cache=question_cache,
+        answer_cache=answer_cache,
+        semantic_cache=semantic_cache,
+        generation_max_batch=GENERATION_MAX_BATCH,
+        generation_max_wait_ms=GENERATION_MAX_WAIT_MS,
+        generation_workers=GENERATION_WORKERS,
+        max_input_tokens=GENERATOR_MAX_INPUT_TOKENS,
+        inference_backend=GENERATION_BACKEND,
+        model_cache_dir=MODEL_CACHE_PATH
+    )
+
+query_admission = AdmissionController(
+    max_concurrent=QUERY_MAX_CONCURRENT,
+    max_queued=QUERY_MAX_QUEUED,
+    timeout_seconds=QUERY_TIMEOUT_SECONDS,
+    name="query"
+)
+# Batches get their own slots, so a questionnaire never holds interactive ones
+batch_query_admission = AdmissionController(
+    max_concurrent=BATCH_QUERY_MAX_CONCURRENT,
+    max_queued=BATCH_QUERY_MAX_QUEUED,
+    timeout_seconds=BATCH_QUERY_TIMEOUT_SECONDS,
+    name="batch_query"
 )
 
 
@@ -60,8 +259,22 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 # Create the main app
 app = FastAPI()
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+
+
+async def require_ready():
+    """Refuse API requests with 503 until every component has loaded"""
+    if not startup.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=startup.get_stats(),
+            headers={"Retry-After": "5"}
+        )
+
+
+# Create a router with the /api prefix; it answers once the server is ready
+api_router = APIRouter(prefix="/api", dependencies=[Depends(require_ready)])
+# Health checks answer from the moment the server starts
+health_router = APIRouter(prefix="/api/health")
 
 
 # Models
@@ -76,6 +289,8 @@ class Document(BaseModel):
     status: str = "processing"
     chunk_count: int = 0
     total_tokens: int = 0
+    # sha256 of the file contents, used to detect re-uploads
+    content_hash: Optional[str] = None
 
 
 class DocumentResponse(BaseModel):
@@ -89,11 +304,39 @@ class DocumentResponse(BaseModel):
     status: str
     chunk_count: int
     total_tokens: int
+    job_id: Optional[str] = None
+    # True when the upload matched an existing document, which is returned instead
+    duplicate: bool = False
 
 
-class QueryRequest(BaseModel):
-    question: str
+class BulkUploadResponse(BaseModel):
+    # None when every file was a duplicate and nothing was queued
+    job_id: Optional[str]
+    documents: List[DocumentResponse]
+    skipped: List[dict]
+
+
+class QueryOptions(BaseModel):
     top_k: int = 5
+    # Approximate search knobs; None uses the server defaults
+    nprobe: Optional[int] = Field(default=None, ge=1)
+    ef_search: Optional[int] = Field(default=None, ge=1)
+    # Deadline for the request; capped by the server's timeout
+    timeout_seconds: Optional[float] = Field(default=None, gt=0)
+    # Only search documents matching every filter given
+    doc_ids: Optional[List[str]] = None
+    filenames: Optional[List[str]] = None
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
+
+class QueryRequest(QueryOptions):
+    question: str
+
+
+class BatchQueryRequest(QueryOptions):
+    # Every question is answered with the same options
+    questions: List[str] = Field(min_length=1)
 
 
 class QueryResponse(BaseModel):
@@ -101,102 +344,399 @@ class QueryResponse(BaseModel):
     question: str
     answer: str
     sources: List[dict]
+    cached: bool = False
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
+
+
+# Ingestion pipeline
+async def ingest_documents(job: IngestionJob):
+    """Parse, chunk, embed and index every document in a job.
+
+    Chunks from all files share embedding batches, the vector store is
+    persisted once at the end and document statuses are written with a
+    single bulk update.
+    """
+    batch_size = document_processor.embedding_batch_size
+    pending_chunks = []
+
+    # Index writes take the vector store lock and fsync the log, so they run
+    # in a worker thread while searches and other requests continue
+    async def flush():
+        texts = [meta['text'] for meta in pending_chunks]
+        embeddings = await document_processor.generate_embeddings(texts)
+        # Documents deleted while their chunks were being embedded are dropped
+        keep = [i for i, meta in enumerate(pending_chunks) if meta['doc_id'] not in job.deleted]
+        if keep:
+            await asyncio.to_thread(vector_store.add_vectors, embeddings[keep], [pending_chunks[i] for i in keep], persist=False)
+        job.chunks_done += len(pending_chunks)
+        pending_chunks.clear()
+
+    job.set_stage("extracting")
+    for file in job.files:
+        if file["doc_id"] in job.deleted:
+            continue
+        file["status"] = "processing"
+        stream = document_processor.stream_document(file["file_path"])
+        try:
+            # Chunks are embedded and indexed batch by batch as pages are parsed,
+            # so memory stays flat regardless of document size
+            async for chunks in document_processor.iter_chunk_batches(stream):
+                if file["doc_id"] in job.deleted:
+                    break
+                job.set_stage("embedding")
+                file["pages_total"] = stream.pages_total
+                file["pages_done"] = stream.pages_read
+                file["chunk_count"] = stream.chunk_count
+                job.estimate_chunks()
+
+                pending_chunks.extend(
+                    {
+                        'doc_id': file["doc_id"],
+                        'filename': file["filename"],
+                        'chunk_index': chunk['chunk_index'],
+                        'text': chunk['text'],
+                        'token_count': chunk['token_count']
+                    }
+                    for chunk in chunks
+                )
+                if len(pending_chunks) >= batch_size:
+                    await flush()
+
+            if file["doc_id"] in job.deleted:
+                continue
+            file["pages_done"] = stream.pages_read
+            file["chunk_count"] = stream.chunk_count
+            file["total_tokens"] = stream.total_tokens
+            file["status"] = "indexed"
+
+        except Exception as e:
+            if file["doc_id"] in job.deleted:
+                continue
+            logging.error(f"Error processing document {file['filename']}: {str(e)}")
+            file["status"] = "error"
+            file["error"] = str(e)
+            # Drop any chunks of this document that were already buffered or added
+            pending_chunks[:] = [meta for meta in pending_chunks if meta['doc_id'] != file["doc_id"]]
+            await asyncio.to_thread(vector_store.delete_by_document_id, file["doc_id"])
+
+    try:
+        if pending_chunks:
+            await flush()
+        job.chunks_total = job.chunks_done
+
+        # Persist the index once for the whole job
+        job.set_stage("indexing")
+        await asyncio.to_thread(vector_store.save_index)
+    except Exception as e:
+        logging.error(f"Error indexing documents: {str(e)}")
+        for file in job.files:
+            if file["status"] == "indexed":
+                file["status"] = "error"
+                file["error"] = str(e)
+                await asyncio.to_thread(vector_store.delete_by_document_id, file["doc_id"])
+
+    # A delete that raced a batch being added may have missed its chunks
+    for doc_id in job.deleted:
+        await asyncio.to_thread(vector_store.delete_by_document_id, doc_id)
+
+    for file in job.files:
+        if file["status"] == "indexed":
+            file["status"] = "ready"
+
+    # Update document statuses; deleted documents have no record left
+    updates = [
+        UpdateOne(
+            {"id": file["doc_id"]},
+            {"$set": {
+                "status": file["status"],
+                "chunk_count": file["chunk_count"],
+                "total_tokens": file["total_tokens"]
+            }}
+        )
+        for file in job.files
+        if file["status"] != "deleted"
+    ]
+    if updates:
+        await db.documents.bulk_write(updates, ordered=False)
+
+    remaining = [file for file in job.files if file["status"] != "deleted"]
+    if remaining and all(file["status"] == "error" for file in remaining):
+        raise Exception(remaining[0]["error"] if len(remaining) == 1 else "All documents failed to process")
+    job.set_stage("done")
+
+
+ingestion_queue = IngestionQueue(
+    ingest_documents,
+    workers=INGEST_WORKERS,
+    max_pending=INGEST_MAX_PENDING
+)
+
+# Jobs the writer claimed from the shared task queue, until their final
+# progress has been recorded
+shared_jobs: Dict[str, IngestionJob] = {}
+
+
+# Shared index tasks: with VECTOR_SHARED_INDEX every worker queues uploads
+# and deletes in MongoDB and only the writer applies them to the index
+async def queue_index_task(task_type: str, task_id: Optional[str] = None, **fields):
+    await db.index_tasks.insert_one({
+        "task_id": task_id or str(uuid.uuid4()),
+        "type": task_type,
+        "status": "queued",
+        "attempts": 0,
+        "created_at": datetime.now(timezone.utc),
+        **fields
+    })
+
+
+async def ingestion_backlog_full() -> bool:
+    if VECTOR_SHARED_INDEX:
+        return await db.index_tasks.count_documents({"type": "ingest", "status": "queued"}) >= INGEST_MAX_PENDING
+    return ingestion_queue.is_full()
+
+
+async def run_index_task(task: Dict):
+    if task["type"] == "delete":
+        ingestion_queue.mark_deleted(task["doc_id"])
+        await asyncio.to_thread(vector_store.delete_by_document_id, task["doc_id"])
+        await db.index_tasks.delete_one({"task_id": task["task_id"]})
+        return
+
+    if task["attempts"] > 1:
+        # A writer that exited mid-job may have indexed part of it
+        for file in task["files"]:
+            await asyncio.to_thread(vector_store.delete_by_document_id, file["doc_id"])
+    job = ingestion_queue.submit(IngestionJob(task["files"], job_id=task["task_id"]))
+    shared_jobs[job.job_id] = job
+
+
+async def publish_shared_jobs():
+    """Record the progress of claimed jobs where every worker can read it"""
+    for job_id, job in list(shared_jobs.items()):
+        update = {"job": job.to_dict()}
+        if job.finished:
+            update.update(status="done", finished_at=datetime.now(timezone.utc))
+            del shared_jobs[job_id]
+        await db.index_tasks.update_one({"task_id": job_id}, {"$set": update})
+
+
+async def process_index_tasks():
+    """Claim queued tasks in order while the ingestion queue has room"""
+    while True:
+        try:
+            await publish_shared_jobs()
+            while not ingestion_queue.is_full():
+                task = await db.index_tasks.find_one_and_update(
+                    {"status": "queued"},
+                    {"$set": {"status": "claimed"}, "$inc": {"attempts": 1}},
+                    projection={"_id": 0},
+                    sort=[("created_at", 1)],
+                    return_document=ReturnDocument.AFTER
+                )
+                if task is None:
+                    break
+                await run_index_task(task)
+        except Exception as e:
+            logger.error(f"Could not process queued index tasks: {str(e)}")
+        await asyncio.sleep(VECTOR_REFRESH_SECONDS)
+
+
 # Routes
 @api_router.get("/")
 async def root():
     return {"message": "EcoIntel API - Climate & Sustainability Intelligence"}
 
 
+ALLOWED_EXTENSIONS = ['.pdf', '.txt', '.md', '.markdown']
+
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+def save_upload(filename: str, source) -> Document:
+    """Copy an uploaded file stream into the upload directory, hashing it on the way"""
+    doc_id = str(uuid.uuid4())
+    file_ext = Path(filename).suffix.lower()
+    file_path = UPLOAD_DIR / f"{doc_id}{file_ext}"
+    digest = hashlib.sha256()
+    with open(file_path, "wb") as buffer:
+        while True:
+            block = source.read(UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            buffer.write(block)
+
+    return Document(
+        id=doc_id,
+        filename=filename,
+        file_size=os.path.getsize(file_path),
+        file_type=file_ext,
+        status="processing",
+        content_hash=digest.hexdigest()
+    )
+
+
+def hash_file(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(UPLOAD_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+async def split_duplicates(docs: List[Document]) -> Tuple[List[Document], List[DocumentResponse]]:
+    """Separate new uploads from copies of documents already stored.
+
+    A copy is matched to an existing document that has not failed, or to an
+    earlier file in the same upload. Its saved file is removed and the
+    matching document is returned in its place.
+    """
+    existing = await db.documents.find(
+        {"content_hash": {"$in": [doc.content_hash for doc in docs]}, "status": {"$ne": "error"}},
+        {"_id": 0}
+    ).to_list(None)
+    known = {doc["content_hash"]: doc for doc in existing}
+
+    new_docs = []
+    duplicates = []
+    for doc in docs:
+        match = known.get(doc.content_hash)
+        if match is None:
+            known[doc.content_hash] = doc.model_dump()
+            new_docs.append(doc)
+            continue
+        (UPLOAD_DIR / f"{doc.id}{doc.file_type}").unlink(missing_ok=True)
+        duplicates.append(DocumentResponse(**match, duplicate=True))
+    return new_docs, duplicates
+
+
+async def queue_documents(docs: List[Document]) -> IngestionJob:
+    """Record documents as processing and hand them to the background workers"""
+    doc_dicts = []
+    for doc in docs:
+        doc_dict = doc.model_dump()
+        doc_dict['upload_date'] = doc_dict['upload_date'].isoformat()
+        doc_dicts.append(doc_dict)
+    await db.documents.insert_many(doc_dicts)
+
+    files = [
+        {
+            "doc_id": doc.id,
+            "filename": doc.filename,
+            "file_path": str(UPLOAD_DIR / f"{doc.id}{doc.file_type}")
+        }
+        for doc in docs
+    ]
+    job = IngestionJob(files)
+    if VECTOR_SHARED_INDEX:
+        # The writer claims the job, whichever worker received the upload
+        await queue_index_task("ingest", task_id=job.job_id, files=files, job=job.to_dict())
+        return job
+    try:
+        return ingestion_queue.submit(job)
+    except QueueFullError as e:
+        await db.documents.delete_many({"id": {"$in": [doc.id for doc in docs]}})
+        for doc in docs:
+            (UPLOAD_DIR / f"{doc.id}{doc.file_type}").unlink(missing_ok=True)
+        raise HTTPException(status_code=503, detail=str(e))
+
+
 @api_router.post("/documents/upload", response_model=DocumentResponse)
 async def upload_document(file: UploadFile = File(...)):
-    """Upload and process a document"""
+    """Upload a document and queue it for background processing"""
     try:
         # Validate file type
-        allowed_extensions = ['.pdf', '.txt', '.md', '.markdown']
         file_ext = Path(file.filename).suffix.lower()
         
-        if file_ext not in allowed_extensions:
-            raise HTTPException(status_code=400, detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}")
-        
-        # Generate document ID
-        doc_id = str(uuid.uuid4())
+        if file_ext not in ALLOWED_EXTENSIONS:
+            raise HTTPException(status_code=400, detail=f"Unsupported file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
         
-        # Save file
-        file_path = UPLOAD_DIR / f"{doc_id}{file_ext}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        if await ingestion_backlog_full():
+            raise HTTPException(status_code=503, detail="Ingestion queue is full, retry later")
         
-        # Get file size
-        file_size = os.path.getsize(file_path)
+        doc = save_upload(file.filename, file.file)
+        new_docs, duplicates = await split_duplicates([doc])
+        if duplicates:
+            return duplicates[0]
+        job = await queue_documents(new_docs)
         
-        # Create document record
-        doc = Document(
-            id=doc_id,
-            filename=file.filename,
-            file_size=file_size,
-            file_type=file_ext,
-            status="processing"
-        )
+        return DocumentResponse(**doc.model_dump(), job_id=job.job_id)
         
-        # Save to MongoDB
-        doc_dict = doc.model_dump()
-        doc_dict['upload_date'] = doc_dict['upload_date'].isoformat()
-        await db.documents.insert_one(doc_dict)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.post("/documents/bulk-upload", response_model=BulkUploadResponse)
+async def bulk_upload_documents(files: List[UploadFile] = File(...)):
+    """Upload many documents (or zip archives of them) as one ingest job"""
+    try:
+        if await ingestion_backlog_full():
+            raise HTTPException(status_code=503, detail="Ingestion queue is full, retry later")
         
-        # Process document in background (async)
-        try:
-            processed = await document_processor.process_document(str(file_path))
-            chunks = processed['chunks']
-            
-            # Generate embeddings for each chunk
-            embeddings = []
-            metadata_list = []
+        docs = []
+        skipped = []
+        for file in files:
+            file_ext = Path(file.filename).suffix.lower()
             
-            for chunk in chunks:
-                embedding = await document_processor.generate_embedding(chunk['text'])
-                embeddings.append(embedding)
-                metadata_list.append({
-                    'doc_id': doc_id,
-                    'filename': file.filename,
-                    'chunk_index': chunk['chunk_index'],
-                    'text': chunk['text'],
-                    'token_count': chunk['token_count']
-                })
-            
-            # Add to vector store
-            vector_store.add_vectors(embeddings, metadata_list)
-            
-            # Update document status
-            await db.documents.update_one(
-                {"id": doc_id},
-                {"$set": {
-                    "status": "ready",
-                    "chunk_count": len(chunks),
-                    "total_tokens": processed['total_tokens']
-                }}
-            )
-            
-            doc.status = "ready"
-            doc.chunk_count = len(chunks)
-            doc.total_tokens = processed['total_tokens']
-            
-        except Exception as e:
-            logging.error(f"Error processing document: {str(e)}")
-            await db.documents.update_one(
-                {"id": doc_id},
-                {"$set": {"status": "error"}}
-            )
-            raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+            if file_ext == '.zip':
+                try:
+                    with zipfile.ZipFile(file.file) as archive:
+                        for entry in archive.infolist():
+                            entry_name = Path(entry.filename).name
+                            if entry.is_dir() or entry_name.startswith('.') or '__MACOSX' in entry.filename:
+                                continue
+                            if Path(entry_name).suffix.lower() not in ALLOWED_EXTENSIONS:
+                                skipped.append({"filename": entry.filename, "error": "Unsupported file type"})
+                                continue
+                            with archive.open(entry) as source:
+                                docs.append(save_upload(entry_name, source))
+                except zipfile.BadZipFile:
+                    skipped.append({"filename": file.filename, "error": "Invalid zip archive"})
+            elif file_ext in ALLOWED_EXTENSIONS:
+                docs.append(save_upload(file.filename, file.file))
+            else:
+                skipped.append({"filename": file.filename, "error": "Unsupported file type"})
+        
+        if not docs:
+            raise HTTPException(status_code=400, detail=f"No supported files. Allowed: {', '.join(ALLOWED_EXTENSIONS)}, .zip")
+        
+        new_docs, duplicates = await split_duplicates(docs)
+        job = await queue_documents(new_docs) if new_docs else None
+        job_id = job.job_id if job else None
         
-        return doc
+        return BulkUploadResponse(
+            job_id=job_id,
+            documents=[DocumentResponse(**doc.model_dump(), job_id=job_id) for doc in new_docs] + duplicates,
+            skipped=skipped
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get progress of a background ingestion job"""
+    job = ingestion_queue.get(job_id)
+    if job:
+        return job.to_dict()
+    if VECTOR_SHARED_INDEX:
+        # Jobs claimed by another worker report progress through MongoDB
+        task = await db.index_tasks.find_one({"task_id": job_id, "type": "ingest"}, {"_id": 0, "job": 1})
+        if task:
+            return task["job"]
+    raise HTTPException(status_code=404, detail="Job not found")
+
+
 @api_router.get("/documents", response_model=List[DocumentResponse])
 async def get_documents():
     """Get all documents"""
@@ -222,8 +762,13 @@ async def delete_document(doc_id: str):
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        # Delete from vector store
-        vector_store.delete_by_document_id(doc_id)
+        # Delete from vector store; a follower leaves that to the writer
+        if vector_store.read_only:
+            await queue_index_task("delete", doc_id=doc_id)
+        else:
+            # A running ingest job must not index the document afterwards
+            ingestion_queue.mark_deleted(doc_id)
+            await asyncio.to_thread(vector_store.delete_by_document_id, doc_id)
         
         # Delete file
         file_ext = doc['file_type']
@@ -240,6 +785,60 @@ async def delete_document(doc_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+NO_DOCUMENTS_ANSWER = "No documents available. Please upload documents first."
+NO_MATCHING_DOCUMENTS_ANSWER = "No documents match the query filters."
+
+
+def iso_utc(value: datetime) -> str:
+    """ISO form of a datetime as stored in upload_date; naive values are taken as UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+async def resolve_document_filter(request: QueryOptions) -> Optional[List[str]]:
+    """IDs of the ready documents a query is limited to; None when it has no filters"""
+    conditions = {}
+    if request.doc_ids is not None:
+        conditions["id"] = {"$in": request.doc_ids}
+    if request.filenames is not None:
+        conditions["filename"] = {"$in": request.filenames}
+    # upload_date is stored as an ISO string, which sorts like the datetime
+    if request.uploaded_after is not None:
+        conditions.setdefault("upload_date", {})["$gte"] = iso_utc(request.uploaded_after)
+    if request.uploaded_before is not None:
+        conditions.setdefault("upload_date", {})["$lte"] = iso_utc(request.uploaded_before)
+    if not conditions:
+        return None
+    docs = await db.documents.find({**conditions, "status": "ready"}, {"_id": 0, "id": 1}).to_list(None)
+    return [doc["id"] for doc in docs]
+
+
+def query_record(question: str, request: QueryOptions, result: Dict, doc_ids: Optional[List[str]] = None) -> Dict:
+    """Query history entry for an answered question and the documents it was limited to"""
+    query_doc = {
+        "query_id": result['query_id'],
+        "question": question,
+        "answer": result['answer'],
+        "sources": result.get('sources', []),
+        "cached": result.get('cached', False),
+        "top_k": request.top_k,
+        "nprobe": request.nprobe,
+        "ef_search": request.ef_search,
+        "doc_ids": doc_ids,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+    # Errors carry no version, so they are never used to warm the caches
+    if 'index_version' in result:
+        query_doc["index_version"] = result['index_version']
+    return query_doc
+
+
+async def save_query(request: QueryRequest, result: Dict, doc_ids: Optional[List[str]] = None):
+    """Record an answered query in the query history"""
+    await db.queries.insert_one(query_record(request.question, request, result, doc_ids))
+
+
 @api_router.post("/query", response_model=QueryResponse)
 async def query_documents(request: QueryRequest):
     """Query documents using RAG"""
@@ -250,34 +849,187 @@ async def query_documents(request: QueryRequest):
             return QueryResponse(
                 query_id=str(uuid.uuid4()),
                 question=request.question,
-                answer="No documents available. Please upload documents first.",
+                answer=NO_DOCUMENTS_ANSWER,
+                sources=[]
+            )
+        doc_ids = await resolve_document_filter(request)
+        if doc_ids == []:
+            return QueryResponse(
+                query_id=str(uuid.uuid4()),
+                question=request.question,
+                answer=NO_MATCHING_DOCUMENTS_ANSWER,
                 sources=[]
             )
         
-        # Process query
-        result = await rag_engine.query(request.question, top_k=request.top_k)
+        # Process query in an admission slot, under its deadline
+        result = await query_admission.run(
+            rag_engine.query(
+                request.question,
+                top_k=request.top_k,
+                nprobe=request.nprobe,
+                ef_search=request.ef_search,
+                doc_ids=doc_ids
+            ),
+            timeout_seconds=request.timeout_seconds
+        )
         
         # Save query to database
-        query_doc = {
-            "query_id": result['query_id'],
-            "question": request.question,
-            "answer": result['answer'],
-            "sources": result['sources'],
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        await db.queries.insert_one(query_doc)
+        await save_query(request, result, doc_ids)
         
         return QueryResponse(
             query_id=result['query_id'],
             question=request.question,
             answer=result['answer'],
-            sources=result['sources']
+            sources=result['sources'],
+            cached=result.get('cached', False)
         )
         
+    except OverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_documents_batch(request: BatchQueryRequest):
+    """Answer many questions that share the same options in one request.
+
+    The questions are embedded together, searched with one matrix search
+    and answered in generation batches; the query history is written with
+    one bulk insert. Results come back in question order.
+    """
+    try:
+        if len(request.questions) > BATCH_QUERY_MAX_QUESTIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many questions: {len(request.questions)} (limit {BATCH_QUERY_MAX_QUESTIONS})"
+            )
+
+        doc_count = await db.documents.count_documents({"status": "ready"})
+        doc_ids = await resolve_document_filter(request) if doc_count else None
+        if doc_count == 0 or doc_ids == []:
+            answer = NO_DOCUMENTS_ANSWER if doc_count == 0 else NO_MATCHING_DOCUMENTS_ANSWER
+            return BatchQueryResponse(results=[
+                QueryResponse(query_id=str(uuid.uuid4()), question=question, answer=answer, sources=[])
+                for question in request.questions
+            ])
+
+        results = await batch_query_admission.run(
+            rag_engine.query_batch(
+                request.questions,
+                top_k=request.top_k,
+                nprobe=request.nprobe,
+                ef_search=request.ef_search,
+                doc_ids=doc_ids
+            ),
+            timeout_seconds=request.timeout_seconds
+        )
+
+        await db.queries.insert_many([
+            query_record(question, request, result, doc_ids)
+            for question, result in zip(request.questions, results)
+        ])
+
+        return BatchQueryResponse(results=[
+            QueryResponse(
+                query_id=result['query_id'],
+                question=question,
+                answer=result['answer'],
+                sources=result['sources'],
+                cached=result.get('cached', False)
+            )
+            for question, result in zip(request.questions, results)
+        ])
+
+    except HTTPException:
+        raise
+    except OverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def sse_event(event: Dict) -> str:
+    """Format a RAG stream event as a Server-Sent Event"""
+    data = {key: value for key, value in event.items() if key != "event"}
+    return f"event: {event['event']}\ndata: {json.dumps(data)}\n\n"
+
+
+@api_router.post("/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """Query documents using RAG, streaming the answer as Server-Sent Events.
+
+    Emits a "sources" event as soon as retrieval finishes, "token" events
+    while the answer is generated and a final "done" (or "error") event with
+    the complete result, which is also saved to the query history.
+    """
+    try:
+        doc_count = await db.documents.count_documents({"status": "ready"})
+        doc_ids = await resolve_document_filter(request) if doc_count else None
+        # Turn overload away before the stream starts, while a status code can still be sent
+        query_admission.check()
+    except OverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    timeout = query_admission.deadline(request.timeout_seconds)
+
+    async def events():
+        if doc_count == 0:
+            query_id = str(uuid.uuid4())
+            yield sse_event({"event": "sources", "query_id": query_id, "sources": [], "cached": False})
+            yield sse_event({"event": "token", "text": NO_DOCUMENTS_ANSWER})
+            yield sse_event({"event": "done", "query_id": query_id, "answer": NO_DOCUMENTS_ANSWER, "sources": []})
+            return
+        if doc_ids == []:
+            query_id = str(uuid.uuid4())
+            yield sse_event({"event": "sources", "query_id": query_id, "sources": [], "cached": False})
+            yield sse_event({"event": "token", "text": NO_MATCHING_DOCUMENTS_ANSWER})
+            yield sse_event({
+                "event": "done", "query_id": query_id, "answer": NO_MATCHING_DOCUMENTS_ANSWER, "sources": []
+            })
+            return
+
+        deadline = time.monotonic() + timeout if timeout else None
+        stream = rag_engine.query_stream(
+            request.question,
+            top_k=request.top_k,
+            nprobe=request.nprobe,
+            ef_search=request.ef_search,
+            doc_ids=doc_ids
+        )
+        query_id = str(uuid.uuid4())
+        try:
+            async with query_admission.slot(wait_seconds=timeout):
+                async for event in stream:
+                    query_id = event.get("query_id", query_id)
+                    if deadline is not None and time.monotonic() > deadline:
+                        # Closing the stream stops the decode
+                        query_admission.timed_out += 1
+                        raise DeadlineExceededError(f"Request did not finish within {timeout:g} seconds")
+                    if event["event"] in ("done", "error"):
+                        try:
+                            await save_query(request, event, doc_ids)
+                        except Exception as e:
+                            logger.warning(f"Could not save streamed query: {str(e)}")
+                    yield sse_event(event)
+        except (OverloadedError, DeadlineExceededError) as e:
+            yield sse_event({"event": "error", "query_id": query_id, "answer": str(e)})
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @api_router.get("/queries", response_model=List[QueryResponse])
 async def get_queries(limit: int = 20):
     """Get query history"""
@@ -294,6 +1046,22 @@ async def get_queries(limit: int = 20):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@health_router.get("/live")
+async def liveness():
+    """The process is up and serving requests; 503 once startup has failed, so it gets restarted"""
+    uptime = time.monotonic() - startup.started
+    if startup.failed:
+        return JSONResponse(status_code=503, content={"status": "failed", "uptime_seconds": uptime})
+    return {"status": "alive", "uptime_seconds": uptime}
+
+
+@health_router.get("/ready")
+async def readiness():
+    """Whether every component has loaded, with each one's state and load time"""
+    stats = startup.get_stats()
+    return JSONResponse(status_code=200 if stats["ready"] else 503, content=stats)
+
+
 @api_router.get("/stats")
 async def get_stats():
     """Get system statistics"""
@@ -307,13 +1075,33 @@ async def get_stats():
             "total_documents": doc_count,
             "ready_documents": ready_count,
             "total_queries": query_count,
-            "total_vectors": vector_count
+            "total_vectors": vector_count,
+            "vector_index": vector_store.get_index_info(),
+            "inference_backends": {
+                "embedding": document_processor.inference_backend,
+                "generation": rag_engine.inference_backend
+            },
+            "query_embedding": query_embedder.get_stats(),
+            "generation": rag_engine.generation_batcher.get_stats(),
+            "context": rag_engine.context_builder.get_stats(),
+            "query_admission": query_admission.get_stats(),
+            "batch_query_admission": batch_query_admission.get_stats(),
+            "embedding_cache": document_processor.embedding_cache.get_stats() if document_processor.embedding_cache else None,
+            "query_cache": {
+                "question_embeddings": question_cache.get_stats(),
+                "answers": answer_cache.get_stats(),
+                "semantic_answers": semantic_cache.get_stats()
+            },
+            "ingestion": ingestion_queue.get_stats(),
+            "shared_index": index_follower.get_stats() if index_follower else None,
+            "startup": startup.get_stats()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Include the router in the main app
+# Include the routers in the main app
+app.include_router(health_router)
 app.include_router(api_router)
 
 app.add_middleware(
@@ -325,9 +1113,120 @@ app.add_middleware(
 )
 
 
+async def backfill_content_hashes():
+    """Hash the stored files of documents uploaded before deduplication existed"""
+    try:
+        docs = await db.documents.find(
+            {"content_hash": {"$exists": False}},
+            {"_id": 0, "id": 1, "file_type": 1}
+        ).to_list(None)
+        for doc in docs:
+            file_path = UPLOAD_DIR / f"{doc['id']}{doc['file_type']}"
+            if file_path.exists():
+                content_hash = await asyncio.to_thread(hash_file, file_path)
+                await db.documents.update_one({"id": doc["id"]}, {"$set": {"content_hash": content_hash}})
+    except Exception as e:
+        logger.warning(f"Could not backfill document content hashes: {str(e)}")
+
+
+async def warm_query_caches():
+    """Seed the answer caches with recent queries answered against the current index"""
+    try:
+        limit = max(SEMANTIC_CACHE_SIZE, ANSWER_CACHE_SIZE)
+        if limit == 0:
+            return
+        history = await db.queries.find(
+            {"index_version": vector_store.version},
+            {"_id": 0, "question": 1, "answer": 1, "sources": 1, "top_k": 1,
+             "nprobe": 1, "ef_search": 1, "doc_ids": 1, "index_version": 1}
+        ).sort("timestamp", -1).limit(limit).to_list(limit)
+        warmed = await rag_engine.warm_caches(list(reversed(history)))
+        if warmed:
+            logger.info(f"Warmed query caches with {warmed} past questions")
+    except Exception as e:
+        logger.warning(f"Could not warm query caches: {str(e)}")
+
+
+async def start_writer():
+    """Start the work only the process writing the index does"""
+    ingestion_queue.start()
+    app.state.hash_backfill = asyncio.get_running_loop().create_task(backfill_content_hashes())
+    if VECTOR_SHARED_INDEX:
+        # Tasks claimed by a previous writer that exited were never finished
+        await db.index_tasks.update_many({"status": "claimed"}, {"$set": {"status": "queued"}})
+        app.state.index_tasks = asyncio.get_running_loop().create_task(process_index_tasks())
+
+
+async def load_components():
+    """Load the models and the index, warm them up, then start ingestion"""
+    global document_processor, vector_store, query_embedder, rag_engine, index_follower
+    try:
+        # The embedding model and the index are independent; load both at once
+        loaded = await asyncio.gather(
+            startup.load("embedding_model", create_document_processor),
+            startup.load("vector_store", open_vector_store),
+            return_exceptions=True
+        )
+        document_processor, vector_store = (None if isinstance(result, Exception) else result for result in loaded)
+        for result in loaded:
+            if isinstance(result, Exception):
+                raise result
+        query_embedder = create_query_embedder()
+        rag_engine = await startup.load("generator", create_rag_engine)
+        # One query end to end, so the first user does not pay for lazy setup
+        await startup.track("warmup", rag_engine.warm_up())
+    except Exception as e:
+        logger.error(f"Server failed to load: {str(e)}")
+        # A worker that cannot serve must not keep other workers from writing the index
+        if vector_store is not None:
+            vector_store.close()
+            vector_store = None
+        return
+    logger.info("Server ready")
+
+    if VECTOR_SHARED_INDEX:
+        index_follower = IndexFollower(vector_store, VECTOR_REFRESH_SECONDS, on_promote=start_writer)
+    if vector_store.read_only:
+        index_follower.start()
+    else:
+        await start_writer()
+    app.state.cache_warmup = asyncio.get_running_loop().create_task(warm_query_caches())
+
+
+@app.on_event("startup")
+async def start_loading():
+    # Models load in the background; /api/health/ready reports progress
+    app.state.component_loading = asyncio.get_running_loop().create_task(load_components())
+    try:
+        await db.documents.create_index("content_hash")
+        if VECTOR_SHARED_INDEX:
+            await db.index_tasks.create_index("task_id")
+            await db.index_tasks.create_index([("status", 1), ("created_at", 1)])
+            # Finished jobs stay readable for a week
+            await db.index_tasks.create_index("finished_at", expireAfterSeconds=7 * 24 * 3600)
+    except Exception as e:
+        logger.warning(f"Could not create MongoDB indexes: {str(e)}")
+
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+    app.state.component_loading.cancel()
+    if hasattr(app.state, "index_tasks"):
+        app.state.index_tasks.cancel()
+    if index_follower is not None:
+        await index_follower.stop()
+    await ingestion_queue.stop()
+    # Components that never loaded have nothing to release
+    if query_embedder is not None:
+        await query_embedder.stop()
+    if rag_engine is not None:
+        await rag_engine.generation_batcher.stop()
+        rag_engine.shutdown()
+    if document_processor is not None:
+        document_processor.shutdown()
+    if vector_store is not None:
+        vector_store.close()
 
 
 if __name__ == "__main__":
@@ -2,100 +2,1110 @@ import faiss
 import numpy as np
 import pickle
 import os
-from typing import List, Dict, Tuple
+import re
+import logging
+import threading
+from typing import List, Dict, Tuple, Union, Optional
 from pathlib import Path
 
+from lexical_index import LexicalIndex
+from metadata_store import MetadataStore
+from wal import WriteAheadLog
+from writer_lock import WriterLock, WriterLockedError
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq")
+
+# Cosine search runs as inner product over L2-normalized vectors
+METRICS = {"l2": faiss.METRIC_L2, "cosine": faiss.METRIC_INNER_PRODUCT}
+
+# How vector components are stored; IVF-PQ always stores PQ codes
+STORAGE_TYPES = {
+    "float32": None,
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit
+}
+IVF_ENCODINGS = {"float32": "Flat", "fp16": "SQfp16", "int8": "SQ8"}
+
+# Map index data from the file instead of copying it to the heap. Older
+# FAISS builds only know IO_FLAG_MMAP, which maps IVF lists.
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def index_spec(index_type: str, params: Dict) -> str:
+    """Readable description of an index type and the parameters that shape it"""
+    if index_type == "hnsw":
+        spec = f"hnsw(m={params['hnsw_m']})"
+    elif index_type == "ivf":
+        spec = f"ivf(nlist={params['ivf_nlist']})"
+    elif index_type == "ivfpq":
+        spec = f"ivfpq(nlist={params['ivf_nlist']},m={params['pq_m']})"
+    else:
+        spec = "flat"
+
+    # Defaults are left out so specs from older snapshots still match
+    options = []
+    if params.get("storage", "float32") != "float32" and index_type != "ivfpq":
+        options.append(params["storage"])
+    if params.get("metric", "l2") != "l2":
+        options.append(params["metric"])
+    return f"{spec}[{','.join(options)}]" if options else spec
+
+
+def needs_training(index_type: str, storage: str = "float32") -> bool:
+    # int8 scalar quantization learns a value range per dimension
+    return index_type in ("ivf", "ivfpq") or storage == "int8"
+
+
+def supports_remove(index_type: str) -> bool:
+    # HNSW graphs cannot drop nodes, so they are rebuilt instead
+    return index_type != "hnsw"
+
+
+def create_index(index_type: str, dimension: int, params: Dict) -> faiss.Index:
+    """Create an empty index that accepts caller-assigned 64-bit IDs"""
+    metric = METRICS[params.get("metric", "l2")]
+    storage = params.get("storage", "float32")
+    quantizer_type = STORAGE_TYPES[storage]
+    if index_type == "flat":
+        if quantizer_type is None:
+            return faiss.IndexIDMap2(faiss.IndexFlat(dimension, metric))
+        return faiss.IndexIDMap2(faiss.IndexScalarQuantizer(dimension, quantizer_type, metric))
+    if index_type == "hnsw":
+        if quantizer_type is None:
+            return faiss.IndexIDMap2(faiss.IndexHNSWFlat(dimension, params['hnsw_m'], metric))
+        return faiss.IndexIDMap2(faiss.IndexHNSWSQ(dimension, quantizer_type, params['hnsw_m'], metric))
+    if index_type in ("ivf", "ivfpq"):
+        # IVF indexes store IDs natively; the hashtable direct map allows
+        # reconstructing and removing vectors by ID
+        if index_type == "ivf":
+            description = f"IVF{params['ivf_nlist']},{IVF_ENCODINGS[storage]}"
+        else:
+            description = f"IVF{params['ivf_nlist']},PQ{params['pq_m']}"
+        index = faiss.index_factory(dimension, description, metric)
+        faiss.extract_index_ivf(index).set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    raise ValueError(f"Unsupported index type: {index_type}. Allowed: {', '.join(INDEX_TYPES)}")
+
+
+def bytes_per_vector(index: faiss.Index, params: Dict) -> float:
+    """Approximate memory per stored vector: codes, IDs and graph links"""
+    if isinstance(index, faiss.IndexIDMap2):
+        inner = faiss.downcast_index(index.index)
+        # ID array plus the reverse ID hash map
+        overhead = 8 + 16
+    else:
+        inner = faiss.extract_index_ivf(index)
+        # IDs in the inverted lists plus the hashtable direct map
+        overhead = 8 + 16
+    if isinstance(inner, faiss.IndexHNSW):
+        code_size = faiss.downcast_index(inner.storage).code_size
+        # Base-layer links dominate: 2 * M neighbours of 4 bytes each
+        overhead += 2 * params['hnsw_m'] * 4
+    else:
+        code_size = inner.code_size
+    return float(code_size + overhead)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows for cosine search"""
+    vectors = np.array(vectors, dtype=np.float32, copy=True, order='C')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def export_vectors(index: faiss.Index) -> Tuple[np.ndarray, np.ndarray]:
+    """Get every (id, vector) pair stored in an index"""
+    if index.ntotal == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, index.d), dtype=np.float32)
+    if isinstance(index, faiss.IndexIDMap2):
+        ids = faiss.vector_to_array(index.id_map)
+        return ids, index.index.reconstruct_n(0, index.ntotal)
+
+    ivf = faiss.extract_index_ivf(index)
+    invlists = ivf.invlists
+    ids = np.concatenate([
+        faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+        for list_no in range(ivf.nlist)
+        if invlists.list_size(list_no) > 0
+    ])
+    return ids, index.reconstruct_batch(ids)
+
+
+def remove_vectors(index: faiss.Index, ids: np.ndarray):
+    """Remove vectors by ID from an index that supports removal"""
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    if isinstance(index, faiss.IndexIDMap2):
+        index.remove_ids(faiss.IDSelectorBatch(ids))
+    else:
+        # The IVF hashtable direct map only accepts an explicit ID array
+        index.remove_ids(faiss.IDSelectorArray(len(ids), faiss.swig_ptr(ids)))
+
+
+def search_parameters(
+    index_type: str,
+    k: int,
+    nprobe: int = None,
+    ef_search: int = None,
+    selector: faiss.IDSelector = None
+):
+    """Per-query search knobs for an index type.
+
+    The caller must keep selector alive while the parameters are in use.
+    """
+    if index_type in ("ivf", "ivfpq") and nprobe:
+        params = faiss.SearchParametersIVF(nprobe=nprobe)
+    elif index_type == "hnsw" and ef_search:
+        # efSearch below k would cap the number of results
+        params = faiss.SearchParametersHNSW(efSearch=max(ef_search, k))
+    elif selector is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+    if selector is not None:
+        params.sel = selector
+    return params
+
+
+def train_index(index: faiss.Index, vectors: np.ndarray, max_samples: int):
+    if len(vectors) > max_samples:
+        sample = np.random.default_rng(0).choice(len(vectors), max_samples, replace=False)
+        vectors = vectors[np.sort(sample)]
+    index.train(np.ascontiguousarray(vectors))
+
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int, rrf_k: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked ID lists: each ID scores the sum of 1 / (rrf_k + rank) over the lists"""
+    scores = {}
+    for ranking in rankings:
+        for rank, vector_id in enumerate(ranking.tolist(), start=1):
+            scores[vector_id] = scores.get(vector_id, 0.0) + 1.0 / (rrf_k + rank)
+    fused = sorted(scores.items(), key=lambda item: -item[1])[:k]
+    return (
+        np.array([vector_id for vector_id, _ in fused], dtype=np.int64),
+        np.array([score for _, score in fused], dtype=np.float32)
+    )
+
+
 class VectorStore:
-    def __init__(self, dimension: int = 384, index_path: str = "./data/faiss_index"):
+    """FAISS index plus chunk metadata, persisted as snapshots and a write-ahead log.
+
+    The FAISS index type (flat, HNSW, IVF or IVF-PQ) is configurable. Types
+    that need training start out flat and are rebuilt in the background once
+    ``train_min_vectors`` vectors exist.
+
+    Every vector gets a stable 64-bit ID through an ID-mapped FAISS index.
+    Chunk metadata lives in a columnar ``MetadataStore`` keyed by the same
+    IDs, with chunk text on disk and read only for search hits. Deleting a
+    document tombstones its IDs immediately; tombstoned vectors are skipped
+    by search and physically removed during compaction.
+
+    On disk the store is a snapshot generation (``CURRENT`` names it) plus
+    one ``wal-<generation>.log`` per generation holding every mutation made
+    since. Mutations only append to the log, so their cost depends on the
+    size of the change rather than the corpus. Compaction writes a new
+    snapshot in the background and switches ``CURRENT`` atomically, and
+    startup loads the snapshot and replays the logs.
+
+    With ``mmap`` the snapshot index and metadata columns are mapped
+    read-only from their files, so processes on one host share them
+    through the page cache and startup does not read them into memory.
+    A mapped index cannot change: vectors added afterwards go into a small
+    in-memory flat index searched alongside it, deletes stay tombstones,
+    and compaction maps the new snapshot in its place.
+
+    With ``lexical`` a BM25 inverted index over the chunk texts is kept
+    alongside, updated by the same adds and deletes and saved with each
+    snapshot. Searches that pass the question text fuse its ranking with
+    the vector ranking by reciprocal rank.
+
+    One process at a time opens a store for writing; it holds a lock on
+    the directory until it closes. Other processes open it read-only and
+    follow the writer: catch_up() applies the records it has logged
+    since, and reload() swaps in a new generation once it has compacted.
+    A follower can promote() itself when the writer goes away.
+    """
+
+    # Filtered searches over at most this many vectors are scored exactly
+    EXACT_FILTER_MAX = 20000
+
+    def __init__(
+        self,
+        dimension: int = 384,
+        index_path: str = "./data/faiss_index",
+        compact_wal_bytes: int = 64 * 1024 * 1024,
+        compact_tombstone_ratio: float = 0.1,
+        index_type: str = "flat",
+        hnsw_m: int = 32,
+        ivf_nlist: int = 1024,
+        pq_m: int = 48,
+        nprobe: int = 16,
+        ef_search: int = 64,
+        train_min_vectors: int = None,
+        read_only: bool = False,
+        mmap: bool = False,
+        metric: str = "l2",
+        storage: str = "float32",
+        lexical: bool = True,
+        hybrid_candidates: int = 50,
+        rrf_k: int = 60
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported index type: {index_type}. Allowed: {', '.join(INDEX_TYPES)}")
+        if metric not in METRICS:
+            raise ValueError(f"Unsupported metric: {metric}. Allowed: {', '.join(METRICS)}")
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unsupported vector storage: {storage}. Allowed: {', '.join(STORAGE_TYPES)}")
+        if index_type in ("ivf", "ivfpq") and ivf_nlist < 1:
+            raise ValueError(f"IVF nlist must be at least 1, got {ivf_nlist}")
+        if index_type == "ivfpq" and (pq_m < 1 or dimension % pq_m):
+            raise ValueError(f"PQ sub-quantizers ({pq_m}) must divide the dimension ({dimension})")
         self.dimension = dimension
         self.index_path = Path(index_path)
-        self.index_path.mkdir(parents=True, exist_ok=True)
+        # Read-only stores never touch the files on disk (used by offline tools)
+        self.read_only = read_only
+        self._writer_lock = None
+        if not read_only:
+            self.index_path.mkdir(parents=True, exist_ok=True)
+            self._writer_lock = WriterLock(self.index_path / "WRITER.lock")
+            if not self._writer_lock.acquire():
+                raise WriterLockedError(f"Vector store {self.index_path} is already open for writing by another process")
+        self.compact_wal_bytes = compact_wal_bytes
+        self.compact_tombstone_ratio = compact_tombstone_ratio
+        self.mmap = mmap
+
+        # Configured index type, and the type the live index actually has
+        self.target_type = index_type
+        self.index_params = {
+            "hnsw_m": hnsw_m,
+            "ivf_nlist": ivf_nlist,
+            "pq_m": pq_m,
+            "metric": metric,
+            "storage": storage
+        }
+        self.default_nprobe = nprobe
+        self.default_ef_search = ef_search
+        # FAISS recommends roughly 39 training points per IVF centroid, and
+        # PQ codebooks need at least 256; int8 ranges settle much sooner.
+        # Training fails outright below one point per centroid or codeword.
+        if index_type in ("ivf", "ivfpq"):
+            default_train_min = max(39 * ivf_nlist, 256)
+            train_floor = max(ivf_nlist, 256) if index_type == "ivfpq" else ivf_nlist
+        else:
+            default_train_min = 1000
+            train_floor = 1
+        if train_min_vectors and train_min_vectors < train_floor:
+            logger.warning(f"Raising train_min_vectors from {train_min_vectors} to {train_floor}, the fewest {index_type} can train on")
+        self.train_min_vectors = max(train_min_vectors or default_train_min, train_floor)
         
-        # Initialize FAISS index (using L2 distance)
-        self.index = faiss.IndexFlatL2(dimension)
+        # Initialize FAISS index keyed by stable vector IDs
+        self.index_type, self.live_params = self._initial_index()
+        self.live_spec = index_spec(self.index_type, self.live_params)
+        self.index = self._new_index()
+        # Vectors added since a memory-mapped snapshot was loaded
+        self.delta = None
+        self._mapped = False
+        self._index_file = None
         
-        # Store metadata for each vector
-        self.metadata = []
+        # Metadata for each live vector, keyed by vector ID
+        self.metadata = MetadataStore(self.index_path, read_only=read_only, mmap=mmap)
+        # BM25 index over chunk text, keyed by vector ID
+        self.lexical = LexicalIndex() if lexical else None
+        self._lexical_rebuilt = False
+        # Hits taken from each ranking before fusing them
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
+        # IDs deleted from metadata but still present in the FAISS index
+        self.tombstones = set()
+        self.next_id = 0
+        # Bumped by every add, delete and rebuild so callers can tell when
+        # search results may have changed; replayed from the log on restart
+        self.version = 0
+
+        self.generation = 0
+        # Snapshot generation loaded, and the log position replayed up to
+        self.snapshot_generation = 0
+        self._replay_position = (0, 0)
+        self._wal = None
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._compaction = None
+        # Set when a rebuild fails, so saves stop compacting just to retry it
+        self._rebuild_failed = False
         
         # Load existing index if available
         self.load_index()
+
+    def _initial_index(self) -> Tuple[str, Dict]:
+        # Trainable types have nothing to train on yet, so start from exact
+        # float32 search with the configured metric
+        if needs_training(self.target_type, self.index_params["storage"]):
+            return "flat", {**self.index_params, "storage": "float32"}
+        return self.target_type, dict(self.index_params)
+
+    def _new_index(self) -> faiss.Index:
+        return create_index(self.index_type, self.dimension, self.live_params)
+
+    def _new_delta(self) -> faiss.Index:
+        return create_index("flat", self.dimension, {**self.live_params, "storage": "float32"})
     
-    def add_vectors(self, vectors: List[List[float]], metadata_list: List[Dict]):
-        """Add vectors to the index with metadata"""
-        vectors_array = np.array(vectors, dtype=np.float32)
-        self.index.add(vectors_array)
-        self.metadata.extend(metadata_list)
-        self.save_index()
+    def add_vectors(
+        self,
+        vectors: Union[np.ndarray, List[List[float]]],
+        metadata_list: List[Dict],
+        persist: bool = True
+    ):
+        """Add vectors to the index with metadata.
+
+        The batch is appended to the write-ahead log. Pass persist=False
+        when adding a document in several batches and call save_index()
+        once after the last one to make them durable together.
+        """
+        if len(metadata_list) == 0:
+            return
+        self._check_writable()
+        vectors_array = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            ids = np.arange(self.next_id, self.next_id + len(metadata_list), dtype=np.int64)
+            # Chunk text goes to the text log before the record that points at it
+            entry = self.metadata.add(ids, metadata_list)
+            self._apply_add(ids, vectors_array)
+            self._wal.append({"op": "add", "ids": ids, "vectors": vectors_array, **entry})
+        if persist:
+            self.save_index()
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("Vector store is read-only")
+
+    def _apply_add(self, ids: np.ndarray, vectors_array: np.ndarray):
+        # The log keeps vectors as given; cosine indexes store them normalized
+        if self.live_params["metric"] == "cosine":
+            vectors_array = normalize(vectors_array)
+        (self.delta if self._mapped else self.index).add_with_ids(vectors_array, ids)
+        if self.lexical is not None:
+            self.lexical.add(ids, [meta["text"] for meta in self.metadata.get(ids)])
+        self.next_id = max(self.next_id, int(ids[-1]) + 1)
+        self.version += 1
     
-    def search(self, query_vector: List[float], k: int = 5) -> List[Dict]:
-        """Search for k nearest neighbors"""
-        if self.index.ntotal == 0:
-            return []
-        
-        # Ensure k doesn't exceed total vectors
-        k = min(k, self.index.ntotal)
-        
-        query_array = np.array([query_vector], dtype=np.float32)
-        distances, indices = self.index.search(query_array, k)
-        
+    def search(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        nprobe: int = None,
+        ef_search: int = None,
+        query_text: str = None,
+        doc_ids: List[str] = None
+    ) -> List[Dict]:
+        """Search for k nearest neighbors.
+
+        nprobe (IVF) and ef_search (HNSW) override the configured defaults
+        for this query and are ignored by index types they do not apply to.
+        With the cosine metric, distance is 1 - cosine similarity. Passing
+        query_text fuses the vector hits with BM25 hits on the chunk text;
+        chunks found only lexically have no distance. doc_ids restricts the
+        search to the chunks of those documents; the filter is applied
+        inside the search, so k hits come back whenever the documents have
+        that many chunks.
+        """
+        return self.search_batch([query_vector], k, nprobe, ef_search, [query_text], doc_ids)[0]
+
+    def search_batch(
+        self,
+        query_vectors: List[List[float]],
+        k: int = 5,
+        nprobe: int = None,
+        ef_search: int = None,
+        query_texts: List[str] = None,
+        doc_ids: List[str] = None
+    ) -> List[List[Dict]]:
+        """Search for the k nearest neighbors of many queries with one matrix search.
+
+        Takes the same options as search(), shared by every query; each
+        query_texts entry (which may be None) goes with its query vector.
+        Returns one hit list per query.
+        """
+        query_array = np.array(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        query_texts = query_texts or [None] * len(query_array)
+        with self._lock:
+            if len(self.metadata) == 0 or len(query_array) == 0:
+                return [[] for _ in range(len(query_array))]
+            selected = None
+            if doc_ids is not None:
+                selected = self.metadata.ids_for_documents(doc_ids)
+                if len(selected) == 0:
+                    return [[] for _ in range(len(query_array))]
+            hybrid = [bool(text) and self.lexical is not None for text in query_texts]
+            candidates = max(k, self.hybrid_candidates) if any(hybrid) else k
+            if selected is None:
+                vector_hits = self._vector_hits(query_array, candidates, nprobe, ef_search)
+            else:
+                vector_hits = self._filtered_hits(query_array, selected, candidates, nprobe, ef_search)
+
+            rankings = []
+            for (ids, distances), query_text, fuse in zip(vector_hits, query_texts, hybrid):
+                if fuse:
+                    lexical_ids, lexical_scores = self.lexical.search(query_text, candidates, ids=selected)
+                    fused_ids, fused_scores = reciprocal_rank_fusion([ids, lexical_ids], k, self.rrf_k)
+                    distances = dict(zip(ids.tolist(), distances.tolist()))
+                    rankings.append((
+                        fused_ids,
+                        [distances.get(vector_id) for vector_id in fused_ids.tolist()],
+                        dict(zip(lexical_ids.tolist(), lexical_scores.tolist())),
+                        fused_scores
+                    ))
+                else:
+                    rankings.append((ids[:k], distances[:k].tolist(), None, None))
+            # Text is only read for the hits that are returned, in one pass
+            metadata = self.metadata.get(np.concatenate([ids for ids, _, _, _ in rankings]))
+
         results = []
-        for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-            # FAISS returns -1 for invalid indices when k > ntotal
-            if idx >= 0 and idx < len(self.metadata):
-                result = {
-                    "distance": float(distance),
-                    "rank": i + 1,
-                    **self.metadata[idx]
-                }
-                results.append(result)
-        
+        offset = 0
+        for ids, distances, scores, fused_scores in rankings:
+            hits = []
+            for rank, (vector_id, distance, meta) in enumerate(
+                zip(ids.tolist(), distances, metadata[offset:offset + len(ids)]), start=1
+            ):
+                hit = {"distance": distance, "rank": rank, **meta}
+                if scores is not None:
+                    hit["lexical_score"] = scores.get(vector_id)
+                    hit["fusion_score"] = float(fused_scores[rank - 1])
+                hits.append(hit)
+            offset += len(ids)
+            results.append(hits)
         return results
+
+    def _vector_hits(
+        self,
+        query_array: np.ndarray,
+        k: int,
+        nprobe: int,
+        ef_search: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """IDs and distances of the k nearest live vectors per query row, nearest first"""
+        cosine = self.live_params["metric"] == "cosine"
+        if cosine:
+            query_array = normalize(query_array)
+        # Over-fetch by the number of tombstones so k live hits remain after filtering
+        fetch = min(k + len(self.tombstones), self._indexed_count())
+        params = search_parameters(
+            self.index_type,
+            fetch,
+            nprobe=nprobe or self.default_nprobe,
+            ef_search=ef_search or self.default_ef_search
+        )
+        distances, ids = self._search_index(query_array, fetch, params)
+
+        # FAISS returns -1 for missing hits; deleted IDs have no metadata
+        live = self.metadata.live_mask(ids.ravel()).reshape(ids.shape)
+        hits = []
+        for row_ids, row_distances, row_live in zip(ids, distances, live):
+            row = np.flatnonzero(row_live)[:k]
+            hits.append((row_ids[row], row_distances[row].astype(np.float64)))
+        return hits
+
+    def _filtered_hits(
+        self,
+        query_array: np.ndarray,
+        selected: np.ndarray,
+        k: int,
+        nprobe: int,
+        ef_search: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """IDs and distances of the k nearest vectors among selected live IDs, per query row.
+
+        Selections up to EXACT_FILTER_MAX vectors are scored exactly from
+        their stored vectors, in time proportional to the selection. Larger
+        ones search the index with an ID selector; IVF lists and HNSW
+        neighbourhoods can hold fewer than k selected vectors, so a short
+        result falls back to exact scoring.
+        """
+        cosine = self.live_params["metric"] == "cosine"
+        if cosine:
+            query_array = normalize(query_array)
+        k = min(k, len(selected))
+        if len(selected) > self.EXACT_FILTER_MAX:
+            selector = faiss.IDSelectorBatch(selected)
+            params = search_parameters(
+                self.index_type,
+                k,
+                nprobe=nprobe or self.default_nprobe,
+                ef_search=ef_search or self.default_ef_search,
+                selector=selector
+            )
+            distances, ids = self._search_index(query_array, k, params, search_parameters("flat", k, selector=selector))
+            if (ids >= 0).all():
+                return [(row_ids, row_distances.astype(np.float64)) for row_ids, row_distances in zip(ids, distances)]
+
+        vectors = self._reconstruct(selected)
+        if cosine:
+            distances = 1.0 - query_array @ vectors.T
+        else:
+            distances = (
+                (query_array ** 2).sum(axis=1, keepdims=True)
+                - 2.0 * query_array @ vectors.T
+                + (vectors ** 2).sum(axis=1)
+            )
+        if k < len(selected):
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.tile(np.arange(len(selected)), (len(query_array), 1))
+        hits = []
+        for row_distances, row_nearest in zip(distances, nearest):
+            row_nearest = row_nearest[np.argsort(row_distances[row_nearest], kind='stable')]
+            hits.append((selected[row_nearest], np.maximum(row_distances[row_nearest], 0.0).astype(np.float64)))
+        return hits
+
+    def _search_index(self, query_array: np.ndarray, k: int, params=None, delta_params=None):
+        """Distances and IDs of the k nearest indexed vectors, live or not, nearest first"""
+        cosine = self.live_params["metric"] == "cosine"
+        distances, ids = self.index.search(query_array, min(k, self.index.ntotal), params=params)
+        # Quantized codes can score a little past 1; clamp like the exact path
+        # so a chunk gets the same distance whichever path finds it
+        if cosine:
+            distances = np.maximum(1.0 - distances, 0.0)
+        if self._mapped and self.delta.ntotal:
+            delta_distances, delta_ids = self.delta.search(query_array, min(k, self.delta.ntotal), params=delta_params)
+            if cosine:
+                delta_distances = np.maximum(1.0 - delta_distances, 0.0)
+            distances = np.concatenate([distances, delta_distances], axis=1)
+            ids = np.concatenate([ids, delta_ids], axis=1)
+            order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+            distances, ids = np.take_along_axis(distances, order, 1), np.take_along_axis(ids, order, 1)
+        return distances, ids
+
+    def _reconstruct(self, ids: np.ndarray) -> np.ndarray:
+        """Stored vectors for IDs, as the index holds them"""
+        if not (self._mapped and self.delta.ntotal):
+            return self.index.reconstruct_batch(ids)
+        # Vectors added since the mapped snapshot live in the delta
+        in_delta = np.isin(ids, faiss.vector_to_array(self.delta.id_map))
+        vectors = np.empty((len(ids), self.dimension), dtype=np.float32)
+        if not in_delta.all():
+            vectors[~in_delta] = self.index.reconstruct_batch(ids[~in_delta])
+        if in_delta.any():
+            vectors[in_delta] = self.delta.reconstruct_batch(ids[in_delta])
+        return vectors
     
     def delete_by_document_id(self, doc_id: str):
         """Delete all vectors associated with a document"""
-        # Filter metadata
-        indices_to_keep = [i for i, meta in enumerate(self.metadata) if meta.get('doc_id') != doc_id]
-        
-        if len(indices_to_keep) == len(self.metadata):
-            return  # No vectors to delete
-        
-        # Rebuild index with remaining vectors
-        remaining_metadata = [self.metadata[i] for i in indices_to_keep]
-        
-        # Create new index
-        new_index = faiss.IndexFlatL2(self.dimension)
-        
-        # Extract vectors from old index one by one
-        if len(indices_to_keep) > 0:
-            remaining_vectors = []
-            for idx in indices_to_keep:
-                vector = self.index.reconstruct(int(idx))
-                remaining_vectors.append(vector)
-            
-            if remaining_vectors:
-                vectors_array = np.array(remaining_vectors, dtype=np.float32)
-                new_index.add(vectors_array)
-        
-        self.index = new_index
-        self.metadata = remaining_metadata
+        self._check_writable()
+        with self._lock:
+            if not self._apply_delete(doc_id):
+                return  # No vectors to delete
+            self._wal.append({"op": "delete", "doc_id": doc_id})
         self.save_index()
+
+    def _apply_delete(self, doc_id: str) -> bool:
+        vector_ids = self.metadata.delete_document(doc_id)
+        if vector_ids is None or len(vector_ids) == 0:
+            return False
+        self.tombstones.update(vector_ids.tolist())
+        if self.lexical is not None:
+            self.lexical.remove(vector_ids)
+        self.version += 1
+        return True
+
+    def _indexed_count(self) -> int:
+        return self.index.ntotal + (self.delta.ntotal if self._mapped else 0)
+
+    def _export_all(self) -> Tuple[np.ndarray, np.ndarray]:
+        ids, vectors = export_vectors(self.index)
+        if self._mapped and self.delta.ntotal:
+            delta_ids, delta_vectors = export_vectors(self.delta)
+            ids, vectors = np.concatenate([ids, delta_ids]), np.concatenate([vectors, delta_vectors])
+        return ids, vectors
+
+    def _materialize(self):
+        """Replace a memory-mapped index with a private copy that can be changed"""
+        if not self._mapped:
+            return
+        # The mapped file never changes, so it can be copied without the lock
+        index = faiss.read_index(str(self._index_file))
+        with self._lock:
+            ids, vectors = export_vectors(self.delta)
+            if len(ids):
+                index.add_with_ids(vectors, ids)
+            self.index = index
+            self.delta = None
+            self._mapped = False
+
+    def _map_snapshot(self, index_file: Path, since_id: int):
+        """Serve from a mapped snapshot, keeping vectors added after it in memory"""
+        index = faiss.read_index(str(index_file), MMAP_FLAGS)
+        with self._lock:
+            delta = self._new_delta()
+            new_ids = np.arange(since_id, self.next_id, dtype=np.int64)
+            if len(new_ids):
+                delta.add_with_ids(self.index.reconstruct_batch(new_ids), new_ids)
+            self.index = index
+            self.delta = delta
+            self._mapped = True
+            self._index_file = index_file
+
+    def _purge_tombstones(self):
+        """Physically remove tombstoned vectors from the FAISS index"""
+        if self.tombstones and supports_remove(self.index_type) and not self._mapped:
+            remove_vectors(self.index, np.fromiter(self.tombstones, dtype=np.int64))
+            self.tombstones.clear()
+
+    def _rebuild_target(self) -> Optional[Tuple[str, Dict]]:
+        """Index type and parameters the live index should be rebuilt into, if any"""
+        if self.live_spec != index_spec(self.target_type, self.index_params):
+            # Trainable types wait until there is enough data to train on
+            trainable = needs_training(self.target_type, self.index_params["storage"])
+            if not trainable or len(self.metadata) >= self.train_min_vectors:
+                return self.target_type, dict(self.index_params)
+            if self.live_params["metric"] != self.index_params["metric"]:
+                # A metric change needs no training, so apply it in the meantime
+                return self._initial_index()
+        dead = len(self.tombstones)
+        if dead and dead >= self._indexed_count() * self.compact_tombstone_ratio and not supports_remove(self.index_type):
+            # Indexes without removal support shed tombstones by rebuilding,
+            # once enough have built up to be worth a full rebuild
+            return self.index_type, dict(self.live_params)
+        return None
+
+    def _rebuild_index(self, index_type: str, params: Dict):
+        """Rebuild the index as index_type without blocking searches for the whole build.
+
+        Vectors are copied out under the lock, the new index is trained and
+        filled outside it, and vectors added in the meantime are copied over
+        just before the swap.
+        """
+        with self._lock:
+            ids, vectors = self._export_all()
+            dropped = set(self.tombstones)
+            captured_next_id = self.next_id
+            source_spec = self.live_spec
+            source_lossy = self.index_type == "ivfpq" or self.live_params["storage"] != "float32"
+
+        if source_lossy:
+            logger.warning(f"Rebuilding from {source_spec} uses its lossy reconstructed vectors")
+
+        if dropped:
+            keep = ~np.isin(ids, np.fromiter(dropped, dtype=np.int64))
+            ids, vectors = ids[keep], vectors[keep]
+
+        # Vectors stored before switching to cosine were never normalized
+        cosine = params["metric"] == "cosine"
+        if cosine:
+            vectors = normalize(vectors)
+
+        index = create_index(index_type, self.dimension, params)
+        if needs_training(index_type, params["storage"]):
+            train_index(index, vectors, max_samples=max(params['ivf_nlist'] * 256, 100000))
+        if len(ids):
+            index.add_with_ids(vectors, ids)
+
+        with self._lock:
+            new_ids = np.arange(captured_next_id, self.next_id, dtype=np.int64)
+            if len(new_ids):
+                source = self.delta if self._mapped else self.index
+                new_vectors = source.reconstruct_batch(new_ids)
+                index.add_with_ids(normalize(new_vectors) if cosine else new_vectors, new_ids)
+            self.index = index
+            self.delta = None
+            self._mapped = False
+            self.index_type = index_type
+            self.live_params = params
+            self.live_spec = index_spec(index_type, params)
+            self.tombstones -= dropped
+            self.version += 1
+        logger.info(f"Rebuilt vector index as {self.live_spec} ({index.ntotal} vectors)")
     
+    def _snapshot_files(self, generation: int) -> Tuple[Path, Path]:
+        """Index and metadata snapshot paths; generation 0 keeps the original file names"""
+        if generation == 0:
+            return self.index_path / "index.faiss", self.index_path / "metadata.pkl"
+        return (
+            self.index_path / f"index-{generation:06d}.faiss",
+            self.index_path / f"metadata-{generation:06d}.pkl"
+        )
+
+    def _lexical_file(self, generation: int) -> Path:
+        return self.index_path / f"lexical-{generation:06d}.pkl"
+
+    def _wal_file(self, generation: int) -> Path:
+        return self.index_path / f"wal-{generation:06d}.log"
+
+    def _wal_generations(self) -> List[int]:
+        generations = []
+        for path in self.index_path.glob("wal-*.log"):
+            match = re.fullmatch(r"wal-(\d+)\.log", path.name)
+            if match:
+                generations.append(int(match.group(1)))
+        return sorted(generations)
+
+    def _read_current(self) -> int:
+        current_file = self.index_path / "CURRENT"
+        if current_file.exists():
+            return int(current_file.read_text().strip())
+        return 0
+
     def save_index(self):
-        """Save index and metadata to disk"""
-        faiss.write_index(self.index, str(self.index_path / "index.faiss"))
-        with open(self.index_path / "metadata.pkl", 'wb') as f:
-            pickle.dump(self.metadata, f)
+        """Make every logged mutation durable and compact when the log or tombstones grow large"""
+        self._check_writable()
+        with self._lock:
+            # Text first, so a synced record never points at missing text
+            self.metadata.sync()
+            self._wal.sync()
+            wal_size = self._wal.size()
+            dead = len(self.tombstones)
+            total = self._indexed_count()
+            rebuild = self._rebuild_target() is not None and not self._rebuild_failed
+        if wal_size >= self.compact_wal_bytes or rebuild or (dead and dead >= total * self.compact_tombstone_ratio):
+            self.compact(background=True)
+
+    def compact(self, background: bool = False):
+        """Write a new snapshot generation and drop the logs it replaces"""
+        self._check_writable()
+        if background:
+            with self._lock:
+                if self._compaction is not None and self._compaction.is_alive():
+                    return
+                self._compaction = threading.Thread(target=self.compact, name="vector-store-compaction", daemon=True)
+                self._compaction.start()
+            return
+
+        with self._compaction_lock:
+            try:
+                self._compact()
+            except Exception as e:
+                # The previous snapshot and all logs remain valid, so nothing is lost
+                logger.error(f"Vector store compaction failed: {str(e)}")
+
+    def _compact(self):
+        with self._lock:
+            rebuild = self._rebuild_target()
+        if rebuild:
+            try:
+                self._rebuild_index(*rebuild)
+                self._rebuild_failed = False
+            except Exception as e:
+                # The live index is still valid, so snapshot it as it is and
+                # retry the rebuild at the next compaction
+                logger.error(f"Could not rebuild vector index as {index_spec(*rebuild)}: {str(e)}")
+                self._rebuild_failed = True
+        self._materialize()
+
+        # Capture the state and start a new log generation while holding the
+        # lock; mutations made during the slow disk writes land in the new log
+        with self._lock:
+            self._purge_tombstones()
+            index_bytes = faiss.serialize_index(self.index)
+            capture = self.metadata.capture()
+            lexical_bytes = None
+            if self.lexical is not None:
+                self.lexical.compact()
+                lexical_bytes = self.lexical.serialize()
+            captured_next_id = self.next_id
+            state = {
+                "next_id": self.next_id,
+                "version": self.version,
+                "documents": capture["documents"],
+                "index_type": self.index_type,
+                "index_spec": self.live_spec,
+                "index_params": dict(self.live_params),
+                # Only non-empty for index types rebuilt rather than purged
+                "tombstones": set(self.tombstones),
+                "lexical": lexical_bytes is not None
+            }
+            generation = self.generation + 1
+            self._wal.close()
+            self._wal = WriteAheadLog(self._wal_file(generation))
+            self.metadata.open_log(generation)
+            self.generation = generation
+
+        index_file, metadata_file = self._snapshot_files(generation)
+        self._write_atomic(index_file, index_bytes.tobytes())
+        self.metadata.write_snapshot(generation, capture)
+        if lexical_bytes is not None:
+            self._write_atomic(self._lexical_file(generation), lexical_bytes)
+        self._write_atomic(metadata_file, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        self._write_atomic(self.index_path / "CURRENT", f"{generation}\n".encode())
+
+        with self._lock:
+            self.metadata.finish_snapshot(generation, capture)
+            self.snapshot_generation = generation
+        if self.mmap:
+            self._map_snapshot(index_file, captured_next_id)
+
+        # Older snapshots and logs are fully covered by the new snapshot
+        for old in self._wal_generations():
+            if old < generation:
+                self._wal_file(old).unlink(missing_ok=True)
+        snapshot = (index_file, metadata_file, self._lexical_file(generation))
+        for path in (
+            list(self.index_path.glob("index*.faiss"))
+            + list(self.index_path.glob("metadata*.pkl"))
+            + list(self.index_path.glob("lexical-*.pkl"))
+        ):
+            if path not in snapshot:
+                path.unlink(missing_ok=True)
+        self.metadata.remove_files(generation)
+        logger.info(f"Compacted vector store into generation {generation} ({len(capture['rows'])} vectors)")
+
+    def _write_atomic(self, path: Path, data: bytes):
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
     
     def load_index(self):
-        """Load index and metadata from disk"""
-        index_file = self.index_path / "index.faiss"
-        metadata_file = self.index_path / "metadata.pkl"
+        """Load the current snapshot and replay the write-ahead logs"""
+        snapshot_generation = self._read_current()
+        index_file, metadata_file = self._snapshot_files(snapshot_generation)
         
         if index_file.exists() and metadata_file.exists():
-            self.index = faiss.read_index(str(index_file))
             with open(metadata_file, 'rb') as f:
-                self.metadata = pickle.load(f)
+                state = pickle.load(f)
+            # Older snapshot formats are converted, so they are read normally
+            mapped = self.mmap and isinstance(state, dict) and "documents" in state
+            index = faiss.read_index(str(index_file), MMAP_FLAGS if mapped else 0)
+            if mapped:
+                self._mapped = True
+                self._index_file = index_file
+            self._load_snapshot(index, state, snapshot_generation)
+            if self.lexical is not None:
+                self._load_lexical(state, snapshot_generation)
+
+        # A compaction that crashed before switching CURRENT leaves newer logs
+        # behind; replaying every log from the snapshot on covers both cases
+        self.snapshot_generation = snapshot_generation
+        replayed = self._replay_logs(snapshot_generation)
+        if replayed:
+            logger.info(f"Replayed {replayed} write-ahead log records")
+
+        if not self.read_only:
+            self._open_for_writing()
+
+    def _open_for_writing(self):
+        self._wal = WriteAheadLog(self._wal_file(self.generation))
+
+        # Metadata imported from older formats is rewritten as columns, and a
+        # rebuilt lexical index is saved so the next start can load it
+        if self._rebuild_target() is not None or self.metadata.needs_rewrite or self._lexical_rebuilt:
+            self.compact(background=True)
+
+    def _replay_logs(self, generation: int, offset: int = 0, resume: bool = False) -> int:
+        """Apply logged mutations from a log position onwards; returns the record count.
+
+        Replays generation's log from offset, then every newer log, and
+        leaves the position after the last record applied. With resume the
+        store already follows generation's text log, and a log that should
+        still hold unread records but is gone raises FileNotFoundError.
+        """
+        generations = sorted({generation, *(g for g in self._wal_generations() if g > generation)})
+        replayed = 0
+        for wal_generation in generations:
+            start = offset if wal_generation == generation else 0
+            if not (resume and wal_generation == generation):
+                # Rows in a generation's log records point into its text log
+                self.metadata.open_log(wal_generation)
+            wal_file = self._wal_file(wal_generation)
+            # Only the newest log may not exist yet
+            missing_ok = not resume or (wal_generation == generations[-1] and start == 0)
+            self._replay_position = (wal_generation, start)
+            for record_offset, end, record in WriteAheadLog.replay(
+                wal_file, repair=not self.read_only, start=start, missing_ok=missing_ok
+            ):
+                if record["op"] == "add":
+                    ids = record.get("ids")
+                    if ids is None:
+                        # Records written before vector IDs existed are numbered in order
+                        ids = np.arange(self.next_id, self.next_id + len(record["metadata"]), dtype=np.int64)
+                    if "metadata" in record:
+                        self.metadata.import_legacy(ids, record["metadata"])
+                    elif not self.metadata.apply(record):
+                        if self.read_only:
+                            # The writer has not finished appending its text;
+                            # pick it up from this record next time
+                            self.generation = wal_generation
+                            return replayed
+                        # The record was never synced and its text was lost
+                        # in a crash; drop it and everything after it
+                        logger.warning(f"Discarding write-ahead log records from {wal_file.name} offset {record_offset}")
+                        WriteAheadLog.truncate(wal_file, record_offset)
+                        break
+                    self._apply_add(ids, record["vectors"])
+                elif record["op"] == "delete":
+                    self._apply_delete(record["doc_id"])
+                self._replay_position = (wal_generation, end)
+                replayed += 1
+        self.generation = generations[-1]
+        return replayed
+
+    @property
+    def stale(self) -> bool:
+        """Whether the writer has compacted into a generation this store has not loaded"""
+        return self._read_current() != self.snapshot_generation
+
+    def catch_up(self) -> int:
+        """Apply the records the writer has logged since; returns how many.
+
+        For read-only stores. Raises FileNotFoundError if a compaction
+        removed a log before it was read; reload() then has everything.
+        """
+        with self._lock:
+            return self._replay_logs(*self._replay_position, resume=True)
+
+    def reload(self):
+        """Load the current generation from disk and swap it in atomically.
+
+        For read-only stores. The new generation is loaded without the
+        lock, so searches keep using the old one until the swap.
+        """
+        fresh = VectorStore(
+            dimension=self.dimension,
+            index_path=str(self.index_path),
+            compact_wal_bytes=self.compact_wal_bytes,
+            compact_tombstone_ratio=self.compact_tombstone_ratio,
+            index_type=self.target_type,
+            hnsw_m=self.index_params["hnsw_m"],
+            ivf_nlist=self.index_params["ivf_nlist"],
+            pq_m=self.index_params["pq_m"],
+            nprobe=self.default_nprobe,
+            ef_search=self.default_ef_search,
+            train_min_vectors=self.train_min_vectors,
+            read_only=True,
+            mmap=self.mmap,
+            metric=self.index_params["metric"],
+            storage=self.index_params["storage"],
+            lexical=self.lexical is not None,
+            hybrid_candidates=self.hybrid_candidates,
+            rrf_k=self.rrf_k
+        )
+        # Everything but the locks and compaction thread is loaded state
+        state = {
+            name: value for name, value in fresh.__dict__.items()
+            if name not in ("_lock", "_compaction_lock", "_compaction", "_writer_lock")
+        }
+        with self._lock:
+            previous = self.metadata
+            self.__dict__.update(state)
+        previous.close()
+        logger.info(f"Reloaded vector store generation {self.snapshot_generation} (version {self.version})")
+
+    def promote(self) -> bool:
+        """Take over writing a read-only store if no other process holds the lock.
+
+        Catches up with everything the previous writer logged, drops a
+        record it left half-written, and opens the log for appending.
+        Returns whether this store is now the writer.
+        """
+        if not self.read_only:
+            return True
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        writer_lock = WriterLock(self.index_path / "WRITER.lock")
+        if not writer_lock.acquire():
+            return False
+        try:
+            if self.stale:
+                self.reload()
+            with self._lock:
+                self.read_only = False
+                self.metadata.read_only = False
+                # Repairs the log tail, then new text goes to a writable log
+                self._replay_logs(*self._replay_position, resume=True)
+                self.metadata.open_log(self.generation)
+                self._writer_lock = writer_lock
+                self._open_for_writing()
+        except Exception:
+            self.read_only = True
+            self.metadata.read_only = True
+            writer_lock.release()
+            raise
+        logger.info(f"Promoted to vector store writer at generation {self.generation} (version {self.version})")
+        return True
+
+    def _load_snapshot(self, index: faiss.Index, state, generation: int):
+        if isinstance(state, list):
+            # Snapshots from before vector IDs existed: a plain index whose
+            # positions line up with a metadata list
+            ids = np.arange(index.ntotal, dtype=np.int64)
+            self.index_type = "flat"
+            self.live_params = {**self.index_params, "metric": "l2", "storage": "float32"}
+            self.live_spec = "flat"
+            self.index = self._new_index()
+            if index.ntotal:
+                self.index.add_with_ids(index.reconstruct_n(0, index.ntotal), ids)
+            self.metadata.import_legacy(ids, state)
+            self.next_id = index.ntotal
+            return
+
+        self.index = index
+        self.index_type = state.get("index_type", "flat")
+        self.next_id = state["next_id"]
+        self.version = state.get("version", 0)
+        self.tombstones = set(state.get("tombstones", ()))
+        self.live_spec = state.get("index_spec", "flat")
+        # Snapshots from before storage modes existed are L2 over float32
+        self.live_params = {
+            **self.index_params,
+            "metric": "l2",
+            "storage": "float32",
+            **state.get("index_params", {})
+        }
+        if self._mapped:
+            self.delta = self._new_delta()
+        if "metadata" in state:
+            # Snapshots that pickled a metadata dict per vector ID
+            ids = np.fromiter(state["metadata"].keys(), dtype=np.int64, count=len(state["metadata"]))
+            order = np.argsort(ids)
+            values = list(state["metadata"].values())
+            self.metadata.import_legacy(ids[order], [values[i] for i in order])
+        else:
+            self.metadata.load_snapshot(generation, state["documents"])
+
+    def _load_lexical(self, state, generation: int):
+        lexical_file = self._lexical_file(generation)
+        if isinstance(state, dict) and state.get("lexical") and lexical_file.exists():
+            with open(lexical_file, 'rb') as f:
+                self.lexical = LexicalIndex.deserialize(f.read())
+            return
+
+        # Snapshots saved without a lexical index are indexed from their text
+        ids = self.metadata.live_ids()
+        for start in range(0, len(ids), 1000):
+            batch = ids[start:start + 1000]
+            self.lexical.add(batch, [meta["text"] for meta in self.metadata.get(batch)])
+        self._lexical_rebuilt = True
+        logger.info(f"Built lexical index over {len(ids)} chunks")
+
+    def close(self):
+        """Wait for compaction and close the write-ahead log"""
+        if self._compaction is not None:
+            self._compaction.join()
+        with self._lock:
+            if self._wal is not None:
+                self._wal.close()
+            self.metadata.close()
+            if self._writer_lock is not None:
+                self._writer_lock.release()
     
+    def get_index_info(self) -> Dict:
+        """Describe the live and configured index types"""
+        with self._lock:
+            return {
+                "index_type": self.live_spec,
+                "configured_type": index_spec(self.target_type, self.index_params),
+                "indexed_vectors": self._indexed_count(),
+                "metric": self.live_params["metric"],
+                "storage": self.live_params["storage"],
+                "bytes_per_vector": bytes_per_vector(self.index, self.live_params),
+                "memory_mapped": self._mapped,
+                "tombstones": len(self.tombstones),
+                "lexical": self.lexical.get_stats() if self.lexical is not None else None,
+                "generation": self.generation,
+                "version": self.version,
+                "writer": not self.read_only,
+                "metadata": self.metadata.get_stats()
+            }
+
     def get_total_vectors(self) -> int:
-        """Get total number of vectors in index"""
-        return self.index.ntotal
+        """Get total number of live vectors in index"""
+        return len(self.metadata)
@@ -0,0 +1,87 @@
+import os
+import pickle
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+# Each record is framed as <payload length, crc32 of payload> followed by a
+# pickled payload. A record only counts once it is complete and its checksum
+# matches, so a crash mid-append never yields a half-applied record.
+HEADER = struct.Struct("<II")
+
+
+class WriteAheadLog:
+    """Append-only log of vector store mutations"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'ab')
+
+    @staticmethod
+    def replay(
+        path: Path,
+        repair: bool = True,
+        start: int = 0,
+        missing_ok: bool = True
+    ) -> Iterator[Tuple[int, int, Dict]]:
+        """Yield (offset, end offset, record) for every committed record in a log file.
+
+        Reading begins at start, which must be a record boundary such as
+        the end offset of a record yielded earlier. With repair, a torn or
+        corrupt tail is truncated so later appends start from the last good
+        record; without it, a tail still being written by another process
+        is left alone and can be read again once complete.
+        """
+        path = Path(path)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            if missing_ok:
+                return
+            raise
+
+        good_offset = start
+        with f:
+            f.seek(start)
+            while True:
+                offset = f.tell()
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                length, checksum = HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                good_offset = f.tell()
+                yield offset, good_offset, pickle.loads(payload)
+
+        if repair and good_offset < path.stat().st_size:
+            WriteAheadLog.truncate(path, good_offset)
+
+    @staticmethod
+    def truncate(path: Path, offset: int):
+        """Drop every record from offset onwards"""
+        with open(path, 'r+b') as f:
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, record: Dict):
+        """Append a record; it is durable once sync() returns"""
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.write(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+
+    def sync(self):
+        """Flush appended records to stable storage"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def size(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
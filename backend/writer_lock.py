@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class WriterLockedError(RuntimeError):
+    """Raised when another process already holds a store's writer lock"""
+
+
+class WriterLock:
+    """Exclusive, non-blocking lock on a file, held by at most one process.
+
+    The operating system releases the lock when its holder exits, however
+    it exits, so a process that crashed never leaves a stale lock behind
+    and another one can take over.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Take the lock if it is free; False if another process holds it"""
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        # Record the holder for anyone inspecting the directory
+        lock_file.truncate(0)
+        lock_file.write(f"{os.getpid()}\n".encode())
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
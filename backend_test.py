@@ -32,6 +32,32 @@ class EcoIntelAPITester:
         if details:
             print(f"   Details: {details}")
 
+    def test_health(self, timeout=300):
+        """Test liveness, then wait for the readiness check to pass"""
+        try:
+            response = requests.get(f"{self.api_url}/health/live", timeout=10)
+            if response.status_code != 200:
+                self.log_test("Health Checks", False, f"Liveness status: {response.status_code}")
+                return False
+
+            deadline = time.time() + timeout
+            while True:
+                response = requests.get(f"{self.api_url}/health/ready", timeout=10)
+                data = response.json()
+                if response.status_code == 200 or data.get("failed") or time.time() > deadline:
+                    break
+                time.sleep(2)
+
+            success = response.status_code == 200 and data.get("ready") is True
+            details = f"Status: {response.status_code}, Components: " + ", ".join(
+                f"{name}={component['state']}" for name, component in data.get("components", {}).items()
+            )
+            self.log_test("Health Checks", success, details)
+            return success
+        except Exception as e:
+            self.log_test("Health Checks", False, f"Error: {str(e)}")
+            return False
+
     def test_api_root(self):
         """Test API root endpoint"""
         try:
@@ -114,8 +140,11 @@ Recommendations:
             if success:
                 data = response.json()
                 details += f", Document ID: {data.get('id')}, Status: {data.get('status')}"
-                # Clean up
-                temp_file.unlink()
+                # Processing happens in the background; wait for the job to finish
+                if data.get('job_id'):
+                    job = self.wait_for_job(data['job_id'])
+                    details += f", Job stage: {job.get('stage')}"
+                    success = job.get('stage') == 'done'
                 self.log_test("Document Upload", success, details)
                 return success, data
             else:
@@ -127,6 +156,71 @@ Recommendations:
             self.log_test("Document Upload", False, f"Error: {str(e)}")
             return False, {}
 
+    def test_duplicate_upload(self, document_id):
+        """Test that re-uploading identical content returns the existing document"""
+        try:
+            temp_file = Path("/tmp/test_climate_report.txt")
+            files = {'file': ('test_climate_report_copy.txt', temp_file.read_bytes(), 'text/plain')}
+            temp_file.unlink()
+            response = requests.post(f"{self.api_url}/documents/upload", files=files, timeout=30)
+            success = response.status_code == 200
+            details = f"Status: {response.status_code}"
+            
+            if success:
+                data = response.json()
+                success = data.get('duplicate') is True and data.get('id') == document_id
+                details += f", Duplicate: {data.get('duplicate')}, Document ID: {data.get('id')}"
+            else:
+                details += f", Error: {response.text}"
+            
+            self.log_test("Duplicate Upload", success, details)
+            return success
+        except Exception as e:
+            self.log_test("Duplicate Upload", False, f"Error: {str(e)}")
+            return False
+
+    def test_bulk_upload(self):
+        """Test bulk upload of several text files"""
+        try:
+            files = [
+                ('files', (f'bulk_report_{i}.txt', f"Bulk sustainability report {i}. Scope 1 emissions fell by {i * 5}%.".encode(), 'text/plain'))
+                for i in range(3)
+            ]
+            response = requests.post(f"{self.api_url}/documents/bulk-upload", files=files, timeout=30)
+            success = response.status_code == 200
+            details = f"Status: {response.status_code}"
+            doc_ids = []
+            
+            if success:
+                data = response.json()
+                doc_ids = [doc['id'] for doc in data.get('documents', [])]
+                job = self.wait_for_job(data['job_id'])
+                ready = sum(1 for f in job.get('files', []) if f.get('status') == 'ready')
+                details += f", Documents: {len(doc_ids)}, Ready: {ready}"
+                success = ready == len(doc_ids) == 3
+            else:
+                details += f", Error: {response.text}"
+            
+            self.log_test("Bulk Upload", success, details)
+            return success, doc_ids
+        except Exception as e:
+            self.log_test("Bulk Upload", False, f"Error: {str(e)}")
+            return False, []
+
+    def wait_for_job(self, job_id, timeout=120):
+        """Poll an ingestion job until it finishes or the timeout expires"""
+        deadline = time.time() + timeout
+        job = {}
+        while time.time() < deadline:
+            response = requests.get(f"{self.api_url}/jobs/{job_id}", timeout=10)
+            if response.status_code != 200:
+                break
+            job = response.json()
+            if job.get('stage') in ('done', 'error'):
+                break
+            time.sleep(1)
+        return job
+
     def test_query_without_documents(self):
         """Test query when no documents are available"""
         try:
@@ -180,6 +274,99 @@ Recommendations:
             self.log_test("Query With Documents", False, f"Error: {str(e)}")
             return False, {}
 
+    def test_repeated_query(self, first_result):
+        """Test that repeating a question is answered from the answer cache"""
+        try:
+            query_data = {
+                "question": "  what are the key findings about CARBON emissions? ",
+                "top_k": 5
+            }
+            response = requests.post(f"{self.api_url}/query", json=query_data, timeout=20)
+            success = response.status_code == 200
+            details = f"Status: {response.status_code}"
+            
+            if success:
+                data = response.json()
+                success = data.get('cached') is True and data.get('sources') == first_result.get('sources')
+                details += f", Cached: {data.get('cached')}, Sources: {len(data.get('sources', []))}"
+            
+            self.log_test("Repeated Query", success, details)
+            return success
+        except Exception as e:
+            self.log_test("Repeated Query", False, f"Error: {str(e)}")
+            return False
+
+    def test_filtered_query(self, document_id):
+        """Test that a query limited to one document only cites that document"""
+        try:
+            query_data = {
+                "question": "What are the key findings about carbon emissions?",
+                "top_k": 3,
+                "doc_ids": [document_id]
+            }
+            response = requests.post(f"{self.api_url}/query", json=query_data, timeout=20)
+            success = response.status_code == 200
+            details = f"Status: {response.status_code}"
+            
+            if success:
+                sources = response.json().get('sources', [])
+                success = bool(sources) and all(source.get('doc_id') == document_id for source in sources)
+                details += f", Sources: {[source.get('doc_id') for source in sources]}"
+            
+            self.log_test("Filtered Query", success, details)
+            return success
+        except Exception as e:
+            self.log_test("Filtered Query", False, f"Error: {str(e)}")
+            return False
+
+    def test_batch_query(self):
+        """Test answering several questions in one batch request"""
+        try:
+            questions = [
+                "What are the key findings about carbon emissions?",
+                "How much did Scope 1 emissions fall?",
+                "What renewable energy targets are mentioned?"
+            ]
+            response = requests.post(
+                f"{self.api_url}/query/batch", json={"questions": questions, "top_k": 3}, timeout=120
+            )
+            success = response.status_code == 200
+            details = f"Status: {response.status_code}"
+            
+            if success:
+                results = response.json().get('results', [])
+                success = [result.get('question') for result in results] == questions
+                details += f", Results: {len(results)}, Cached: {sum(1 for result in results if result.get('cached'))}"
+            
+            self.log_test("Batch Query", success, details)
+            return success
+        except Exception as e:
+            self.log_test("Batch Query", False, f"Error: {str(e)}")
+            return False
+
+    def test_query_stream(self):
+        """Test the Server-Sent Events query stream"""
+        try:
+            query_data = {
+                "question": "How much did Scope 1 emissions fall?",
+                "top_k": 5
+            }
+            response = requests.post(f"{self.api_url}/query/stream", json=query_data, stream=True, timeout=60)
+            success = response.status_code == 200
+            details = f"Status: {response.status_code}"
+            
+            if success:
+                events = [line[len("event: "):] for line in response.iter_lines(decode_unicode=True)
+                          if line and line.startswith("event: ")]
+                success = bool(events) and events[0] == "sources" and events[-1] == "done"
+                details += f", Events: {len(events)}, First: {events[:1]}, Last: {events[-1:]}"
+            
+            self.log_test("Query Stream", success, details)
+            return success
+        except Exception as e:
+            self.log_test("Query Stream", False, f"Error: {str(e)}")
+            return False
+
     def test_delete_document(self, document_id):
         """Test document deletion"""
         if not document_id:
@@ -207,6 +394,11 @@ Recommendations:
         print(f"Testing against: {self.api_url}")
         print("=" * 60)
         
+        # The API answers 503 until the server has loaded its models
+        if not self.test_health():
+            print("❌ Server did not become ready. Stopping tests.")
+            return self.get_summary()
+        
         # Test basic endpoints
         api_working = self.test_api_root()
         if not api_working:
@@ -226,12 +418,26 @@ Recommendations:
         
         # Test query with documents (if upload was successful)
         if upload_success:
-            self.test_query_with_documents(document_id)
+            query_success, query_data = self.test_query_with_documents(document_id)
+            if query_success:
+                self.test_repeated_query(query_data)
+            if document_id:
+                self.test_filtered_query(document_id)
+            self.test_batch_query()
+            self.test_query_stream()
+            
+            # Re-uploading the same file should not create a new document
+            self.test_duplicate_upload(document_id)
             
             # Test document deletion
             if document_id:
                 self.test_delete_document(document_id)
         
+        # Test bulk upload and clean up its documents
+        bulk_success, bulk_doc_ids = self.test_bulk_upload()
+        for doc_id in bulk_doc_ids:
+            self.test_delete_document(doc_id)
+        
         return self.get_summary()
 
     def get_summary(self):
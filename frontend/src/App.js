@@ -162,6 +162,17 @@ const DashboardPage = () => {
     fetchStats();
   }, []);
 
+  // Uploads are processed in the background; refresh until they settle
+  const hasProcessing = documents.some(d => d.status === 'processing');
+  useEffect(() => {
+    if (!hasProcessing) return undefined;
+    const timer = setInterval(() => {
+      fetchDocuments();
+      fetchStats();
+    }, 3000);
+    return () => clearInterval(timer);
+  }, [hasProcessing]);
+
   const fetchDocuments = async () => {
     try {
       const response = await axios.get(`${API}/documents`);
@@ -62,7 +62,11 @@ export const FileUpload = ({ onUploadComplete }) => {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
 
-      toast.success(`Document "${file.name}" uploaded and processed successfully!`);
+      if (response.data.duplicate) {
+        toast.info(`"${file.name}" was already uploaded as "${response.data.filename}"`);
+      } else {
+        toast.success(`Document "${file.name}" uploaded and queued for processing!`);
+      }
       if (onUploadComplete) {
         onUploadComplete(response.data);
       }
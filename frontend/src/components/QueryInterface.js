@@ -2,11 +2,45 @@ import React, { useState, useRef, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Send, Sparkles, FileText } from 'lucide-react';
 import { toast } from 'sonner';
-import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// POST a question to the streaming endpoint and call onEvent(name, data)
+// for every Server-Sent Event as it arrives
+const streamQuery = async (payload, onEvent) => {
+  const response = await fetch(`${API}/query/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload)
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Query failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line; keep any partial event buffered
+    const blocks = buffer.split('\n\n');
+    buffer = blocks.pop();
+    for (const block of blocks) {
+      let name = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) name = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (data) onEvent(name, JSON.parse(data));
+    }
+  }
+};
+
 export const QueryInterface = ({ documentCount }) => {
   const [question, setQuestion] = useState('');
   const [messages, setMessages] = useState([]);
@@ -43,21 +77,41 @@ export const QueryInterface = ({ documentCount }) => {
     setQuestion('');
     setLoading(true);
 
+    const aiMessageId = Date.now() + 1;
+    const newAiMessage = (fields) => ({
+      id: aiMessageId,
+      type: 'ai',
+      content: '',
+      timestamp: new Date(),
+      ...fields
+    });
+    const addAiMessage = (fields) => {
+      setMessages(prev => [...prev, newAiMessage(fields)]);
+    };
+    const updateAiMessage = (update) => {
+      setMessages(prev => prev.map(message => (
+        message.id === aiMessageId ? { ...message, ...update(message) } : message
+      )));
+    };
+
     try {
-      const response = await axios.post(`${API}/query`, {
-        question: currentQuestion,
-        top_k: 5
+      await streamQuery({ question: currentQuestion, top_k: 5 }, (event, data) => {
+        if (event === 'sources') {
+          // Sources arrive before the answer; tokens are appended as they stream in
+          addAiMessage({ sources: data.sources });
+        } else if (event === 'token') {
+          updateAiMessage(message => ({ content: message.content + data.text }));
+        } else if (event === 'done') {
+          updateAiMessage(() => ({ content: data.answer, sources: data.sources }));
+        } else if (event === 'error') {
+          // Retrieval errors arrive before any sources event
+          setMessages(prev => (
+            prev.some(message => message.id === aiMessageId) ? prev : [...prev, newAiMessage({ sources: [] })]
+          ));
+          updateAiMessage(() => ({ content: data.answer }));
+          toast.error('Failed to process query');
+        }
       });
-
-      const aiMessage = {
-        id: Date.now() + 1,
-        type: 'ai',
-        content: response.data.answer,
-        sources: response.data.sources,
-        timestamp: new Date()
-      };
-
-      setMessages(prev => [...prev, aiMessage]);
     } catch (error) {
       console.error('Query error:', error);
       toast.error('Failed to process query');
@@ -126,7 +180,7 @@ export const QueryInterface = ({ documentCount }) => {
           ))}
         </AnimatePresence>
 
-        {loading && (
+        {loading && messages[messages.length - 1]?.type === 'user' && (
           <motion.div
             initial={{ opacity: 0 }}
             animate={{ opacity: 1 }}
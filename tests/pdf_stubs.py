@@ -0,0 +1,17 @@
+"""Page range extractors for PDF pool tests; kept light so spawned workers import them quickly"""
+import time
+from typing import List
+
+
+def count_pages(pdf_path: str) -> int:
+    return 4
+
+
+def extract_pages(pdf_path: str, start: int, end: int) -> List[str]:
+    return [f"page {number}\n" for number in range(start, end)]
+
+
+def extract_pages_hanging_on_first(pdf_path: str, start: int, end: int) -> List[str]:
+    if start == 0:
+        time.sleep(60)
+    return extract_pages(pdf_path, start, end)
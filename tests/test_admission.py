@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, DeadlineExceededError, OverloadedError
+
+
+def test_slot_limit_bounds_concurrency():
+    running = 0
+    peak = 0
+
+    async def work(i):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return i
+
+    async def run():
+        controller = AdmissionController(max_concurrent=2, max_queued=10, timeout_seconds=5)
+        results = await asyncio.gather(*(controller.run(work(i)) for i in range(6)))
+        return controller, results
+
+    controller, results = asyncio.run(run())
+
+    assert results == list(range(6))
+    assert peak == 2
+    assert controller.admitted == 6 and controller.active == 0 and controller.queued == 0
+
+
+def test_full_queue_rejects_at_once():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queued=1, timeout_seconds=5)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(controller.run(release.wait()))
+        waiter = asyncio.ensure_future(controller.run(release.wait()))
+        await asyncio.sleep(0.01)
+        with pytest.raises(OverloadedError):
+            await controller.run(release.wait())
+        with pytest.raises(OverloadedError):
+            controller.check()
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return controller
+
+    controller = asyncio.run(run())
+
+    assert controller.rejected == 2 and controller.admitted == 2
+
+
+def test_deadline_covers_waiting_and_work():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queued=5, timeout_seconds=0.05)
+        with pytest.raises(DeadlineExceededError):
+            await controller.run(asyncio.sleep(1))
+        # A request's own shorter deadline wins
+        with pytest.raises(DeadlineExceededError):
+            await controller.run(asyncio.sleep(0.03), timeout_seconds=0.01)
+        # The slot of a timed-out request is free again
+        assert await controller.run(asyncio.sleep(0, result="ok")) == "ok"
+        return controller
+
+    controller = asyncio.run(run())
+
+    assert controller.timed_out == 2
+    assert controller.active == 0
+
+
+def test_waiting_for_a_slot_times_out():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queued=5)
+        async with controller.slot():
+            with pytest.raises(DeadlineExceededError):
+                async with controller.slot(wait_seconds=0.01):
+                    pass
+        return controller
+
+    controller = asyncio.run(run())
+
+    assert controller.queued == 0 and controller.active == 0
+
+
+def test_slot_is_released_when_the_call_raises():
+    async def fail():
+        raise RuntimeError("model crashed")
+
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queued=0, timeout_seconds=5)
+        with pytest.raises(RuntimeError):
+            await controller.run(fail())
+        assert controller.active == 0
+        # With no queue places, this is only admitted if the slot came back
+        assert await controller.run(asyncio.sleep(0, result="ok")) == "ok"
+
+    asyncio.run(run())
+
+
+def test_deadline_combines_request_and_configured_timeouts():
+    controller = AdmissionController(timeout_seconds=30)
+    assert controller.deadline() == 30
+    assert controller.deadline(10) == 10
+    assert controller.deadline(60) == 30
+    assert AdmissionController(timeout_seconds=0).deadline(10) == 10
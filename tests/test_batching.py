@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def test_concurrent_submits_share_batches_in_order():
+    batches = []
+
+    async def double(items):
+        batches.append(list(items))
+        await asyncio.sleep(0.01)
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        await batcher.stop()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+
+    assert results == [i * 2 for i in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert [item for batch in batches for item in batch] == list(range(10))
+    assert batcher.get_stats()["largest_batch"] == 4
+
+
+def test_exception_reaches_every_caller_in_the_batch():
+    async def fail(items):
+        raise ValueError(f"bad batch of {len(items)}")
+
+    async def run():
+        batcher = MicroBatcher(fail, max_batch_size=8, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        # The batcher keeps serving after a failed batch
+        batcher.batch_fn = lambda items: asyncio.sleep(0, result=list(items))
+        after = await batcher.submit("next")
+        await batcher.stop()
+        return results, after
+
+    results, after = asyncio.run(run())
+
+    assert all(isinstance(result, ValueError) and str(result) == "bad batch of 3" for result in results)
+    assert after == "next"
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 3])
+def test_batches_run_up_to_max_concurrency(max_concurrency):
+    running = 0
+    peak = 0
+
+    async def slow(items):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return list(items)
+
+    async def run():
+        batcher = MicroBatcher(slow, max_batch_size=2, max_wait_ms=1, max_concurrency=max_concurrency)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(12)))
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == list(range(12))
+    assert peak == max_concurrency
+
+
+def test_items_queue_while_every_slot_is_busy():
+    batches = []
+    release = None
+
+    async def blocking(items):
+        batches.append(list(items))
+        if len(batches) == 1:
+            await release.wait()
+        return list(items)
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        batcher = MicroBatcher(blocking, max_batch_size=8, max_wait_ms=1)
+        first = asyncio.ensure_future(batcher.submit("first"))
+        await asyncio.sleep(0.02)
+        rest = [asyncio.ensure_future(batcher.submit(i)) for i in range(5)]
+        await asyncio.sleep(0.02)
+        release.set()
+        results = await asyncio.gather(first, *rest)
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == ["first", 0, 1, 2, 3, 4]
+    assert batches == [["first"], [0, 1, 2, 3, 4]]
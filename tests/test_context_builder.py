@@ -0,0 +1,102 @@
+import asyncio
+
+import numpy as np
+
+from context_builder import ContextBuilder, merge_overlapping, split_sentences
+
+
+class WordTokenizer:
+    """Tokenizer stub: one token per whitespace-separated word"""
+
+    def encode(self, text, add_special_tokens=True):
+        return text.split()
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+
+TOPICS = ["emissions", "water", "waste", "board"]
+
+
+async def embed_topics(texts):
+    """Embedder stub: one dimension per topic word a text mentions"""
+    return np.array([[float(topic in text.lower()) for topic in TOPICS] + [0.1] for text in texts])
+
+
+def question(topic):
+    return [float(name == topic) for name in TOPICS] + [0.0]
+
+
+def build(chunks, max_input_tokens, topic="emissions", prompt_tokens=0):
+    builder = ContextBuilder(WordTokenizer(), embed_topics, max_input_tokens=max_input_tokens)
+    return builder, asyncio.run(builder.build(question(topic), chunks, prompt_tokens))
+
+
+def test_merge_overlapping_drops_the_repeated_text():
+    previous = "Scope 1 emissions fell. The board approved a new climate target for 2030 and 2040."
+    following = "approved a new climate target for 2030 and 2040. Water use was flat."
+
+    assert merge_overlapping(previous, following) == (
+        "Scope 1 emissions fell. The board approved a new climate target for 2030 and 2040. Water use was flat."
+    )
+
+
+def test_merge_without_overlap_keeps_both():
+    assert merge_overlapping("First passage.", "Unrelated start.") == "First passage.\n\nUnrelated start."
+
+
+def test_consecutive_chunks_merge_into_one_passage():
+    builder = ContextBuilder(WordTokenizer(), embed_topics)
+    chunks = [
+        {"doc_id": "b", "chunk_index": 0, "text": "Waste was recycled."},
+        {"doc_id": "a", "chunk_index": 1, "text": "the overlap both chunks share at the seam. Then more."},
+        {"doc_id": "a", "chunk_index": 0, "text": "Chunk zero ends with the overlap both chunks share at the seam."},
+    ]
+
+    # The passage holding the best-ranked chunk comes first
+    assert builder.merge_passages(chunks) == [
+        "Waste was recycled.",
+        "Chunk zero ends with the overlap both chunks share at the seam. Then more."
+    ]
+
+
+def test_context_that_fits_is_kept_whole():
+    chunks = [{"doc_id": "a", "chunk_index": 0, "text": "Emissions fell. Water use rose."}]
+    builder, context = build(chunks, max_input_tokens=100)
+
+    assert context == "Emissions fell. Water use rose."
+    assert builder.trimmed_contexts == 0
+
+
+def test_packing_stays_within_budget_and_keeps_reading_order():
+    text = (
+        "Water withdrawals were stable across all sites. "
+        "Scope 1 emissions fell by ten percent. "
+        "The board met four times. "
+        "Scope 2 emissions fell by five percent. "
+        "Waste to landfill was halved."
+    )
+    chunks = [
+        {"doc_id": "a", "chunk_index": 0, "text": text},
+        {"doc_id": "b", "chunk_index": 3, "text": "Emissions targets are science based."},
+    ]
+    builder, context = build(chunks, max_input_tokens=30, prompt_tokens=10)
+
+    assert len(context.split()) <= 20
+    # The emissions sentences win and come back in document order
+    assert context == (
+        "Scope 1 emissions fell by ten percent. Scope 2 emissions fell by five percent."
+        "\n\nEmissions targets are science based."
+    )
+    assert builder.trimmed_contexts == 1
+
+
+def test_oversized_best_sentence_is_truncated_to_the_budget():
+    long_sentence = "Emissions " + " ".join(f"w{i}" for i in range(50)) + "."
+    _, context = build([{"doc_id": "a", "chunk_index": 0, "text": long_sentence}], max_input_tokens=8)
+
+    assert context.split() == long_sentence.split()[:8]
+
+
+def test_split_sentences():
+    assert split_sentences("One. Two!\n\nThree without end\n\nFour?") == ["One.", "Two!", "Three without end", "Four?"]
@@ -0,0 +1,117 @@
+import pytest
+
+# The processor module loads its embedding backends on import
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("transformers")
+
+from document_processor import DocumentProcessor
+
+
+class WordEncoding:
+    """Tokenizer stub: one token per whitespace-separated word"""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def make_processor():
+    processor = DocumentProcessor.__new__(DocumentProcessor)
+    processor.encoding = WordEncoding()
+    return processor
+
+
+def words(count, start=0):
+    return [f"w{i}" for i in range(start, start + count)]
+
+
+def baseline_chunks(tokens, chunk_size, overlap):
+    """The original whole-document chunker"""
+    chunks = []
+    start = 0
+    while start < len(tokens):
+        chunks.append(tokens[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+
+@pytest.mark.parametrize("count", [1, 10, 49, 50, 51, 499, 500, 501, 950, 1400, 2001])
+def test_matches_baseline_without_overlap_only_tail(count):
+    tokens = words(count)
+    expected = baseline_chunks(tokens, 500, 50)
+    # The baseline ended with a chunk holding only tokens the previous one
+    # already had; it is no longer emitted
+    if len(expected) > 1 and len(expected[-1]) <= 50:
+        expected = expected[:-1]
+
+    chunks = list(make_processor().iter_chunks([tokens], 500, 50))
+
+    assert [chunk["text"] for chunk in chunks] == [" ".join(chunk) for chunk in expected]
+    assert [chunk["chunk_index"] for chunk in chunks] == list(range(len(expected)))
+    assert [chunk["token_count"] for chunk in chunks] == [len(chunk) for chunk in expected]
+
+
+def test_overlap_carries_across_page_boundaries():
+    tokens = words(1234)
+    pages = [tokens[:7], tokens[7:300], [], tokens[300:301], tokens[301:]]
+
+    streamed = list(make_processor().iter_chunks(pages, 100, 20))
+    whole = list(make_processor().iter_chunks([tokens], 100, 20))
+
+    assert streamed == whole
+    for previous, chunk in zip(streamed, streamed[1:]):
+        assert previous["text"].split()[-20:] == chunk["text"].split()[:20]
+
+
+def test_every_token_is_covered():
+    tokens = words(777)
+    chunks = list(make_processor().iter_chunks([tokens[:333], tokens[333:]], 64, 16))
+
+    covered = [token for chunk in chunks for token in chunk["text"].split()[16 if chunk["chunk_index"] else 0:]]
+    assert covered == tokens
+
+
+def test_empty_document_has_no_chunks():
+    assert list(make_processor().iter_chunks([[], []])) == []
+
+
+def test_chunk_text_uses_the_streaming_chunker():
+    processor = make_processor()
+    text = " ".join(words(1400))
+
+    assert processor.chunk_text(text) == list(processor.iter_chunks([text.split()]))
+    assert [chunk["token_count"] for chunk in processor.chunk_text(text)] == [500, 500, 500]
+
+
+def make_pdf_processor(timeout):
+    processor = make_processor()
+    processor.pdf_workers = 2
+    processor.pdf_pages_per_task = 1
+    processor.pdf_task_timeout = timeout
+    processor._pdf_pool = None
+    return processor
+
+
+def test_hung_pdf_worker_is_replaced(monkeypatch):
+    import time
+
+    import document_processor
+    from tests import pdf_stubs
+
+    monkeypatch.setattr(document_processor, "count_pdf_pages", pdf_stubs.count_pages)
+    monkeypatch.setattr(document_processor, "extract_page_range", pdf_stubs.extract_pages_hanging_on_first)
+    processor = make_pdf_processor(timeout=5)
+    started = time.monotonic()
+    with pytest.raises(Exception, match="Timed out parsing pages 1-1"):
+        list(processor.iter_pdf_pages("report.pdf"))
+    assert time.monotonic() - started < 15
+    assert processor._pdf_pool is None
+
+    # The next document gets a fresh pool instead of waiting on the hung worker
+    monkeypatch.setattr(document_processor, "extract_page_range", pdf_stubs.extract_pages)
+    try:
+        assert list(processor.iter_pdf_pages("report.pdf")) == [f"page {number}\n" for number in range(4)]
+    finally:
+        processor._pdf_pool.shutdown()
@@ -0,0 +1,44 @@
+import sqlite3
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), "model", 4)
+    vectors = np.arange(8, dtype=np.float32).reshape(2, 4)
+    cache.put_many(["a", "b"], vectors)
+    cache.put_many(["a"], vectors[:1])
+
+    found = cache.get_many(["b", "c", "a"])
+
+    assert sorted(found) == [0, 2]
+    assert np.array_equal(found[0], vectors[1]) and np.array_equal(found[2], vectors[0])
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 2, 1)
+    cache.close()
+
+
+def test_entries_are_counted_on_open(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, "model", 2)
+    cache.put_many(["a", "b", "c"], np.ones((3, 2), dtype=np.float32))
+    cache.close()
+
+    assert EmbeddingCache(path, "model", 2).get_stats()["entries"] == 3
+    assert EmbeddingCache(path, "other-model", 2).get_stats()["entries"] == 0
+
+
+def test_unreadable_cache_counts_as_misses(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = EmbeddingCache(str(path), "model", 2)
+    cache.put_many(["a"], np.ones((1, 2), dtype=np.float32))
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("DROP TABLE embeddings")
+
+    assert cache.get_many(["a", "b"]) == {}
+    assert cache.misses == 2
+    # Writes fail the same way without raising
+    cache.put_many(["c"], np.ones((1, 2), dtype=np.float32))
+    cache.close()
@@ -0,0 +1,90 @@
+import asyncio
+
+import numpy as np
+
+from index_follower import IndexFollower
+from vector_store import VectorStore
+
+DIMENSION = 8
+
+
+def add_document(store, doc_id, count=10):
+    vectors = np.random.default_rng(len(doc_id)).random((count, DIMENSION), dtype=np.float32)
+    store.add_vectors(vectors, [
+        {"doc_id": doc_id, "filename": f"{doc_id}.txt", "chunk_index": i, "text": f"{doc_id} chunk {i}", "token_count": 3}
+        for i in range(count)
+    ])
+
+
+def open_store(path, **kwargs):
+    return VectorStore(dimension=DIMENSION, index_path=str(path), compact_tombstone_ratio=1.0, **kwargs)
+
+
+def test_refresh_applies_new_records(tmp_path):
+    writer = open_store(tmp_path)
+    reader = open_store(tmp_path, read_only=True)
+    follower = IndexFollower(reader)
+    try:
+        add_document(writer, "a")
+        add_document(writer, "b")
+        follower.refresh()
+
+        assert follower.records_applied == 2
+        assert follower.reloads == 0
+        assert reader.version == writer.version
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_refresh_reloads_after_compaction(tmp_path):
+    writer = open_store(tmp_path)
+    reader = open_store(tmp_path, read_only=True)
+    follower = IndexFollower(reader)
+    try:
+        add_document(writer, "a")
+        writer.delete_by_document_id("a")
+        add_document(writer, "b")
+        writer.compact()
+        follower.refresh()
+
+        assert follower.reloads == 1
+        assert reader.snapshot_generation == writer.snapshot_generation
+        assert reader.get_total_vectors() == 10
+        assert follower.get_stats()["role"] == "reader"
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_follower_promotes_when_the_writer_exits(tmp_path):
+    writer = open_store(tmp_path)
+    reader = open_store(tmp_path, read_only=True)
+    promoted = []
+
+    async def on_promote():
+        promoted.append(True)
+
+    async def follow():
+        follower = IndexFollower(reader, interval_seconds=0.01, on_promote=on_promote)
+        follower.start()
+        await asyncio.sleep(0.05)
+        assert not follower.promoted
+        add_document(writer, "a")
+        writer.close()
+        for _ in range(100):
+            if follower.promoted:
+                break
+            await asyncio.sleep(0.01)
+        await follower.stop()
+        return follower
+
+    try:
+        follower = asyncio.run(follow())
+
+        assert follower.promoted and promoted == [True]
+        assert follower.get_stats()["role"] == "writer"
+        assert reader.get_total_vectors() == 10
+        add_document(reader, "b")
+    finally:
+        reader.close()
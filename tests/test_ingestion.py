@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+from ingestion import IngestionJob, IngestionQueue, QueueFullError
+
+
+def make_job(*doc_ids):
+    return IngestionJob([
+        {"doc_id": doc_id, "filename": f"{doc_id}.pdf", "file_path": f"/tmp/{doc_id}.pdf"}
+        for doc_id in doc_ids
+    ])
+
+
+def test_submit_raises_when_the_queue_is_full():
+    async def run():
+        blocked = asyncio.Event()
+
+        async def handler(job):
+            await blocked.wait()
+
+        queue = IngestionQueue(handler, workers=1, max_pending=1)
+        queue.start()
+        queue.submit(make_job("a"))
+        await asyncio.sleep(0)  # the worker takes the first job
+        queue.submit(make_job("b"))
+        assert queue.is_full()
+        with pytest.raises(QueueFullError):
+            queue.submit(make_job("c"))
+        blocked.set()
+        await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_submit_requires_a_started_queue():
+    async def handler(job):
+        pass
+
+    with pytest.raises(RuntimeError):
+        IngestionQueue(handler).submit(make_job("a"))
+
+
+def test_workers_finish_jobs_as_done_or_error():
+    async def run():
+        async def handler(job):
+            job.set_stage("extracting")
+            if job.files[0]["doc_id"] == "bad":
+                raise ValueError("unreadable")
+
+        queue = IngestionQueue(handler, workers=2)
+        queue.start()
+        good = queue.submit(make_job("good"))
+        bad = queue.submit(make_job("bad"))
+        await queue._queue.join()
+        await queue.stop()
+        return good, bad
+
+    good, bad = asyncio.run(run())
+
+    assert good.stage == "done" and good.error is None
+    assert bad.stage == "error" and bad.error == "unreadable"
+    assert good.finished_at is not None and bad.finished_at is not None
+
+
+def test_prune_keeps_unfinished_jobs():
+    async def run():
+        release = asyncio.Event()
+
+        async def handler(job):
+            if job.files[0]["doc_id"] == "slow":
+                await release.wait()
+
+        queue = IngestionQueue(handler, workers=1, max_retained=2)
+        queue.start()
+        slow = queue.submit(make_job("slow"))
+        waiting = [queue.submit(make_job(f"w{i}")) for i in range(3)]
+        # Nothing has finished yet, so nothing can be forgotten
+        assert len(queue.jobs) == 4
+        release.set()
+        await queue._queue.join()
+        queue.submit(make_job("last"))
+        await queue._queue.join()
+        await queue.stop()
+        return queue, slow, waiting
+
+    queue, slow, waiting = asyncio.run(run())
+
+    # The oldest finished jobs go first once over the limit
+    assert queue.get(slow.job_id) is None
+    assert list(queue.jobs)[0] == waiting[-1].job_id
+    assert len(queue.jobs) == 2
+
+
+def test_mark_deleted_only_touches_unfinished_jobs():
+    async def run():
+        release = asyncio.Event()
+
+        async def handler(job):
+            await release.wait()
+
+        queue = IngestionQueue(handler, workers=1)
+        queue.start()
+        done = queue.submit(make_job("a"))
+        release.set()
+        await queue._queue.join()
+        release.clear()
+        running = queue.submit(make_job("a", "b"))
+        await asyncio.sleep(0)
+        queue.mark_deleted("a")
+        release.set()
+        await queue._queue.join()
+        await queue.stop()
+        return done, running
+
+    done, running = asyncio.run(run())
+
+    assert done.files[0]["status"] == "queued" and not done.deleted
+    assert running.deleted == {"a"}
+    assert [file["status"] for file in running.files] == ["deleted", "queued"]
+
+
+def test_deleted_files_count_as_done():
+    job = make_job("a", "b")
+    job.mark_deleted("a")
+    job.files[1]["status"] = "ready"
+
+    assert job.to_dict()["files_done"] == 2
+    assert "file_path" not in job.to_dict()["files"][0]
+
+
+def test_estimate_chunks_extrapolates_pages():
+    job = make_job("a", "b", "c")
+    job.files[0].update(status="processing", pages_total=10, pages_done=2, chunk_count=8)
+    job.chunks_done = 4
+    job.estimate_chunks()
+    # 40 for the file being parsed, and the same for each file not started
+    assert job.chunks_total == 120
+
+    job.files[0].update(status="indexed", pages_done=10, chunk_count=40)
+    job.files[1].update(status="processing", pages_total=4, pages_done=1, chunk_count=5)
+    job.chunks_done = 40
+    job.estimate_chunks()
+    assert job.chunks_total == 40 + 20 + 30
+
+
+def test_estimate_never_falls_below_chunks_done():
+    job = make_job("a")
+    job.files[0].update(status="processing", pages_total=None, pages_done=0, chunk_count=3)
+    job.chunks_done = 10
+    job.estimate_chunks()
+
+    assert job.chunks_total == 10
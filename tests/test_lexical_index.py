@@ -0,0 +1,87 @@
+import numpy as np
+
+from lexical_index import LexicalIndex, tokenize
+
+
+def build():
+    index = LexicalIndex()
+    index.add([0, 1, 2], [
+        "Scope 1 emissions fell by ten percent",
+        "Water withdrawal in water stressed regions",
+        "Scope 3 emissions from purchased goods and emissions targets"
+    ])
+    return index
+
+
+def test_tokenize_keeps_and_splits_compound_terms():
+    assert tokenize("The Scope-3 Emissions of 2023") == ["scope-3", "scope", "3", "emissions", "2023"]
+
+
+def test_search_ranks_by_bm25():
+    ids, scores = build().search("emissions", k=5)
+
+    assert ids.tolist() == [2, 0]
+    assert scores[0] > scores[1] > 0
+
+
+def test_search_restricted_to_ids():
+    ids, _ = build().search("emissions", k=5, ids=np.array([0, 1]))
+
+    assert ids.tolist() == [0]
+
+
+def test_no_matching_terms():
+    ids, scores = build().search("biodiversity", k=5)
+
+    assert len(ids) == 0 and len(scores) == 0
+
+
+def test_removed_ids_are_not_returned():
+    index = build()
+    index.remove([2])
+
+    assert index.search("emissions", k=5)[0].tolist() == [0]
+    assert len(index) == 2
+
+    index.compact()
+    assert index.removed_count == 0
+    assert index.search("emissions", k=5)[0].tolist() == [0]
+
+
+def test_serialize_round_trip():
+    index = build()
+    index.remove([0])
+    restored = LexicalIndex.deserialize(index.serialize())
+
+    for query in ("emissions", "water regions", "scope goods"):
+        expected_ids, expected_scores = index.search(query, k=5)
+        ids, scores = restored.search(query, k=5)
+        assert ids.tolist() == expected_ids.tolist()
+        assert np.allclose(scores, expected_scores)
+    assert restored.get_stats() == index.get_stats()
+
+
+def test_scores_match_a_brute_force_bm25():
+    rng = np.random.default_rng(0)
+    words = [f"w{i}" for i in range(30)]
+    texts = [" ".join(rng.choice(words, size=rng.integers(3, 20))) for _ in range(200)]
+    index = LexicalIndex()
+    index.add(range(len(texts)), texts)
+    index.remove(range(0, 200, 7))
+
+    live = {i: texts[i].split() for i in range(len(texts)) if i % 7}
+    average_length = sum(len(terms) for terms in live.values()) / len(live)
+    query = ["w1", "w2", "w3", "w29"]
+    expected = {}
+    for term in query:
+        matches = {i: terms.count(term) for i, terms in live.items() if term in terms}
+        idf = np.log(1.0 + (len(live) - len(matches) + 0.5) / (len(matches) + 0.5))
+        for i, frequency in matches.items():
+            norm = index.k1 * (1.0 - index.b + index.b * len(live[i]) / average_length)
+            expected[i] = expected.get(i, 0.0) + idf * frequency * (index.k1 + 1.0) / (frequency + norm)
+
+    ids, scores = index.search(" ".join(query), k=10)
+    best = sorted(expected, key=lambda i: -expected[i])[:10]
+
+    assert np.allclose(scores, [expected[i] for i in best], rtol=1e-5)
+    assert np.allclose([expected[i] for i in ids.tolist()], scores, rtol=1e-5)
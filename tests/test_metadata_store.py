@@ -0,0 +1,149 @@
+import numpy as np
+
+from metadata_store import MetadataStore
+
+
+def chunks(doc_id, count, start=0):
+    return [
+        {
+            "doc_id": doc_id,
+            "filename": f"{doc_id}.pdf",
+            "chunk_index": i,
+            "text": f"{doc_id} chunk {i} é",
+            "token_count": i + 1
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def open_store(path, **kwargs):
+    store = MetadataStore(path, **kwargs)
+    store.open_log(0)
+    return store
+
+
+def snapshot(store, generation):
+    capture = store.capture()
+    store.open_log(generation)
+    store.write_snapshot(generation, capture)
+    store.finish_snapshot(generation, capture)
+    return capture
+
+
+def test_rows_round_trip(tmp_path):
+    store = open_store(tmp_path)
+    store.add(np.arange(3), chunks("a", 3))
+    store.add(np.arange(3, 5), chunks("b", 2))
+
+    assert len(store) == 5
+    assert store.get(np.array([4, 0, 9])) == [chunks("b", 2)[1], chunks("a", 3)[0], None]
+    assert store.get_stats()["documents"] == 2
+    store.close()
+
+
+def test_delete_document(tmp_path):
+    store = open_store(tmp_path)
+    store.add(np.arange(3), chunks("a", 3))
+    store.add(np.arange(3, 5), chunks("b", 2))
+
+    assert store.delete_document("a").tolist() == [0, 1, 2]
+    assert store.delete_document("a") is None
+    assert len(store) == 2
+    assert store.live_mask(np.arange(5)).tolist() == [False, False, False, True, True]
+    assert store.live_ids().tolist() == [3, 4]
+    assert store.get(np.array([1])) == [None]
+    store.close()
+
+
+def test_ids_for_documents(tmp_path):
+    store = open_store(tmp_path)
+    store.add(np.arange(2), chunks("a", 2))
+    store.add(np.arange(2, 4), chunks("b", 2))
+    store.add(np.arange(4, 6), chunks("a", 2, start=2))
+
+    assert store.ids_for_documents(["a"]).tolist() == [0, 1, 4, 5]
+    assert store.ids_for_documents(["b", "missing", "b"]).tolist() == [2, 3]
+    assert store.ids_for_documents(["missing"]).size == 0
+    store.close()
+
+
+def test_snapshot_drops_deleted_rows_and_reloads(tmp_path):
+    store = open_store(tmp_path)
+    store.add(np.arange(3), chunks("a", 3))
+    store.add(np.arange(3, 5), chunks("b", 2))
+    store.delete_document("a")
+    capture = snapshot(store, 1)
+    store.remove_files(1)
+
+    assert store.get(np.array([3, 4])) == chunks("b", 2)
+    assert not (tmp_path / "text-000000.log").exists()
+    store.close()
+
+    reopened = MetadataStore(tmp_path)
+    reopened.load_snapshot(1, capture["documents"])
+    try:
+        assert len(reopened) == 2
+        assert reopened.get(np.array([3, 4])) == chunks("b", 2)
+        assert reopened.ids_for_documents(["a"]).size == 0
+    finally:
+        reopened.close()
+
+
+def test_apply_waits_for_text(tmp_path):
+    writer = open_store(tmp_path)
+    reader = open_store(tmp_path, read_only=True)
+    record = writer.add(np.arange(2), chunks("a", 2))
+    writer.sync()
+
+    assert reader.apply(record)
+    assert reader.get(np.arange(2)) == chunks("a", 2)
+
+    # A record pointing past the text that has reached the log is refused
+    truncated = {"rows": record["rows"].copy(), "documents": []}
+    truncated["rows"]["offset"] += 10 ** 6
+    assert not reader.apply(truncated)
+    reader.close()
+    writer.close()
+
+
+def test_legacy_metadata_is_rewritten_by_a_snapshot(tmp_path):
+    store = open_store(tmp_path)
+    store.import_legacy(np.arange(3), chunks("a", 3))
+    assert store.needs_rewrite
+
+    snapshot(store, 1)
+
+    assert not store.needs_rewrite
+    assert store.get(np.arange(3)) == chunks("a", 3)
+    store.close()
+
+
+def test_mapped_rows_are_remapped_after_a_snapshot(tmp_path):
+    store = open_store(tmp_path, mmap=True)
+    store.add(np.arange(3), chunks("a", 3))
+    store.add(np.arange(3, 5), chunks("b", 2))
+    snapshot(store, 1)
+
+    assert isinstance(store._rows, np.memmap)
+    assert store.get(np.arange(5)) == chunks("a", 3) + chunks("b", 2)
+    store.close()
+
+
+def test_changes_during_a_snapshot_survive_the_remap(tmp_path):
+    store = open_store(tmp_path, mmap=True)
+    store.add(np.arange(3), chunks("a", 3))
+    store.add(np.arange(3, 5), chunks("b", 2))
+    store.delete_document("b")
+    capture = store.capture()
+    store.open_log(1)
+    # Made after the capture, while the snapshot is being written
+    store.delete_document("a")
+    store.add(np.arange(5, 7), chunks("c", 2))
+    store.write_snapshot(1, capture)
+    store.finish_snapshot(1, capture)
+
+    assert len(store) == 2
+    assert store.live_ids().tolist() == [5, 6]
+    assert store.get(np.arange(7)) == [None] * 5 + chunks("c", 2)
+    assert store.ids_for_documents(["a", "c"]).tolist() == [5, 6]
+    store.close()
@@ -0,0 +1,116 @@
+import numpy as np
+
+import query_cache
+from query_cache import LRUCache, SemanticCache, normalize_question
+
+
+class Clock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_question():
+    assert normalize_question("  What were\tScope 1\nEMISSIONS? ") == "what were scope 1 emissions?"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1 and len(cache) == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    cache = LRUCache(max_entries=10, ttl_seconds=60)
+    cache.put("a", 1)
+
+    clock.now += 59
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_new_index_version_misses():
+    # Answers are keyed on the vector store version they were computed at
+    cache = LRUCache(max_entries=10)
+    cache.put(("question", 5, 7), "answer")
+
+    assert cache.get(("question", 5, 7)) == "answer"
+    assert cache.get(("question", 5, 8)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_zero_entries_disables_the_cache():
+    cache = LRUCache(max_entries=0)
+    cache.put("a", 1)
+
+    assert not cache.enabled
+    assert cache.get("a") is None
+    assert cache.get_stats()["misses"] == 0
+
+
+def unit(*components):
+    vector = np.zeros(4, dtype=np.float32)
+    vector[:len(components)] = components
+    return vector
+
+
+def test_similar_question_hits_above_threshold():
+    cache = SemanticCache(dimension=4, threshold=0.95)
+    cache.put(unit(1, 0), "params", 1, "answer")
+
+    # Scale does not matter, only the angle
+    assert cache.get(unit(5, 0.1), "params", 1) == "answer"
+    # cos = 0.94, just under the threshold
+    assert cache.get(unit(0.94, 0.3412), "params", 1) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_search_params_must_match():
+    cache = SemanticCache(dimension=4)
+    cache.put(unit(1, 0), (5, None), 1, "top 5")
+    cache.put(unit(1, 0), (10, None), 1, "top 10")
+
+    assert cache.get(unit(1, 0), (10, None), 1) == "top 10"
+    assert cache.get(unit(1, 0), (3, None), 1) is None
+
+
+def test_newer_index_version_empties_the_cache():
+    cache = SemanticCache(dimension=4)
+    cache.put(unit(1, 0), "params", 1, "old")
+
+    assert cache.get(unit(1, 0), "params", 2) is None
+    assert len(cache) == 0
+    # Answers computed against an older version are not stored
+    cache.put(unit(1, 0), "params", 1, "stale")
+    assert len(cache) == 0 and cache.version == 2
+
+
+def test_semantic_entries_expire_and_evict(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    cache = SemanticCache(dimension=4, max_entries=2, ttl_seconds=60)
+    cache.put(unit(1, 0), "params", 1, "a")
+    cache.put(unit(0, 1), "params", 1, "b")
+    assert cache.get(unit(1, 0), "params", 1) == "a"
+    cache.put(unit(0, 0, 1), "params", 1, "c")
+
+    # "b" was the least recently used
+    assert cache.get(unit(0, 1), "params", 1) is None
+    assert cache.evictions == 1
+    clock.now += 61
+    assert cache.get(unit(1, 0), "params", 1) is None
+    assert len(cache) == 1
@@ -0,0 +1,409 @@
+import numpy as np
+import pytest
+
+from vector_store import VectorStore
+from writer_lock import WriterLockedError
+
+DIMENSION = 16
+
+
+def chunks(doc_id, count):
+    return [
+        {
+            "doc_id": doc_id,
+            "filename": f"{doc_id}.pdf",
+            "chunk_index": i,
+            "text": f"{doc_id} scope emissions chunk {i} term{i % 5}",
+            "token_count": 6
+        }
+        for i in range(count)
+    ]
+
+
+def vectors(count, seed):
+    return np.random.default_rng(seed).random((count, DIMENSION), dtype=np.float32)
+
+
+def open_store(path, **kwargs):
+    # Compaction only runs when a test asks for it
+    kwargs.setdefault("compact_wal_bytes", 1 << 40)
+    kwargs.setdefault("compact_tombstone_ratio", 1.0)
+    return VectorStore(dimension=DIMENSION, index_path=str(path), **kwargs)
+
+
+def doc_ids(hits):
+    return {hit["doc_id"] for hit in hits}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = open_store(tmp_path)
+    yield store
+    store.close()
+
+
+def test_restart_replays_log(tmp_path):
+    store = open_store(tmp_path)
+    store.add_vectors(vectors(20, 0), chunks("a", 20))
+    store.add_vectors(vectors(10, 1), chunks("b", 10))
+    store.delete_by_document_id("a")
+    query = vectors(1, 2)[0]
+    expected = store.search(query, k=5)
+    version = store.version
+    store.close()
+
+    reopened = open_store(tmp_path)
+    try:
+        assert reopened.generation == 0
+        assert reopened.get_total_vectors() == 10
+        assert reopened.version == version
+        assert reopened.search(query, k=5) == expected
+    finally:
+        reopened.close()
+
+
+def test_unsaved_batches_survive_a_clean_close(tmp_path):
+    store = open_store(tmp_path)
+    store.add_vectors(vectors(5, 0), chunks("a", 5), persist=False)
+    store.add_vectors(vectors(5, 1), chunks("a", 5), persist=False)
+    store.close()
+
+    reopened = open_store(tmp_path)
+    try:
+        assert reopened.get_total_vectors() == 10
+    finally:
+        reopened.close()
+
+
+def test_torn_log_tail_is_repaired(tmp_path):
+    store = open_store(tmp_path)
+    store.add_vectors(vectors(10, 0), chunks("a", 10))
+    wal_path = store._wal_file(store.generation)
+    store.close()
+    good_size = wal_path.stat().st_size
+    with open(wal_path, 'ab') as f:
+        f.write(b"\x40\x00\x00\x00torn record")
+
+    reopened = open_store(tmp_path)
+    try:
+        assert reopened.get_total_vectors() == 10
+        assert wal_path.stat().st_size == good_size
+        reopened.add_vectors(vectors(5, 1), chunks("b", 5))
+    finally:
+        reopened.close()
+
+    reopened = open_store(tmp_path)
+    try:
+        assert reopened.get_total_vectors() == 15
+    finally:
+        reopened.close()
+
+
+def test_compaction_and_reopen(tmp_path):
+    store = open_store(tmp_path)
+    store.add_vectors(vectors(30, 0), chunks("a", 30))
+    store.add_vectors(vectors(30, 1), chunks("b", 30))
+    store.delete_by_document_id("a")
+    old_wal = store._wal_file(store.generation)
+    store.compact()
+
+    assert store.generation == 1
+    assert not store.tombstones
+    assert not old_wal.exists()
+    store.add_vectors(vectors(5, 3), chunks("c", 5))
+    query = vectors(1, 2)[0]
+    expected = store.search(query, k=5, query_text="term3 emissions")
+    store.close()
+
+    reopened = open_store(tmp_path)
+    try:
+        assert reopened.generation == 1
+        assert reopened.get_total_vectors() == 35
+        assert reopened.search(query, k=5, query_text="term3 emissions") == expected
+    finally:
+        reopened.close()
+
+
+def test_deleted_documents_are_never_returned(store):
+    store.add_vectors(vectors(20, 0), chunks("a", 20))
+    store.add_vectors(vectors(20, 1), chunks("b", 20))
+    store.delete_by_document_id("a")
+
+    assert len(store.tombstones) == 20
+    assert store.get_total_vectors() == 20
+    for query in vectors(5, 2):
+        assert doc_ids(store.search(query, k=30)) == {"b"}
+        assert doc_ids(store.search(query, k=30, query_text="a scope emissions")) == {"b"}
+    assert store.search(vectors(1, 3)[0], k=5, doc_ids=["a"]) == []
+
+
+def test_delete_of_unknown_document_is_not_logged(store):
+    store.add_vectors(vectors(5, 0), chunks("a", 5))
+    version = store.version
+
+    store.delete_by_document_id("missing")
+
+    assert store.version == version
+
+
+def test_compaction_purges_tombstones(tmp_path):
+    store = open_store(tmp_path)
+    store.add_vectors(vectors(20, 0), chunks("a", 20))
+    store.add_vectors(vectors(20, 1), chunks("b", 20))
+    store.delete_by_document_id("a")
+    store.compact()
+
+    assert not store.tombstones
+    assert store.index.ntotal == 20
+    store.close()
+
+    reopened = open_store(tmp_path)
+    try:
+        assert reopened.get_total_vectors() == 20
+        assert doc_ids(reopened.search(vectors(1, 2)[0], k=40)) == {"b"}
+    finally:
+        reopened.close()
+
+
+def test_document_filter(store):
+    store.add_vectors(vectors(20, 0), chunks("a", 20))
+    store.add_vectors(vectors(20, 1), chunks("b", 20))
+
+    hits = store.search(vectors(1, 2)[0], k=10, doc_ids=["b"])
+
+    assert len(hits) == 10
+    assert doc_ids(hits) == {"b"}
+
+
+def test_hybrid_search_ranks_lexical_matches(store):
+    store.add_vectors(vectors(20, 0), chunks("a", 20))
+
+    hits = store.search(vectors(1, 1)[0], k=3, query_text="term4")
+
+    assert hits[0]["lexical_score"] is not None
+    assert hits[0]["chunk_index"] % 5 == 4
+
+
+def test_second_writer_is_refused(store, tmp_path):
+    with pytest.raises(WriterLockedError):
+        open_store(tmp_path)
+
+
+def test_read_only_store_is_not_writable(store, tmp_path):
+    reader = open_store(tmp_path, read_only=True)
+    try:
+        with pytest.raises(RuntimeError):
+            reader.add_vectors(vectors(1, 0), chunks("a", 1))
+    finally:
+        reader.close()
+
+
+def test_follower_catch_up(store, tmp_path):
+    reader = open_store(tmp_path, read_only=True)
+    try:
+        store.add_vectors(vectors(20, 0), chunks("a", 20))
+        store.add_vectors(vectors(20, 1), chunks("b", 20))
+        store.delete_by_document_id("a")
+
+        assert reader.catch_up() == 3
+        assert reader.catch_up() == 0
+        assert reader.version == store.version
+        query = vectors(1, 2)[0]
+        assert reader.search(query, k=5, query_text="term1") == store.search(query, k=5, query_text="term1")
+    finally:
+        reader.close()
+
+
+def test_follower_ignores_a_record_still_being_written(store, tmp_path):
+    reader = open_store(tmp_path, read_only=True)
+    try:
+        store.add_vectors(vectors(10, 0), chunks("a", 10))
+        wal_path = store._wal_file(store.generation)
+        size = wal_path.stat().st_size
+        with open(wal_path, 'ab') as f:
+            f.write(b"\x40\x00\x00\x00partial")
+
+        assert reader.catch_up() == 1
+        # Only the writer repairs its own log
+        assert wal_path.stat().st_size > size
+        assert reader.get_total_vectors() == 10
+    finally:
+        reader.close()
+
+
+def test_follower_reload_after_compaction(store, tmp_path):
+    reader = open_store(tmp_path, read_only=True)
+    try:
+        store.add_vectors(vectors(20, 0), chunks("a", 20))
+        store.compact()
+        store.add_vectors(vectors(5, 1), chunks("b", 5))
+
+        assert reader.stale
+        reader.reload()
+        assert not reader.stale
+        assert reader.snapshot_generation == store.snapshot_generation
+        assert reader.get_total_vectors() == 25
+        assert reader.version == store.version
+    finally:
+        reader.close()
+
+
+def test_follower_promotes_once_the_writer_exits(tmp_path):
+    writer = open_store(tmp_path)
+    reader = open_store(tmp_path, read_only=True)
+    try:
+        writer.add_vectors(vectors(10, 0), chunks("a", 10))
+        assert not reader.promote()
+        writer.add_vectors(vectors(10, 1), chunks("b", 10))
+        writer.close()
+
+        assert reader.promote()
+        assert not reader.read_only
+        assert reader.get_total_vectors() == 20
+        reader.delete_by_document_id("a")
+        reader.add_vectors(vectors(5, 2), chunks("c", 5))
+    finally:
+        reader.close()
+
+    reopened = open_store(tmp_path)
+    try:
+        assert reopened.get_total_vectors() == 15
+        assert reopened.metadata.ids_for_documents(["a"]).size == 0
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf"])
+def test_other_index_types_replay_and_delete(tmp_path, index_type):
+    store = open_store(tmp_path, index_type=index_type, ivf_nlist=4, train_min_vectors=50)
+    store.add_vectors(vectors(60, 0), chunks("a", 60))
+    store.add_vectors(vectors(60, 1), chunks("b", 60))
+    store.delete_by_document_id("a")
+    store.compact()
+    store.close()
+
+    reopened = open_store(tmp_path, index_type=index_type, ivf_nlist=4, train_min_vectors=50)
+    try:
+        assert reopened.get_total_vectors() == 60
+        assert doc_ids(reopened.search(vectors(1, 2)[0], k=10, nprobe=4)) == {"b"}
+    finally:
+        reopened.close()
+
+
+def test_memory_mapped_snapshot_with_delta(tmp_path):
+    store = open_store(tmp_path)
+    store.add_vectors(vectors(30, 0), chunks("a", 30))
+    store.compact()
+    store.close()
+
+    mapped = open_store(tmp_path, mmap=True)
+    try:
+        assert mapped.get_index_info()["memory_mapped"]
+        assert isinstance(mapped.metadata._rows, np.memmap)
+        mapped.add_vectors(vectors(10, 1), chunks("b", 10))
+        mapped.delete_by_document_id("a")
+        assert doc_ids(mapped.search(vectors(1, 2)[0], k=20)) == {"b"}
+        mapped.compact()
+        assert isinstance(mapped.metadata._rows, np.memmap)
+        assert mapped.get_total_vectors() == 10
+        assert doc_ids(mapped.search(vectors(1, 2)[0], k=20)) == {"b"}
+    finally:
+        mapped.close()
+
+
+def test_hnsw_rebuilds_only_past_the_tombstone_ratio(tmp_path):
+    store = open_store(tmp_path, index_type="hnsw", compact_tombstone_ratio=0.5)
+    try:
+        store.add_vectors(vectors(40, 0), chunks("a", 40))
+        store.add_vectors(vectors(10, 1), chunks("b", 10))
+        store.add_vectors(vectors(50, 2), chunks("c", 50))
+        store.delete_by_document_id("b")
+        store.compact()
+        # HNSW cannot remove vectors, so a few tombstones are carried over
+        assert len(store.tombstones) == 10
+        assert store.index.ntotal == 100
+        assert "b" not in doc_ids(store.search(vectors(1, 3)[0], k=90))
+
+        store.delete_by_document_id("a")
+        store.compact()
+        assert not store.tombstones
+        assert store.index.ntotal == 50
+    finally:
+        store.close()
+
+
+def test_pq_sub_quantizers_must_divide_the_dimension(tmp_path):
+    with pytest.raises(ValueError):
+        open_store(tmp_path, index_type="ivfpq", pq_m=5)
+
+
+def test_training_threshold_is_clamped(tmp_path):
+    store = open_store(tmp_path, index_type="ivfpq", ivf_nlist=4, pq_m=4, train_min_vectors=10)
+    try:
+        assert store.train_min_vectors == 256
+    finally:
+        store.close()
+
+
+def test_failed_rebuild_still_writes_a_snapshot(tmp_path, monkeypatch):
+    import vector_store
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("training failed")
+
+    monkeypatch.setattr(vector_store, "train_index", fail)
+    store = open_store(tmp_path, index_type="ivf", ivf_nlist=4, train_min_vectors=20)
+    try:
+        store.add_vectors(vectors(30, 0), chunks("a", 30), persist=False)
+        store.compact()
+
+        assert store.generation == 1
+        assert store.live_spec == "flat"
+        assert store.get_total_vectors() == 30
+    finally:
+        store.close()
+
+    monkeypatch.undo()
+    reopened = open_store(tmp_path, index_type="ivf", ivf_nlist=4, train_min_vectors=20)
+    try:
+        reopened.compact()
+        assert reopened.live_spec == "ivf(nlist=4)"
+        assert reopened.get_total_vectors() == 30
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("storage", ["float32", "fp16", "int8"])
+def test_cosine_distances_agree_across_search_paths(tmp_path, storage):
+    store = open_store(tmp_path, metric="cosine", storage=storage, train_min_vectors=50)
+    try:
+        stored = vectors(100, 0)
+        store.add_vectors(stored[:50], chunks("a", 50))
+        store.add_vectors(stored[50:], chunks("b", 50))
+        store.compact()
+        assert storage in store.live_spec or storage == "float32"
+
+        # Stored vectors scaled up still match themselves under cosine
+        queries = stored[:5] * 3.0
+        ann = store.search_batch(queries, k=10)
+        exact = store.search_batch(queries, k=10, doc_ids=["a", "b"])
+        for ann_hits, exact_hits, chunk_index in zip(ann, exact, range(5)):
+            assert (ann_hits[0]["doc_id"], ann_hits[0]["chunk_index"]) == ("a", chunk_index)
+            assert all(0.0 <= hit["distance"] <= 2.0 for hit in ann_hits + exact_hits)
+            assert ann_hits[0]["distance"] == pytest.approx(exact_hits[0]["distance"], abs=1e-3)
+    finally:
+        store.close()
+
+
+def test_quantized_storage_survives_reopen(tmp_path):
+    store = open_store(tmp_path, storage="fp16")
+    store.add_vectors(vectors(20, 0), chunks("a", 20))
+    store.compact()
+    store.close()
+
+    reopened = open_store(tmp_path, storage="fp16")
+    try:
+        assert reopened.get_index_info()["storage"] == "fp16"
+        assert reopened.search(vectors(20, 0)[3], k=1)[0]["chunk_index"] == 3
+    finally:
+        reopened.close()
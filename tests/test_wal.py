@@ -0,0 +1,67 @@
+from wal import HEADER, WriteAheadLog
+
+
+def write_records(path, count):
+    wal = WriteAheadLog(path)
+    for i in range(count):
+        wal.append({"op": "add", "i": i})
+    wal.close()
+
+
+def test_replay_yields_records_in_order(tmp_path):
+    path = tmp_path / "wal-0.log"
+    write_records(path, 3)
+
+    records = list(WriteAheadLog.replay(path))
+
+    assert [record["i"] for _, _, record in records] == [0, 1, 2]
+    assert records[0][0] == 0
+    assert records[-1][1] == path.stat().st_size
+
+
+def test_replay_resumes_from_record_boundary(tmp_path):
+    path = tmp_path / "wal-0.log"
+    write_records(path, 3)
+    _, end, _ = next(WriteAheadLog.replay(path))
+
+    assert [record["i"] for _, _, record in WriteAheadLog.replay(path, start=end)] == [1, 2]
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    path = tmp_path / "wal-0.log"
+    write_records(path, 2)
+    good_size = path.stat().st_size
+    with open(path, 'ab') as f:
+        f.write(HEADER.pack(100, 0) + b"partial")
+
+    assert [record["i"] for _, _, record in WriteAheadLog.replay(path)] == [0, 1]
+    assert path.stat().st_size == good_size
+
+    # Appends after the repair start from the last good record
+    write_records(path, 1)
+    assert [record["i"] for _, _, record in WriteAheadLog.replay(path)] == [0, 1, 0]
+
+
+def test_corrupt_record_ends_replay(tmp_path):
+    path = tmp_path / "wal-0.log"
+    write_records(path, 2)
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    assert [record["i"] for _, _, record in WriteAheadLog.replay(path)] == [0]
+
+
+def test_replay_without_repair_leaves_tail(tmp_path):
+    path = tmp_path / "wal-0.log"
+    write_records(path, 1)
+    with open(path, 'ab') as f:
+        f.write(b"\x10\x00")
+    size = path.stat().st_size
+
+    assert len(list(WriteAheadLog.replay(path, repair=False))) == 1
+    assert path.stat().st_size == size
+
+
+def test_missing_log(tmp_path):
+    assert list(WriteAheadLog.replay(tmp_path / "missing.log")) == []